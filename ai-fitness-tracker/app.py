@@ -1,6 +1,34 @@
+import threading
+import time
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, WebRtcMode
-from src.processor import BicepCurlProcessor
+import config
+from src.counter import MODE_COMBINE, MODE_NORMAL
+from src.exercises import get_library
+
+# The processor (cv2, av, the model backend) is imported only when a stream
+# starts, so the page renders without waiting for it.
+
+MODE_LABELS = {MODE_NORMAL: "Normal (Each Side)", MODE_COMBINE: "Combine (Both Sides)"}
+
+
+@st.cache_resource(show_spinner=False)
+def start_model_loading():
+    """Loads + warms the shared model (or starts the worker fleet) on a background thread, once per process."""
+    from src.fleet import get_fleet
+    from src.scheduler import get_scheduler
+
+    target = get_fleet if config.FLEET_WORKERS else get_scheduler
+    thread = threading.Thread(target=target, name="model-load", daemon=True)
+    thread.start()
+    return thread
+
+
+def make_processor(mode, group, user, exercise):
+    from src.processor import BicepCurlProcessor
+
+    return BicepCurlProcessor(mode, group, user, exercise)
+
 
 # 1. Page Configuration (Must be the first command)
 st.set_page_config(
@@ -37,9 +65,27 @@ st.markdown("""
 # 3. Sidebar Controls
 st.sidebar.title("⚙️ Settings")
 st.sidebar.markdown("---")
-mode = st.sidebar.radio("Select Exercise Mode", ["Normal (Single Arm)", "Combine (Double Arm)"])
+library = get_library()
+names = list(library)
+exercise = st.sidebar.selectbox("Exercise", names, index=names.index(config.EXERCISE),
+                                format_func=lambda name: library[name].label)
+# Only the modes this exercise can be counted in, its default first
+mode = st.sidebar.radio("Select Exercise Mode", [MODE_LABELS[m] for m in library[exercise].modes])
+group = st.sidebar.toggle("👥 Group mode (count everyone in view)", value=config.MULTI_PERSON)
+user = st.sidebar.text_input("Your name (for workout history)", value=config.HISTORY_DEFAULT_USER)
+user = user.strip() or config.HISTORY_DEFAULT_USER
+
+# Workout history (SQLite reads are cheap; the store is shared by every session)
+if config.HISTORY_ENABLED:
+    from src.history import get_store
+
+    week = get_store().totals(user, since=time.time() - 7 * 86400)
+    st.sidebar.caption(
+        f"📈 Last 7 days: {week['left']} left · {week['right']} right · {week['combine']} combine"
+    )
 
 st.sidebar.markdown("---")
+model_status = st.sidebar.empty()  # Filled in once the page is drawn
 st.sidebar.info("💡 **Tip:** Ensure your entire upper body is visible. Stand about 2-3 meters back.")
 
 # 4. Main Layout
@@ -51,13 +97,13 @@ col1, col2, col3 = st.columns([1, 8, 1])
 with col2:
     st.markdown("### Live Camera Feed")
     # 5. WebRTC Streamer
-    webrtc_streamer(
+    ctx = webrtc_streamer(
         key="bicep-curl",
         mode=WebRtcMode.SENDRECV,
         rtc_configuration={
             "iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]
         },
-        video_processor_factory=lambda: BicepCurlProcessor(mode),
+        video_processor_factory=lambda: make_processor(mode, group, user, exercise),
         media_stream_constraints={
             "video": {"width": {"ideal": 1280}, "height": {"ideal": 720}}, 
             "audio": False
@@ -65,10 +111,79 @@ with col2:
         async_processing=True,
     )
 
+    # Per-session inference rate (refreshes on each rerun)
+    if ctx.video_processor is not None:
+        rate = ctx.video_processor.skipper.stats()
+        caption = (
+            f"Inference: {rate['effective_fps']:.1f} fps (target {rate['target_fps']:.1f}) · "
+            f"dropped frames: {rate['dropped']}"
+        )
+        if ctx.video_processor.pipeline is not None:
+            lat = ctx.video_processor.pipeline.stats()
+            if "latency_ms_p50" in lat:
+                caption += (
+                    f" · latency p50/p95/p99: {lat['latency_ms_p50']:.0f}/"
+                    f"{lat['latency_ms_p95']:.0f}/{lat['latency_ms_p99']:.0f} ms"
+                )
+            if lat["errors"]:
+                caption += f" · analysis errors: {lat['errors']} (last: {lat['last_error']})"
+        st.caption(caption)
+
+    # Optional debug panel: per-stage timings for this session + profiler switch
+    if config.METRICS_PANEL and ctx.video_processor is not None:
+        with st.expander("🔧 Debug: pipeline stages"):
+            stages = ctx.video_processor.metrics.summary()
+            st.table([{"stage": name, **row} for name, row in stages.items()])
+            profiler = ctx.video_processor.metrics.registry.profiler
+            if st.toggle("Sampling profiler", value=profiler.running):
+                profiler.start()
+                st.caption(f"Profiling... {profiler.samples} samples so far")
+            elif profiler.running:
+                profiler.stop()
+            if profiler.stacks and not profiler.running:
+                st.code(profiler.collapsed(top=20), language=None)
+
 # 6. Instructions at the bottom
 st.markdown("---")
-st.markdown("""
+st.markdown(f"""
 <div style="text-align: center; color: gray;">
-    <b>Instructions:</b> Select a mode from the sidebar • Click 'Start' • Perform bicep curls
+    <b>Instructions:</b> Select an exercise and mode from the sidebar • Click 'Start' • Perform {library[exercise].label.lower()} reps
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# 7. Shared model: loaded in the background after the first render (or when
+# a stream starts), then reused by every rerun and session
+if config.MODEL_PRELOAD or ctx.state.playing:
+    loader = start_model_loading()
+    if loader.is_alive():
+        model_status.caption("🧠 Loading pose model...")
+    elif config.FLEET_WORKERS:
+        from src.fleet import get_fleet
+
+        fleet = get_fleet()
+        if fleet is not None:
+            stats = fleet.stats()
+            model_status.caption(
+                f"🧠 Workers ready: {stats['ready']}/{stats['workers']} ({stats['threads']} threads each) · "
+                f"sessions: {stats['sessions']} · frames in flight: {stats['inflight']} · restarts: {stats['restarts']}"
+            )
+        else:
+            model_status.warning("No inference worker could load the pose model.")
+    else:
+        from src.scheduler import get_scheduler
+
+        scheduler = get_scheduler()
+        if scheduler is not None:
+            stats = scheduler.pool.stats()
+            lines = [f"🧠 Model slots in use: {stats['in_use']}/{stats['size']} (waiting: {stats['waiting']})"]
+            batch = scheduler.stats()
+            if batch["batches"]:
+                lines.append(
+                    f"📦 Batch fill: {batch['fill_rate']:.0%} · "
+                    f"batch p95: {batch['batch_ms_p95']:.0f} ms · wait p95: {batch['wait_ms_p95']:.0f} ms"
+                )
+            model_status.caption("  \n".join(lines))
+        else:
+            model_status.warning("Pose model could not be loaded.")
+else:
+    model_status.caption("🧠 The pose model loads when the camera starts.")
\ No newline at end of file
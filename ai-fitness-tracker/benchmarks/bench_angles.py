@@ -0,0 +1,61 @@
+# benchmarks/bench_angles.py
+"""
+Joint-angle kernel: parity checks and micro-benchmark.
+Run from the ai-fitness-tracker folder:  python -m benchmarks.bench_angles
+"""
+import timeit
+
+import numpy as np
+
+from src.utils import ARM_TRIPLETS, JointAngles, calculate_angle
+
+
+def scalar_angles(keypoints, triplets=ARM_TRIPLETS):
+    """The old path: one calculate_angle call per person and triplet."""
+    return np.array([
+        [calculate_angle(p[a], p[b], p[c]) for a, b, c in triplets]
+        for p in keypoints
+    ], dtype=np.float32).reshape(len(keypoints), len(triplets))
+
+
+def check_parity(kernel):
+    # Straight arm (180), folded arm (0), zero-length limbs (degenerate)
+    cases = {
+        "straight": [(0, 0), (1, 0), (2, 0)],
+        "folded": [(0, 0), (1, 0), (0, 0)],
+        "right_angle": [(0, 0), (0, 1), (1, 1)],
+        "reflex": [(0, 1), (0, 0), (-1, -1)],
+        "degenerate_first": [(1, 1), (1, 1), (3, 2)],
+        "degenerate_end": [(3, 2), (1, 1), (1, 1)],
+        "all_same": [(5, 5), (5, 5), (5, 5)],
+    }
+    for name, (a, b, c) in cases.items():
+        kps = np.zeros((1, 17, 2), np.float32)
+        kps[0, [5, 7, 9]] = a, b, c
+        kps[0, [6, 8, 10]] = a, b, c
+        got = kernel(kps)[0]
+        want = calculate_angle(kps[0, 5], kps[0, 7], kps[0, 9])
+        assert np.allclose(got, want, atol=1e-3), (name, got, want)
+
+    rng = np.random.default_rng(0)
+    kps = (rng.random((64, 17, 2)) * 1280).astype(np.float32)
+    assert np.allclose(kernel(kps), scalar_angles(kps), atol=1e-2)
+    print("parity: ok")
+
+
+def main():
+    kernel = JointAngles(ARM_TRIPLETS)
+    check_parity(kernel)
+
+    rng = np.random.default_rng(1)
+    for people in (1, 10, 100):
+        kps = (rng.random((people, 17, 2)) * 1280).astype(np.float32)
+        n = max(10, 2000 // people)
+        t_scalar = min(timeit.repeat(lambda: scalar_angles(kps), number=n, repeat=3)) / n
+        t_vector = min(timeit.repeat(lambda: kernel(kps), number=n * 10, repeat=3)) / (n * 10)
+        print(f"{people:4d} people: scalar {t_scalar * 1e6:9.1f} us  "
+              f"vectorized {t_vector * 1e6:7.1f} us  ({t_scalar / t_vector:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_backends.py
+"""
+Inference backends compared on recorded frames: latency (batch 1),
+throughput (batched) and keypoint drift against the first backend, which
+is the baseline (normally PyTorch through ultralytics).
+
+    python -m benchmarks.bench_backends clips/session.mp4 \
+        --backend ultralytics:yolo11n-pose.pt \
+        --backend onnxruntime:yolo11n-pose.onnx \
+        --backend openvino:yolo11n-pose_int8_openvino_model --threads 4
+
+Frames come from a video file or an image glob. Drift is the mean pixel
+distance between matched people's keypoints that both backends report as
+visible; people are matched by box IoU.
+Run from the ai-fitness-tracker folder.
+"""
+import argparse
+import glob
+import json
+import time
+
+import cv2
+import numpy as np
+
+from src.backends import load_backend
+
+
+def load_frames(source, limit):
+    paths = sorted(glob.glob(source))
+    if len(paths) > 1 or (paths and not paths[0].lower().endswith((".mp4", ".avi", ".mov", ".mkv", ".webm"))):
+        return [cv2.imread(p) for p in paths[:limit]]
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < limit:
+        ok, img = cap.read()
+        if not ok:
+            break
+        frames.append(img)
+    cap.release()
+    return frames
+
+
+def iou(a, b):
+    """(N, 4) x (M, 4) xyxy boxes -> (N, M) IoU."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def drift(base, other, min_iou=0.5):
+    """Per-keypoint pixel distances between people matched across two PoseFrames."""
+    if len(base) == 0 or len(other) == 0:
+        return np.zeros(0)
+    overlap = iou(base.boxes, other.boxes)
+    dists = []
+    for i in range(len(base)):
+        j = int(overlap[i].argmax())
+        if overlap[i, j] < min_iou:
+            continue
+        both = base.keypoints[i].any(axis=1) & other.keypoints[j].any(axis=1)
+        dists.append(np.linalg.norm(base.keypoints[i][both] - other.keypoints[j][both], axis=1))
+    return np.concatenate(dists) if dists else np.zeros(0)
+
+
+def bench(backend, frames, batch):
+    backend.predict(frames[:1])  # Warm-up
+
+    latency = []
+    poses = []
+    for img in frames:
+        start = time.perf_counter()
+        poses.extend(backend.predict([img]))
+        latency.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        backend.predict(frames[i:i + batch])
+    throughput = len(frames) / (time.perf_counter() - start)
+
+    lat = np.array(latency) * 1000.0
+    return poses, {
+        "latency_ms_p50": float(np.percentile(lat, 50)),
+        "latency_ms_p95": float(np.percentile(lat, 95)),
+        f"throughput_fps_batch{batch}": throughput,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare inference backends on recorded frames.")
+    parser.add_argument("source", help="Video file or image glob")
+    parser.add_argument("--backend", action="append", required=True,
+                        help="name:model_path, e.g. openvino:yolo11n-pose_openvino_model (first = baseline)")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames in {args.source}")
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, threads={args.threads or 'default'}")
+
+    results, baseline = [], None
+    for spec in args.backend:
+        name, _, path = spec.partition(":")
+        poses, row = bench(load_backend(name, path, args.threads), frames, args.batch)
+        row = {"backend": name, "model": path, **row}
+        if baseline is None:
+            baseline = poses
+        else:
+            d = np.concatenate([drift(b, o) for b, o in zip(baseline, poses)])
+            same = np.mean([len(b) == len(o) for b, o in zip(baseline, poses)])
+            row.update({
+                "drift_px_mean": float(d.mean()) if len(d) else None,
+                "drift_px_p95": float(np.percentile(d, 95)) if len(d) else None,
+                "same_people_count": float(same),
+            })
+        results.append(row)
+        print(json.dumps(row))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
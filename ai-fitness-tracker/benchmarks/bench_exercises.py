@@ -0,0 +1,129 @@
+# benchmarks/bench_exercises.py
+"""
+Compiled exercise rules: parity checks and scaling with the number of
+live exercises. The compiled ExerciseBank (one NumPy pass per frame) is
+checked against RepCounter for the bicep curl, and against a plain
+per-exercise Python evaluator for every library entry; then both are
+timed with dozens of exercises counted for several people at once.
+Run from the ai-fitness-tracker folder:  python -m benchmarks.bench_exercises [--exercises 8 32 96]
+"""
+import argparse
+import operator
+import time
+
+import numpy as np
+import yaml
+
+import config
+from src.counter import MODE_NORMAL, RepCounter
+from src.exercises import Exercise, ExerciseBank, ExerciseCounter, load_library
+from src.utils import JointAngles
+
+OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+def random_keypoints(rng, frames, people=1):
+    """Random poses; every 7th frame is snapped to whole pixels so thresholds are hit exactly."""
+    kps = rng.uniform(0, 600, (frames, people, 17, 2)).astype(np.float32)
+    kps[::7] = np.round(kps[::7])
+    return kps
+
+
+def variants(n):
+    """n exercises: the library's entries repeated with 1 degree more hysteresis per round."""
+    with open(config.EXERCISE_LIBRARY, encoding="utf-8") as f:
+        specs = list(yaml.safe_load(f).items())
+    library = {}
+    for i in range(n):
+        name, spec = specs[i % len(specs)]
+        spec = dict(spec, hysteresis=spec.get("hysteresis", 0) + i // len(specs))
+        library[f"{name}_{i}"] = Exercise(f"{name}_{i}", spec)
+    return library
+
+
+class PythonRules:
+    """The uncompiled path: per exercise, per person, per side, test the current phase's terms."""
+
+    def __init__(self, exercises, people, mode):
+        self.exercises = exercises
+        self.kernels = [{a: JointAngles(t) for a, t in ex.angles.items()} for ex in exercises]
+        self.modes = [ex.mode(mode) for ex in exercises]
+        self.phase = np.zeros((people, len(exercises), 3), np.intp)
+        self.counts = np.zeros((people, len(exercises), 3), np.int64)
+
+    def update(self, keypoints):
+        for e, ex in enumerate(self.exercises):
+            angles = {a: kernel(keypoints) for a, kernel in self.kernels[e].items()}
+            sides = ((0, (0,)), (1, (1,))) if self.modes[e] == MODE_NORMAL else ((2, (0, 1)),)
+            for p in range(len(keypoints)):
+                for col, which in sides:
+                    terms = ex.phases[self.phase[p, e, col]]
+                    if all(OPS[op](angles[a][p, s], t) for a, op, t in terms for s in which):
+                        self.phase[p, e, col] += 1
+                        if self.phase[p, e, col] == len(ex.phases):
+                            self.phase[p, e, col] = 0
+                            self.counts[p, e, col] += 1
+
+
+def check_curl(rng):
+    kps = random_keypoints(rng, 5000)[:, 0]
+    kernel = JointAngles()
+    for name, count_on in (("bicep_curl", "curl"), ("bicep_curl_extend", "extend")):
+        for mode in ("normal", "combine"):
+            old, new = RepCounter(mode, count_on=count_on), ExerciseCounter(name, mode)
+            for k in kps:
+                left, right = kernel(k).ravel()
+                assert old.update(float(left), float(right)) == new.update(k), (name, mode)
+            assert old.counts() == new.counts()
+            print(f"parity {name:18s} {mode:8s}: {new.counts()}")
+
+
+def check_library(rng, library):
+    kps = random_keypoints(rng, 3000, people=4)
+    for mode in ("normal", "combine"):
+        bank = ExerciseBank(list(library), 4, library)
+        for row in range(4):
+            bank.set_row(row, mode)
+        ref = PythonRules(bank.exercises, 4, mode)
+        for frame in kps:
+            bank.update(frame)
+            ref.update(frame)
+        assert np.array_equal(bank.counts, ref.counts.reshape(4, -1)), mode
+    print(f"parity: {len(library)} exercises match the Python evaluator")
+
+
+def timed(fn, frames):
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    return (time.perf_counter() - start) / len(frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exercises", type=int, nargs="+", default=[8, 32, 96])
+    parser.add_argument("--people", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    check_curl(rng)
+    check_library(rng, load_library())
+
+    for n in args.exercises:
+        library = variants(n)
+        for people in args.people:
+            frames = random_keypoints(rng, args.frames, people)
+            bank = ExerciseBank(list(library), people, library)
+            for row in range(people):
+                bank.set_row(row, "normal" if row % 2 else "combine")
+            ref = PythonRules(bank.exercises, people, "combine")
+            t_bank = timed(bank.update, frames)
+            t_ref = timed(ref.update, frames)
+            print(f"{n:3d} exercises x {people:3d} people: python {t_ref * 1e6:9.1f} us/frame  "
+                  f"compiled {t_bank * 1e6:7.1f} us/frame  ({t_ref / t_bank:5.1f}x)  "
+                  f"{len(bank.rules.triplets)} distinct angles")
+
+
+if __name__ == "__main__":
+    main()
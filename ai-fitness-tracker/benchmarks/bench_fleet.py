@@ -0,0 +1,114 @@
+# benchmarks/bench_fleet.py
+"""
+Throughput with many concurrent streams: the in-process pool + scheduler
+against the worker fleet at several sizes. Each stream is a thread that
+sends frames back to back (inference and tracking, as analyze() does) for
+a fixed time.
+
+    python -m benchmarks.bench_fleet clips/session.mp4 --streams 16 --workers 1 2 4 8
+
+Frames come from a video file or an image glob (see bench_backends).
+Scaling is per worker, relative to the first --workers size; with C cores
+expect close to linear gains up to about C / threads-per-worker workers.
+Run from the ai-fitness-tracker folder.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import config
+from benchmarks.bench_backends import load_frames
+
+
+def drive(infer, frames, streams, seconds):
+    """Runs `streams` threads calling infer(stream, img) until time is up. Returns frames/s and latency."""
+    done = [0] * streams
+    latencies = [[] for _ in range(streams)]
+    stop = time.perf_counter() + seconds
+
+    def run(i):
+        k = i  # Streams start at different frames
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            if infer(i, frames[k % len(frames)]) is not None:
+                done[i] += 1
+                latencies[i].append(time.perf_counter() - start)
+            k += 1
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(streams)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    lat = np.concatenate([np.array(x) for x in latencies]) * 1000.0 if sum(done) else np.zeros(1)
+    return sum(done) / elapsed, float(np.percentile(lat, 50)), float(np.percentile(lat, 95))
+
+
+def bench_in_process(frames, streams, seconds, pool_size):
+    from src.model_pool import ModelPool
+    from src.scheduler import InferenceScheduler
+    from src.tracking import SessionTracker
+
+    pool = ModelPool(config.MODEL_PATH, pool_size)
+    pool.warmup()
+    scheduler = InferenceScheduler(pool, config.BATCH_MAX_SIZE, config.BATCH_MAX_WAIT)
+    trackers = [SessionTracker() for _ in range(streams)]
+
+    def infer(i, img):
+        pose = scheduler.infer(img, timeout=10.0)
+        return None if pose is None else trackers[i].update(pose, img)
+
+    try:
+        return drive(infer, frames, streams, seconds)
+    finally:
+        scheduler.close()
+
+
+def bench_fleet(frames, streams, seconds, workers):
+    from src.fleet import InferenceFleet
+
+    h, w = frames[0].shape[:2]
+    fleet = InferenceFleet(workers, max_frame=(h, w))
+    try:
+        if not fleet.wait_ready(config.FLEET_START_TIMEOUT):
+            raise RuntimeError("no fleet worker came up")
+        while fleet.stats()["ready"] < workers:
+            time.sleep(0.1)
+        sessions = [fleet.session() for _ in range(streams)]
+        result = drive(lambda i, img: sessions[i].infer(img, timeout=10.0), frames, streams, seconds)
+        return result + (fleet.threads,)
+    finally:
+        fleet.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", help="Video file or image glob")
+    parser.add_argument("--streams", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--frames", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.source}")
+
+    fps, p50, p95 = bench_in_process(frames, args.streams, args.seconds, config.MODEL_POOL_SIZE)
+    print(f"in-process pool ({config.MODEL_POOL_SIZE} slots): {fps:7.1f} frames/s  "
+          f"p50 {p50:6.1f} ms  p95 {p95:6.1f} ms")
+
+    base = None
+    for workers in args.workers:
+        fps, p50, p95, threads = bench_fleet(frames, args.streams, args.seconds, workers)
+        base = base or fps / workers
+        print(f"fleet {workers:2d} workers x {threads} threads: {fps:7.1f} frames/s  "
+              f"p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  scaling {fps / base / workers:.0%} of linear")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_history.py
+"""
+Workout store at scale: how fast batched appends go through the writer
+thread, how long record_rep() blocks its caller, and query latency once
+the log holds millions of reps.
+Run from the ai-fitness-tracker folder:  python -m benchmarks.bench_history [--events 2000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.history import SIDES, WorkoutStore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "workouts.db")
+        store = WorkoutStore(path, batch=5000, backlog=args.events + 1000)
+
+        # A year of sessions: ~40 reps each, spread over the users
+        now = time.time()
+        n_sessions = max(1, args.events // 40)
+        users = [f"user{u}" for u in rng.integers(0, args.users, n_sessions)]
+        starts = np.sort(rng.uniform(now - 365 * 86400, now, n_sessions))
+        sessions = [store.start_session(u, "Normal (Single Arm)", started=float(t)) for u, t in zip(users, starts)]
+
+        per_session = np.bincount(rng.integers(0, n_sessions, args.events), minlength=n_sessions)
+        calls = []
+        start = time.perf_counter()
+        for s, (sid, user, t0, n) in enumerate(zip(sessions, users, starts, per_session)):
+            for k in range(n):
+                c0 = time.perf_counter()
+                store.record_rep(user, sid, SIDES[k % 2], k // 2 + 1, 160.0, 80.0, ts=float(t0) + 3.0 * k)
+                if k == 0:
+                    calls.append(time.perf_counter() - c0)
+            store.end_session(sid, {"left": (n + 1) // 2, "right": n // 2, "combine": 0}, ended=float(t0) + 3.0 * n)
+        queued = time.perf_counter() - start
+        store.flush(timeout=600)
+        total = time.perf_counter() - start
+        calls = np.array(calls) * 1e6
+        print(f"{args.events} reps / {n_sessions} sessions: queued in {queued:.1f} s, "
+              f"committed in {total:.1f} s ({args.events / total:,.0f} reps/s, {store.batches} batches)")
+        print(f"record_rep(): p50 {np.percentile(calls, 50):.1f} us, p99 {np.percentile(calls, 99):.1f} us")
+
+        def timed(name, fn, repeat=200):
+            lat = []
+            for i in range(repeat):
+                user = f"user{i % args.users}"
+                t = time.perf_counter()
+                fn(user)
+                lat.append(time.perf_counter() - t)
+            lat = np.array(lat) * 1000.0
+            print(f"{name:32s} p50 {np.percentile(lat, 50):7.2f} ms  p95 {np.percentile(lat, 95):7.2f} ms")
+
+        timed("sessions(user, limit=50)", lambda u: store.sessions(u))
+        timed("totals(user, last 30 days)", lambda u: store.totals(u, since=now - 30 * 86400))
+        timed("totals(user, all time)", lambda u: store.totals(u))
+        timed("daily(user, 30 days)", lambda u: store.daily(u, 30, now=now))
+        timed("reps(session)", lambda u: store.reps(sessions[hash(u) % n_sessions]))
+        print(f"database size: {os.path.getsize(path) / 1e6:.0f} MB, {store.stats()}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
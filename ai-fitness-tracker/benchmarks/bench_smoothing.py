@@ -0,0 +1,137 @@
+# benchmarks/bench_smoothing.py
+"""
+Rep-count accuracy against inference rate, with and without the keypoint
+filter. Clean elbow-angle traces (30 fps) are turned into arm keypoints,
+then corrupted like model output: pixel jitter, low-confidence outliers
+and dropped keypoints (0, 0). Each inference rate samples every k-th frame.
+
+    raw       counter on the sampled keypoints as they come (the old path)
+    filtered  counter on KeypointFilter output at the sampled frames
+    filled    as filtered, plus predicted keypoints on the skipped frames
+
+Error = |counted - true reps| summed over traces, as % of the true reps.
+Traces are the offline CLI's timeline CSVs; without arguments synthetic
+curl sessions are generated.
+Run from the ai-fitness-tracker folder:  python -m benchmarks.bench_smoothing [results/*.csv]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.replay_counter import load_trace
+from src.counter import RepCounter
+from src.smoothing import KeypointFilter
+from src.utils import ARM_TRIPLETS, JointAngles
+
+FPS = 30.0
+RATES = (30, 15, 10, 7.5, 5, 3)
+MODES = ("Normal (Single Arm)", "Combine (Double Arm)")
+UPPER_ARM, FOREARM = 100.0, 90.0
+
+
+def synthetic_traces(n=12, seconds=120, seed=1):
+    """Curl sessions: varying tempo and range of motion, rests between sets."""
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * FPS)
+    traces = []
+    for _ in range(n):
+        tempo = rng.uniform(0.3, 0.7, frames)               # Reps per second, drifting
+        tempo = np.convolve(tempo, np.ones(60) / 60, mode="same")
+        tempo[(np.arange(frames) // int(20 * FPS)) % 3 == 2] = 0.0  # Rest every third 20 s block
+        phase = np.cumsum(tempo / FPS) * 2 * np.pi
+        top, bottom = rng.uniform(158, 172), rng.uniform(45, 80)
+        mid, amp = (top + bottom) / 2, (top - bottom) / 2
+        left = mid + amp * np.cos(phase)
+        right = mid + amp * np.cos(phase + rng.uniform(0, 0.3))
+        traces.append(np.stack([left, right], axis=1).astype(np.float32))
+    return traces
+
+
+def arm_keypoints(trace):
+    """(F, 17, 2) keypoints whose elbow angles follow the trace."""
+    kps = np.zeros((len(trace), 17, 2), np.float32)
+    for side, (s, e, w), x in ((0, ARM_TRIPLETS[0], 380.0), (1, ARM_TRIPLETS[1], 260.0)):
+        theta = np.radians(trace[:, side])
+        kps[:, s] = (x, 150.0)
+        kps[:, e] = (x, 150.0 + UPPER_ARM)
+        # Forearm direction at `theta` from the elbow -> shoulder direction (straight up)
+        sign = 1.0 if side == 0 else -1.0
+        kps[:, w, 0] = x + sign * FOREARM * np.sin(theta)
+        kps[:, w, 1] = 150.0 + UPPER_ARM - FOREARM * np.cos(theta)
+    return kps
+
+
+def corrupt(kps, rng, jitter=3.0, outliers=0.03, dropouts=0.03):
+    """Model-like noise: jitter, low-confidence outliers and hidden (0, 0) keypoints."""
+    noisy = kps + rng.normal(0, jitter, kps.shape).astype(np.float32)
+    conf = rng.uniform(0.75, 0.98, kps.shape[:2]).astype(np.float32)
+    bad = rng.random(kps.shape[:2]) < outliers
+    noisy[bad] += rng.normal(0, 45, (bad.sum(), 2)).astype(np.float32)
+    conf[bad] = rng.uniform(0.3, 0.6, bad.sum())
+    gone = rng.random(kps.shape[:2]) < dropouts
+    noisy[gone] = 0.0
+    conf[gone] = rng.uniform(0.0, 0.3, gone.sum())
+    return noisy, conf
+
+
+def count(mode, angles_per_frame):
+    counter = RepCounter(mode)
+    for angle_left, angle_right in angles_per_frame:
+        counter.update(angle_left, angle_right)
+    return counter.count_left + counter.count_right + counter.count_combine
+
+
+def run(mode, kps, conf, step, variant, angles):
+    if variant == "raw":
+        return count(mode, angles(kps[::step]))
+
+    filt = KeypointFilter()
+    out = []
+    for i in range(len(kps)):
+        t = i / FPS
+        if i % step == 0:
+            out.append(filt.update(kps[i], conf[i], t))
+        elif variant == "filled":
+            pred = filt.predict(t)
+            if pred is not None:
+                out.append(pred)
+    return count(mode, angles(np.array(out, np.float32).reshape(-1, 17, 2)))
+
+
+def main(paths):
+    traces = [load_trace(p) for p in paths] if paths else synthetic_traces()
+    rng = np.random.default_rng(0)
+    kernel = JointAngles(ARM_TRIPLETS)
+    angles = lambda k: kernel(k).copy()  # noqa: E731 - one (F, 2) array per call
+
+    data = []
+    for trace in traces:
+        kps, conf = corrupt(arm_keypoints(trace), rng)
+        data.append((trace, kps, conf))
+
+    variants = ("raw", "filtered", "filled")
+    print(f"{len(traces)} traces, {sum(len(t) for t in traces) / FPS:.0f} s of video at {FPS:.0f} fps")
+    for mode in MODES:
+        truth = sum(count(mode, trace) for trace, _, _ in data)
+        print(f"\n{mode}: {truth} true reps")
+        print("infer fps  " + "".join(f"{v:>12s}" for v in variants))
+        for rate in RATES:
+            step = max(1, int(round(FPS / rate)))
+            row = []
+            for v in variants:
+                err = sum(abs(run(mode, kps, conf, step, v, angles) - count(mode, trace))
+                          for trace, kps, conf in data)
+                row.append(100.0 * err / max(truth, 1))
+            print(f"{FPS / step:9.1f}  " + "".join(f"{e:11.1f}%" for e in row))
+
+    filt = KeypointFilter()
+    kps, conf = data[0][1], data[0][2]
+    start = time.perf_counter()
+    for i in range(len(kps)):
+        filt.update(kps[i], conf[i], i / FPS)
+    print(f"\nKeypointFilter.update: {(time.perf_counter() - start) / len(kps) * 1e6:.1f} us per frame")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,289 @@
+# benchmarks/load_test.py
+"""
+End-to-end load test of BicepCurlProcessor without a browser or STUN
+server: every simulated session is a thread calling recv() with
+av.VideoFrames at the camera's frame rate, the way streamlit-webrtc's
+async worker does (a frame that arrives while recv() is still busy is
+dropped). The run is repeated for each number of concurrent sessions.
+
+    python -m benchmarks.load_test clips/curls.mp4 --sessions 1 2 4 8 16 --out results/load.json
+    python -m benchmarks.load_test --synthetic 1280x720 --seconds 30 --compare results/load.json
+
+Per level it reports:
+- throughput (frames rendered and inferred per second);
+- recv() latency and capture-to-render latency (p50/p95/p99);
+- frames dropped because recv() fell behind;
+- CPU use and resident memory per session;
+- rep-count accuracy.
+Accuracy needs ground truth next to the clip: clips/curls.json =
+{"mode": "normal", "left": 12, "right": 11, "combine": 0}, optionally
+with an "exercise" (default --exercise). Each session
+plays each clip once, so the expected counts apply as they are.
+Results are written as JSON (--out), and --compare prints the change
+against an earlier run. Without a pose model the test stops, since recv()
+would only pass frames through; --no-model runs it anyway to time that
+path, with every level marked invalid.
+Run from the ai-fitness-tracker folder.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import av
+import numpy as np
+
+import config
+from src.offline import MODES
+
+
+def read_clip(path, limit):
+    """(yuv420p av.VideoFrames like a browser sends, fps, ground truth dict or None)."""
+    frames = []
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        fps = float(stream.average_rate or 30)
+        for frame in container.decode(stream):
+            frames.append(frame.reformat(format="yuv420p"))
+            if len(frames) >= limit:
+                break
+    truth_path = os.path.splitext(path)[0] + ".json"
+    truth = None
+    if os.path.exists(truth_path):
+        with open(truth_path, encoding="utf-8") as f:
+            truth = json.load(f)
+    return frames, fps, truth
+
+
+def synthetic_frames(size, count=60):
+    """Moving noise at `size` ("WxH"): exercises decode/convert/inference cost, no people, no ground truth."""
+    w, h = (int(v) for v in size.lower().split("x"))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w + count * 8, 3), np.uint8)
+    return [av.VideoFrame.from_ndarray(np.ascontiguousarray(base[:, i * 8:i * 8 + w]), format="bgr24")
+            .reformat(format="yuv420p") for i in range(count)]
+
+
+def rss_bytes():
+    """Resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, not current
+
+
+class SimulatedSession(threading.Thread):
+    """One viewer: a camera clock producing frames at `fps` and a recv() loop that keeps up if it can."""
+
+    def __init__(self, processor, frames, fps, n_frames, delay):
+        super().__init__(daemon=True)
+        self.processor = processor
+        self.frames = frames
+        self.fps = fps
+        self.n_frames = n_frames
+        self.delay = delay
+        self.recv_times = []
+        self.dropped = 0
+        self.error = None
+
+    def run(self):
+        time.sleep(self.delay)  # Sessions don't all start on the same frame boundary
+        start = time.perf_counter()
+        last = -1
+        try:
+            while True:
+                i = int((time.perf_counter() - start) * self.fps)
+                if i >= self.n_frames:
+                    break
+                if i == last:
+                    time.sleep(max(start + (i + 1) / self.fps - time.perf_counter(), 0.0))
+                    continue
+                self.dropped += i - last - 1  # Frames that arrived while recv() was busy
+                last = i
+                t = time.perf_counter()
+                self.processor.recv(self.frames[i % len(self.frames)])
+                self.recv_times.append(time.perf_counter() - t)
+        except Exception as e:
+            self.error = e
+
+
+def run_level(n, clips, args, model_ok=True):
+    from src.processor import BicepCurlProcessor
+
+    rss_before = rss_bytes()
+    rng = np.random.default_rng(n)
+    sessions = []
+    for k in range(n):
+        frames, fps, truth = clips[k % len(clips)]
+        fps = args.fps or fps
+        mode = MODES[(truth or {}).get("mode", args.mode)]
+        n_frames = len(frames) if truth is not None or not args.seconds else int(args.seconds * fps)
+        proc = BicepCurlProcessor(mode, group=args.group, exercise=(truth or {}).get("exercise", args.exercise))
+        sessions.append((SimulatedSession(proc, frames, fps, n_frames, rng.uniform(0, 1.0 / fps)), truth))
+
+    cpu_before, wall_before = os.times(), time.perf_counter()
+    for session, _ in sessions:
+        session.start()
+    for session, _ in sessions:
+        session.join()
+    wall = time.perf_counter() - wall_before
+    cpu_after = os.times()
+    rss_after = rss_bytes()
+    time.sleep(config.INFERENCE_TIMEOUT)  # Let the last in-flight inference land before reading the counts
+
+    recv_ms = np.concatenate([np.array(s.recv_times) for s, _ in sessions]) * 1000.0
+    pipelines = [s.processor.pipeline.stats() for s, _ in sessions if s.processor.pipeline is not None]
+    e2e = [p for p in pipelines if "latency_ms_p50" in p]
+    rendered = len(recv_ms)
+    offered = sum(s.n_frames for s, _ in sessions)
+    cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+
+    level = {
+        "sessions": n,
+        "seconds": wall,
+        "frames_offered": offered,
+        "frames_rendered": rendered,
+        "frames_dropped": sum(s.dropped for s, _ in sessions),
+        "render_fps": rendered / wall,
+        "inferred_fps": sum(p["completed"] for p in pipelines) / wall,
+        "recv_ms_p50": float(np.percentile(recv_ms, 50)) if rendered else None,
+        "recv_ms_p95": float(np.percentile(recv_ms, 95)) if rendered else None,
+        "recv_ms_p99": float(np.percentile(recv_ms, 99)) if rendered else None,
+        # Capture-to-render latency: median session's p50, worst session's p95/p99
+        "latency_ms_p50": float(np.median([p["latency_ms_p50"] for p in e2e])) if e2e else None,
+        "latency_ms_p95": max(p["latency_ms_p95"] for p in e2e) if e2e else None,
+        "latency_ms_p99": max(p["latency_ms_p99"] for p in e2e) if e2e else None,
+        "inference_errors": sum(p["errors"] for p in pipelines),
+        "cpu_cores_used": cpu / wall,
+        "rss_mb_per_session": (rss_after - rss_before) / n / 1e6,
+        "session_errors": [repr(s.error) for s, _ in sessions if s.error is not None],
+    }
+    # Nothing inferred: the numbers describe a pass-through, not the app
+    level["valid"] = model_ok and level["inferred_fps"] > 0
+
+    # Rep-count accuracy against the clips' ground truth
+    errors, exact = [], 0
+    for session, truth in sessions:
+        if truth is None:
+            continue
+        counts = session.processor.counter.counts()
+        diff = [abs(counts[side] - int(truth.get(side, 0))) for side in ("left", "right", "combine")]
+        errors.append(sum(diff))
+        exact += sum(diff) == 0
+    if errors:
+        level["reps_exact"] = exact / len(errors)
+        level["reps_mean_abs_error"] = float(np.mean(errors))
+
+    for session, _ in sessions:
+        session.processor.on_ended()
+    return level
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    keys = ("INFERENCE_BACKEND", "MODEL_PATH", "MODEL_POOL_SIZE", "FLEET_WORKERS", "BATCH_MAX_SIZE",
+            "BATCH_MAX_WAIT", "ROI_ENABLED", "SMOOTH_ENABLED", "SKIP_MAX_FPS", "CPU_BUDGET")
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "config": {k: getattr(config, k) for k in keys if hasattr(config, k)},
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+    }
+
+
+def compare(levels, path):
+    with open(path, encoding="utf-8") as f:
+        old = {lv["sessions"]: lv for lv in json.load(f)["levels"]}
+    print(f"\nchange vs {path}:")
+    for lv in levels:
+        before = old.get(lv["sessions"])
+        if before is None:
+            continue
+        parts = []
+        for key in ("render_fps", "inferred_fps", "recv_ms_p95", "latency_ms_p95", "rss_mb_per_session"):
+            a, b = before.get(key), lv.get(key)
+            if a and b is not None:
+                parts.append(f"{key} {100.0 * (b - a) / a:+.0f}%")
+        invalid = "  (invalid: no inference)" if not (lv["valid"] and before.get("valid", True)) else ""
+        print(f"  {lv['sessions']:3d} sessions: " + ", ".join(parts) + invalid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("clips", nargs="*", help="Video files (a .json with the same name holds the true counts)")
+    parser.add_argument("--synthetic", metavar="WxH", help="Generated frames instead of clips")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--fps", type=float, help="Camera frame rate (default: the clip's)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Run length for synthetic frames")
+    parser.add_argument("--max-frames", type=int, default=1800, help="Frames read per clip")
+    parser.add_argument("--mode", choices=sorted(MODES), default="normal", help="Mode for clips without ground truth")
+    parser.add_argument("--exercise", default=config.EXERCISE, help="Exercise for clips without ground truth")
+    parser.add_argument("--group", action="store_true", help="Group mode sessions")
+    parser.add_argument("--history", action="store_true", help="Record reps to the workout history")
+    parser.add_argument("--no-model", action="store_true",
+                        help="Run even if the pose model cannot load (results marked invalid)")
+    parser.add_argument("--slo-ms", type=float, default=250.0, help="p95 capture-to-render latency target")
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier --out file to compare against")
+    args = parser.parse_args(argv)
+
+    config.HISTORY_ENABLED = args.history
+    if args.synthetic:
+        clips = [(synthetic_frames(args.synthetic), args.fps or 30.0, None)]
+    elif args.clips:
+        clips = [read_clip(path, args.max_frames) for path in args.clips]
+    else:
+        raise SystemExit("Give clips or --synthetic WxH")
+
+    # Load the model up front so the first level does not pay for it
+    from src.processor import BicepCurlProcessor
+
+    probe = BicepCurlProcessor("Normal (Single Arm)")
+    model_ok = probe.remote is not None or probe.scheduler is not None
+    probe.on_ended()
+    if not model_ok:
+        message = (f"pose model unavailable ({config.INFERENCE_BACKEND}, {config.MODEL_PATH}), "
+                   "inference not exercised")
+        if not args.no_model:
+            raise SystemExit(f"{message}. Pass --no-model to time the pass-through path anyway.")
+        print(f"WARNING: {message}; every level is marked invalid")
+
+    levels = []
+    for n in args.sessions:
+        level = run_level(n, clips, args, model_ok)
+        levels.append(level)
+        acc = f"  reps exact {level['reps_exact']:.0%}" if "reps_exact" in level else ""
+        lat = level["latency_ms_p95"]
+        print(f"{n:3d} sessions: {level['render_fps']:7.1f} fps rendered, {level['inferred_fps']:6.1f} inferred, "
+              f"recv p95 {level['recv_ms_p95'] or 0:6.1f} ms, e2e p95 {lat or 0:6.0f} ms, "
+              f"dropped {level['frames_dropped']}, {level['cpu_cores_used']:.1f} cores, "
+              f"{level['rss_mb_per_session']:.1f} MB/session{acc}" + ("" if level["valid"] else "  INVALID"))
+
+    # Highest level whose worst session kept to the latency target without falling behind the camera
+    ok = [lv["sessions"] for lv in levels
+          if lv["valid"] and lv["latency_ms_p95"] is not None and lv["latency_ms_p95"] <= args.slo_ms
+          and lv["frames_dropped"] <= 0.01 * lv["frames_offered"]]
+    print(f"\nsessions within a p95 of {args.slo_ms:.0f} ms: {max(ok) if ok else 0}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": metadata(args), "levels": levels}, f, indent=2)
+    if args.compare:
+        compare(levels, args.compare)
+
+
+if __name__ == "__main__":
+    main()
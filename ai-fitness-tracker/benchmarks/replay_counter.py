@@ -0,0 +1,177 @@
+# benchmarks/replay_counter.py
+"""
+Replays elbow-angle traces through the old inline counting code and the
+RepCounter / CounterBank / count_series engines, checking the counts
+match frame by frame; then checks count_sweep's final counts over a grid
+of threshold pairs against count_series run once per pair.
+Traces are CSV files with angle_left / angle_right columns (the offline
+CLI's timeline output); without arguments synthetic traces are generated.
+
+    python -m benchmarks.replay_counter [results/*.csv]
+"""
+import csv
+import sys
+import time
+
+import numpy as np
+
+from src.counter import CounterBank, RepCounter, count_series, count_sweep
+
+UP, DOWN = 150, 90
+MODES = ("Normal (Single Arm)", "Combine (Double Arm)")
+
+
+def legacy_app(mode, trace):
+    """Counting logic as it was inlined in BicepCurlProcessor.recv."""
+    count_left = count_right = count_combine = 0
+    state_left = state_right = state_combine = 0
+    history = []
+    for angle_left, angle_right in trace:
+        if "Normal" in mode:
+            if angle_left > UP: state_left = 1
+            if angle_left < DOWN and state_left == 1:
+                state_left = 0
+                count_left += 1
+            if angle_right > UP: state_right = 1
+            if angle_right < DOWN and state_right == 1:
+                state_right = 0
+                count_right += 1
+        elif "Combine" in mode:
+            if angle_left > UP and angle_right > UP:
+                state_combine = 1
+            if angle_left < DOWN and angle_right < DOWN and state_combine == 1:
+                state_combine = 0
+                count_combine += 1
+        history.append((count_left, count_right, count_combine))
+    return np.array(history, np.int64).reshape(-1, 3)
+
+
+def legacy_research(mode, trace):
+    """Counting logic as it was inlined in research/main_final.py."""
+    up_left = up_right = combine = False
+    left = right = both = 0
+    history = []
+    for angle_left, angle_right in trace:
+        if mode == "normal":
+            if angle_left <= DOWN and not up_left:
+                up_left = True
+            elif angle_left >= UP and up_left:
+                left += 1
+                up_left = False
+            if angle_right <= DOWN and not up_right:
+                up_right = True
+            elif angle_right >= UP and up_right:
+                right += 1
+                up_right = False
+        elif mode == "combine":
+            if angle_left <= DOWN and angle_right <= DOWN and not combine:
+                combine = True
+            elif angle_left >= UP and angle_right >= UP and combine:
+                both += 1
+                combine = False
+        history.append((left, right, both))
+    return np.array(history, np.int64).reshape(-1, 3)
+
+
+def engine(mode, trace, count_on):
+    counter = RepCounter(mode, UP, DOWN, count_on=count_on)
+    history = np.empty((len(trace), 3), np.int64)
+    for i, (angle_left, angle_right) in enumerate(trace):
+        counter.update(angle_left, angle_right)
+        history[i] = counter.count_left, counter.count_right, counter.count_combine
+    return history
+
+
+def bank(modes, traces, count_on):
+    """All traces at once: one CounterBank row per (mode, trace) pair."""
+    rows = [(m, t) for m in modes for t in traces]
+    length = max(len(t) for t in traces)
+    angles = np.full((length, len(rows), 2), np.nan, np.float32)  # NaN never arms or fires
+    b = CounterBank(len(rows), count_on=count_on)
+    for r, (mode, trace) in enumerate(rows):
+        b.set_row(r, mode, UP, DOWN)
+        angles[:len(trace), r] = trace
+
+    history = np.empty((length, len(rows), 3), np.int64)
+    for i in range(length):
+        b.update(angles[i])
+        history[i] = b.counts
+    return [history[:len(t), r] for r, (_, t) in enumerate(rows)]
+
+
+def synthetic_traces(n=8, frames=3000, seed=0):
+    """Noisy curl cycles with random tempo, pauses and dropouts near the thresholds."""
+    rng = np.random.default_rng(seed)
+    traces = []
+    for _ in range(n):
+        t = np.cumsum(rng.uniform(0.5, 1.5, frames)) / 15.0
+        base = 120 + 55 * np.cos(t * rng.uniform(1.5, 4.0))
+        trace = np.stack([base + rng.normal(0, 6, frames), base + rng.normal(0, 6, frames)], axis=1)
+        trace[rng.random(frames) < 0.02] = rng.choice([UP, DOWN])  # Exact threshold hits
+        traces.append(np.round(trace, 2).astype(np.float32))
+    return traces
+
+
+def load_trace(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("angle_left") not in (None, "")]
+    return np.array([[float(r["angle_left"]), float(r["angle_right"])] for r in rows], np.float32).reshape(-1, 2)
+
+
+def main(paths):
+    traces = [load_trace(p) for p in paths] if paths else synthetic_traces()
+    frames = sum(len(t) for t in traces)
+    failures = 0
+
+    checks = [
+        ("app", "curl", MODES, legacy_app),
+        ("research", "extend", ("normal", "combine"), legacy_research),
+    ]
+    for name, count_on, modes, legacy in checks:
+        start = time.perf_counter()
+        expected = [legacy(m, t) for m in modes for t in traces]
+        t_legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scalar = [engine(m, t, count_on) for m in modes for t in traces]
+        t_scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vector = bank(modes, traces, count_on)
+        t_bank = time.perf_counter() - start
+
+        start = time.perf_counter()
+        series = [count_series(m, t, UP, DOWN, count_on) for m in modes for t in traces]
+        t_series = time.perf_counter() - start
+
+        for want, got_s, got_v, got_r in zip(expected, scalar, vector, series):
+            if not (np.array_equal(want, got_s) and np.array_equal(want, got_v) and np.array_equal(want, got_r)):
+                failures += 1
+        print(f"{name:9s} {len(expected)} replays, {frames * len(modes)} frames: "
+              f"legacy {t_legacy * 1e3:.1f} ms, RepCounter {t_scalar * 1e3:.1f} ms, "
+              f"CounterBank {t_bank * 1e3:.1f} ms, count_series {t_series * 1e3:.1f} ms")
+
+        # Threshold grid: every pair in one count_sweep pass vs count_series per pair
+        up, down = np.meshgrid(np.arange(130, 175, 5), np.arange(60, 115, 5), indexing="ij")
+        up, down = up.ravel(), down.ravel()
+        start = time.perf_counter()
+        swept = []
+        for m in modes:
+            for t in traces:
+                _, pairs, cols = count_sweep(m, t, up, down, count_on)
+                swept.append(np.bincount(pairs * 3 + cols, minlength=3 * len(up)).reshape(-1, 3))
+        t_sweep = time.perf_counter() - start
+        start = time.perf_counter()
+        per_pair = [np.array([count_series(m, t, u, d, count_on)[-1] for u, d in zip(up, down)])
+                    for m in modes for t in traces]
+        t_pairs = time.perf_counter() - start
+        failures += sum(not np.array_equal(a, b) for a, b in zip(swept, per_pair))
+        print(f"{name:9s} {len(up)} threshold pairs: count_sweep {t_sweep * 1e3:.1f} ms, "
+              f"count_series per pair {t_pairs * 1e3:.1f} ms")
+
+    print("mismatches:", failures)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
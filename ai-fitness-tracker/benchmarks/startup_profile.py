@@ -0,0 +1,92 @@
+# benchmarks/startup_profile.py
+"""
+Cold-start cost of the app, each step in a fresh interpreter:
+
+    page    the imports at the top of app.py, read from the file itself
+    stream  what starting a stream adds (src.processor and the model backend)
+    render  time to the first full script run, through Streamlit's AppTest
+
+Import steps print a breakdown by top-level package from `python -X importtime`.
+Run from the ai-fitness-tracker folder:  python -m benchmarks.startup_profile
+"""
+import ast
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# The WebRTC component needs a live server session, which AppTest does not
+# have, so a stopped stream stands in for it and the rest of the page runs
+RENDER = """
+import time
+import types
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+import streamlit_webrtc
+streamlit_webrtc.webrtc_streamer = lambda **kwargs: types.SimpleNamespace(
+    video_processor=None, state=types.SimpleNamespace(playing=False))
+app = AppTest.from_file("app.py", default_timeout=60).run()
+print(f"{time.perf_counter() - start:.3f}", len(app.exception))
+for e in app.exception:
+    print(e.message.splitlines()[0])
+"""
+
+
+def page_imports(path="app.py"):
+    """app.py's module-level import statements, as one line of code."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "; ".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def steps():
+    page = page_imports()
+    return {
+        "page": page,
+        "stream": page + "; import src.processor, src.backends; from src.backends import load_backend; load_backend()",
+    }
+
+
+def import_breakdown(code):
+    """{top-level package: cumulative seconds} from -X importtime, plus wall time."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return None, wall, proc.stderr.strip().splitlines()[-1]
+
+    totals = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" ") or name.startswith("  "):
+            continue  # Only top-level imports; nested ones are inside their parent's total
+        totals[name.strip().split(".")[0]] += int(cumulative) / 1e6
+    return totals, wall, None
+
+
+def main():
+    for step, code in steps().items():
+        totals, wall, error = import_breakdown(code)
+        print(f"\n[{step}] {wall:.2f} s wall")
+        if error:
+            print(f"  failed: {error}")
+            continue
+        for name, seconds in sorted(totals.items(), key=lambda kv: -kv[1])[:12]:
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    proc = subprocess.run([sys.executable, "-c", RENDER], capture_output=True, text=True)
+    if proc.returncode == 0:
+        lines = proc.stdout.splitlines()
+        seconds, errors = lines[0].split()
+        print(f"\n[render] first script run: {float(seconds):.2f} s ({errors} exceptions)")
+        for line in lines[1:]:
+            print(f"  {line}")
+    else:
+        print(f"\n[render] failed: {proc.stderr.strip().splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main()
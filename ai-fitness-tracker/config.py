@@ -3,12 +3,111 @@
 # Model Path (Ensure this file is in your root or download logic is handled)
 MODEL_PATH = 'yolo11n-pose.pt' 
 
-# Counting Thresholds (Angles in degrees)
+# Inference Backend (see src/backends.py for exporting the model)
+INFERENCE_BACKEND = 'ultralytics'  # 'ultralytics' (PyTorch .pt) | 'onnxruntime' (.onnx) | 'openvino' (model dir)
+INFERENCE_THREADS = 0        # CPU threads per model slot (0 = library default)
+
+# Model Pool (weights loaded once per process, shared by all sessions)
+MODEL_POOL_SIZE = 2          # Concurrent inference slots
+MODEL_WARMUP = True          # Run one dummy inference per slot at startup
+MODEL_PRELOAD = True         # Load the model in the background right after the first page render
+TRACKER_CFG = 'botsort.yaml' # Ultralytics tracker config (state is kept per session)
+
+# Inference Scheduler (micro-batches frames from all sessions)
+BATCH_MAX_SIZE = 8           # Frames per forward pass
+BATCH_MAX_WAIT = 0.015       # Seconds the first frame of a batch waits for more frames
+INFERENCE_TIMEOUT = 1.0      # Seconds the inference stage waits for its result before skipping the frame
+
+# Inference Fleet (worker processes with their own model; 0 = in-process pool + scheduler above)
+FLEET_WORKERS = 0            # Worker processes, e.g. cores / 4; each session sticks to one
+FLEET_THREADS = 0            # CPU threads per worker (0 = host cores / FLEET_WORKERS)
+FLEET_PIN_CPUS = True        # Give each worker its own share of the cores (Linux)
+FLEET_SLOTS = 8              # Shared-memory frame slots per worker (frames in flight)
+FLEET_MAX_FRAME = (1080, 1920)  # Largest frame (h, w) a slot holds; larger frames are skipped
+FLEET_START_TIMEOUT = 120.0  # Seconds to wait for the first worker to load its model
+FLEET_MAX_BACKOFF = 30.0     # Longest delay before restarting a worker that keeps crashing
+
+# Frame Pipeline (capture -> inference -> render, latest frame wins)
+PIPELINE_WORKERS = 32        # Shared inference-stage threads (at most one busy per session)
+OVERLAY_MAX_AGE = 1.0        # Seconds a skeleton is reused on later frames before it is hidden
+OVERLAY_ON_SKIPPED = True    # Draw the overlay on skipped frames too (False = return them untouched, no conversion)
+PIPELINE_ERROR_LOG_INTERVAL = 10.0  # Seconds between logs of repeated analysis errors (the first is always logged)
+
+# Region of Interest (crop around the tracked main person before inference)
+ROI_ENABLED = True
+ROI_SIZE = 320               # Inference size for crops (full frames use the model default)
+ROI_MARGIN = 0.25            # Context added around the last box, as a fraction of its size
+ROI_REDETECT_EVERY = 15      # Processed frames between full-frame re-detections
+
+# Adaptive Frame Skipping (per-session inference rate)
+SKIP_MIN_FPS = 3             # Inference rate while the arms are still
+SKIP_MAX_FPS = 15            # Inference rate during fast movement / mid-rep
+CPU_BUDGET = 0.85            # Fraction of host cores inference may keep busy
+STILL_SPEED = 0.2            # Arm speed (shoulder widths / s) treated as idle
+FAST_SPEED = 1.0             # Arm speed at which the max rate is used
+
+# Voice Feedback (spoken on the server, e.g. a kiosk running the app locally)
+SPEECH_ENABLED = False
+SPEECH_CACHE_DIR = '.speech_cache'  # Pre-rendered phrase WAVs
+SPEECH_MAX_COUNT = 50        # Pre-render "Left/Right/Combine N" up to this N
+SPEECH_RATE = 150            # Words per minute
+SPEECH_VOICE = 1             # Index into the installed voices
+
+# Voice Commands (offline keyword spotting for "normal" / "combine" / "stop")
+VOICE_RATE = 16000           # Microphone sample rate (Hz)
+VOICE_CHUNK_MS = 30          # Audio chunk size fed to the voice-activity gate
+VOICE_CALIBRATE_MS = 1000    # Ambient noise calibration, done once at start
+VOICE_VAD_FACTOR = 3.0       # Speech = chunk RMS above noise floor x factor...
+VOICE_VAD_MIN_RMS = 300      # ...and above this absolute level
+VOICE_HANGOVER_MS = 300      # Silence that ends an utterance
+VOICE_MAX_UTTERANCE_MS = 3000
+VOICE_KEYWORD_SENSITIVITY = 0.8  # PocketSphinx keyword threshold (0-1)
+
+# Counting Thresholds (Angles in degrees; tune against labelled traces with python -m src.calibrate)
 UP_THRESH = 150   # Arm fully extended
 DOWN_THRESH = 90  # Arm curled up
 
+# Exercises (angle rules as data; bicep_curl uses the two thresholds above)
+EXERCISE_LIBRARY = 'exercises.yaml'  # Relative to this folder
+EXERCISE = 'bicep_curl'              # Default exercise (the sidebar can change it)
+
 # Colors (BGR Format for OpenCV)
 COLOR_TEXT_MAIN = (0, 255, 0)   # Green
 COLOR_TEXT_COUNT = (255, 0, 0)  # Blue
 COLOR_LINE = (255, 255, 255)    # White
-COLOR_JOINT = (0, 255, 255)     # Yellow
\ No newline at end of file
+COLOR_JOINT = (0, 255, 255)     # Yellow
+
+# Overlay Rendering
+LABEL_CACHE_SIZE = 256          # Pre-rasterized label sprites kept (LRU)
+LABEL_OPACITY = 1.0             # Label box opacity (1.0 = solid, text is always solid)
+
+# Keypoint Smoothing (One-Euro filter between the model and the counter)
+SMOOTH_ENABLED = True
+SMOOTH_MIN_CUTOFF = 1.0      # Hz; lower = smoother while still
+SMOOTH_BETA = 0.05           # Cutoff increase per px/s of speed; higher = less lag when moving
+SMOOTH_D_CUTOFF = 1.0        # Hz; smoothing of the speed estimate
+SMOOTH_MIN_CONF = 0.5        # Keypoints below this confidence are predicted, not measured
+SMOOTH_MAX_GAP = 0.5         # Seconds a keypoint is predicted without a measurement
+
+# Metrics (Prometheus text at http://<host>:METRICS_PORT/metrics, sampling profiler at /profile)
+METRICS_PORT = 9108          # 0 = no endpoint (stage timers still run)
+METRICS_HOST = '127.0.0.1'   # '0.0.0.0' to let a remote Prometheus scrape it
+METRICS_PANEL = False        # Show the per-session debug panel in the app
+METRICS_PROFILE_HZ = 100     # Stack samples per second while the profiler is on
+
+# Group Mode (count every tracked person in view)
+MULTI_PERSON = False         # Default for the sidebar switch
+MULTI_MAX_PEOPLE = 16        # Counter rows; the largest people are counted beyond this
+MULTI_STALE_SECONDS = 5.0    # A track unseen this long is dropped and its row reused
+
+# Workout History (append-only SQLite log of every rep)
+HISTORY_ENABLED = True
+HISTORY_DB = 'workouts.db'
+HISTORY_DEFAULT_USER = 'guest'
+HISTORY_BATCH_SIZE = 500     # Events per transaction
+HISTORY_FLUSH_SECONDS = 1.0  # Longest an event waits before being committed
+HISTORY_MAX_BACKLOG = 100000 # Queued events before new ones are dropped
+
+# Pose Traces (model output saved for re-analysis without inference, see src/trace.py)
+TRACE_DIR = ''               # Folder for one .posetrace file per session ('' = off)
+TRACE_FLOAT16 = False        # Half-size traces (about 0.5 px of rounding on a 1080p frame)
@@ -0,0 +1,257 @@
+# src/backends.py
+"""
+Pose inference backends. Every backend takes a list of BGR frames and
+returns one PoseFrame per frame, so the pool, scheduler and offline CLI do
+not care what runs the network.
+
+    ultralytics   YOLO() on MODEL_PATH: PyTorch .pt weights (or any export ultralytics can load)
+    onnxruntime   an exported .onnx model (FP32, FP16 or INT8-quantized)
+    openvino      an exported OpenVINO model directory or .xml (FP32, FP16 or INT8)
+
+Export the model once (needs ultralytics; --int8 quantizes):
+
+    python -m src.backends export --format openvino --int8
+    python -m src.backends export --format onnx --int8
+"""
+import argparse
+import copy
+import glob
+import os
+
+import cv2
+import numpy as np
+
+import config
+from src.pose import NUM_KEYPOINTS, PoseFrame
+
+BACKENDS = ("ultralytics", "onnxruntime", "openvino")
+
+# Post-processing defaults, as in ultralytics predict()
+CONF_THRESH = 0.25
+IOU_THRESH = 0.7
+MAX_DET = 300
+KPT_VISIBLE = 0.5  # ultralytics reports keypoints below this confidence as (0, 0)
+PAD_VALUE = 114
+
+
+class UltralyticsBackend:
+    """ultralytics YOLO model: PyTorch weights or any exported format it can load."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path, threads=0):
+        from ultralytics import YOLO
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model_path = model_path
+        self.model = YOLO(model_path)
+
+    def clone(self):
+        # Shares the network; the lazily built predictor is private to the copy
+        twin = copy.copy(self)
+        twin.model = copy.copy(self.model)
+        return twin
+
+    def predict(self, images, imgsz=None):
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        results = self.model.predict(images, verbose=False, **kwargs)
+        return [PoseFrame.from_result(r) for r in results]
+
+
+class _ExportedBackend:
+    """
+    Shared pre/post-processing for raw exported YOLO pose graphs:
+    letterbox -> network -> (B, 5 + 3K, anchors) -> confidence filter + NMS.
+    Models exported with a fixed input size always run at that size;
+    dynamic ones use imgsz (or 640).
+    """
+
+    name = None
+
+    def __init__(self, model_path, threads=0):
+        self.model_path = model_path
+        self.threads = threads
+        self.input_size = None    # (h, w) when fixed by the export
+        self.dynamic_batch = False
+        self.dtype = np.float32
+
+    def clone(self):
+        return self  # Sessions are safe to share between threads
+
+    def _run(self, batch):
+        raise NotImplementedError
+
+    def predict(self, images, imgsz=None):
+        if not images:
+            return []
+        size = self.input_size or (imgsz or 640,) * 2
+        size = (size, size) if np.isscalar(size) else tuple(size)
+        batch = np.empty((len(images), 3) + size, self.dtype)
+        transforms = [self._letterbox(img, size, batch[i]) for i, img in enumerate(images)]
+
+        if self.dynamic_batch:
+            outputs = self._run(batch)
+        else:
+            outputs = np.concatenate([self._run(batch[i:i + 1]) for i in range(len(images))])
+        return [self._decode(out, t, img.shape) for out, t, img in zip(outputs, transforms, images)]
+
+    @staticmethod
+    def _letterbox(img, size, out):
+        """Resizes keeping aspect, pads to size; writes CHW RGB [0, 1] into out."""
+        h, w = img.shape[:2]
+        r = min(size[0] / h, size[1] / w)
+        nh, nw = int(round(h * r)), int(round(w * r))
+        top, left = int(round((size[0] - nh) / 2 - 0.1)), int(round((size[1] - nw) / 2 - 0.1))
+        canvas = np.full(size + (3,), PAD_VALUE, np.uint8)
+        canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        out[:] = canvas[..., ::-1].transpose(2, 0, 1)
+        out *= 1.0 / 255.0
+        return r, left, top
+
+    @staticmethod
+    def _decode(out, transform, shape):
+        """(5 + 3K, anchors) raw output -> PoseFrame in source-image pixels."""
+        r, left, top = transform
+        pred = out.T.astype(np.float32)
+        pred = pred[pred[:, 4] > CONF_THRESH]
+        if len(pred) == 0:
+            return PoseFrame.empty(shape)
+
+        # NMSBoxes wants (x, y, w, h) with x, y the top-left corner
+        xywh = np.c_[pred[:, :2] - pred[:, 2:4] / 2, pred[:, 2:4]]
+        keep = cv2.dnn.NMSBoxes(xywh.tolist(), pred[:, 4].tolist(), CONF_THRESH, IOU_THRESH)
+        keep = np.asarray(keep, np.intp).reshape(-1)[:MAX_DET]
+        pred = pred[keep]
+
+        h, w = shape[:2]
+        boxes = np.c_[pred[:, :2] - pred[:, 2:4] / 2, pred[:, :2] + pred[:, 2:4] / 2]
+        boxes = (boxes - [left, top, left, top]) / r
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+
+        kpts = pred[:, 5:5 + 3 * NUM_KEYPOINTS].reshape(-1, NUM_KEYPOINTS, 3)
+        xy = (kpts[..., :2] - [left, top]) / r
+        xy[..., 0] = xy[..., 0].clip(0, w)
+        xy[..., 1] = xy[..., 1].clip(0, h)
+        conf = kpts[..., 2]
+        xy[conf < KPT_VISIBLE] = 0.0
+
+        return PoseFrame(boxes.astype(np.float32), pred[:, 4].copy(), np.full(len(pred), -1, np.int64),
+                         xy.astype(np.float32), conf.astype(np.float32), shape)
+
+
+class OnnxBackend(_ExportedBackend):
+    """ONNX Runtime on CPU, with explicit intra-/inter-op thread counts."""
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path, threads=0):
+        import onnxruntime as ort
+
+        super().__init__(model_path, threads)
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, opts, providers=["CPUExecutionProvider"])
+
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.dtype = np.float16 if "float16" in inp.type else np.float32
+        if all(isinstance(d, int) for d in inp.shape[2:]):
+            self.input_size = tuple(inp.shape[2:])
+        self.dynamic_batch = not isinstance(inp.shape[0], int)
+
+    def _run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    """OpenVINO on CPU. Each clone has its own infer request on the shared compiled model."""
+
+    name = "openvino"
+
+    def __init__(self, model_path, threads=0):
+        import openvino as ov
+
+        super().__init__(model_path, threads)
+        if os.path.isdir(model_path):
+            model_path = glob.glob(os.path.join(model_path, "*.xml"))[0]
+        core = ov.Core()
+        model = core.read_model(model_path)
+        shape = model.input(0).get_partial_shape()
+        if shape[2].is_static and shape[3].is_static:
+            self.input_size = (shape[2].get_length(), shape[3].get_length())
+        self.dynamic_batch = shape[0].is_dynamic
+
+        ov_config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            ov_config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(model, "CPU", ov_config)
+        self.request = self.compiled.create_infer_request()
+
+    def clone(self):
+        twin = copy.copy(self)
+        twin.request = self.compiled.create_infer_request()
+        return twin
+
+    def _run(self, batch):
+        self.request.infer({0: batch})
+        return self.request.get_output_tensor(0).data.copy()
+
+
+def load_backend(name=None, model_path=None, threads=None):
+    """Backend instance from config (INFERENCE_BACKEND / MODEL_PATH / INFERENCE_THREADS) or arguments."""
+    name = name or config.INFERENCE_BACKEND
+    model_path = model_path or config.MODEL_PATH
+    threads = config.INFERENCE_THREADS if threads is None else threads
+    if name == "ultralytics":
+        return UltralyticsBackend(model_path, threads)
+    if name == "onnxruntime":
+        return OnnxBackend(model_path, threads)
+    if name == "openvino":
+        return OpenVinoBackend(model_path, threads)
+    raise ValueError(f"Unknown inference backend {name!r}, expected one of {BACKENDS}")
+
+
+def export(weights, fmt, int8=False, imgsz=640, data="coco8-pose.yaml", dynamic=True):
+    """
+    Exports PyTorch weights for the onnxruntime / openvino backends and
+    returns the exported path. OpenVINO INT8 uses ultralytics' calibrated
+    post-training quantization on `data`; ONNX INT8 is ONNX Runtime's
+    dynamic quantization of the FP32 export.
+    dynamic=True exports a dynamic batch axis, so the scheduler's batches
+    run as one call; a static export is run one image at a time.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    if fmt == "openvino":
+        return model.export(format="openvino", imgsz=imgsz, int8=int8, data=data if int8 else None, dynamic=dynamic)
+    if fmt != "onnx":
+        raise ValueError(f"Unknown export format {fmt!r}")
+
+    path = model.export(format="onnx", imgsz=imgsz, simplify=True, dynamic=dynamic)
+    if not int8:
+        return path
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out = path.replace(".onnx", "_int8.onnx")
+    quantize_dynamic(path, out, weight_type=QuantType.QUInt8)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the pose model for the exported-model backends.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export")
+    exp.add_argument("--weights", default="yolo11n-pose.pt")
+    exp.add_argument("--format", choices=("onnx", "openvino"), default="openvino")
+    exp.add_argument("--int8", action="store_true")
+    exp.add_argument("--imgsz", type=int, default=640)
+    exp.add_argument("--dynamic", action=argparse.BooleanOptionalAction, default=True,
+                     help="Dynamic batch axis (--no-dynamic for a fixed batch of 1)")
+    args = parser.parse_args()
+    print(export(args.weights, args.format, args.int8, args.imgsz, dynamic=args.dynamic))
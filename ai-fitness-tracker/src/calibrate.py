@@ -0,0 +1,296 @@
+# src/calibrate.py
+"""
+Calibration of the rep counter against labelled recordings: sweeps the
+counting thresholds, the inference rate and the keypoint smoothing over
+pose traces with known rep counts, and suggests the best settings per mode.
+
+    python -m src.calibrate traces/*.posetrace --up 130:170:5 --down 60:110:5 \\
+        --fps 0 5 10 15 --min-cutoff 0 0.5 1 2 --beta 0.02 0.05 --out results/calibration.csv
+
+Each trace needs its true counts next to it, in the load test's format:
+traces/curls.json = {"mode": "normal", "left": 12, "right": 11, "combine": 0},
+optionally with "count_on": "extend" (default --count-on).
+
+What is swept:
+- UP_THRESH / DOWN_THRESH: every (up, down) pair with up > down, vectorized
+  over the pairs in one pass per trace (count_sweep);
+- the inference rate cap (--fps, 0 = every recorded frame): inference sees
+  the first frame of each 1/fps interval;
+- smoothing (SMOOTH_MIN_CUTOFF / SMOOTH_BETA; a min cutoff of 0 is off):
+  the live KeypointFilter over the main person's arm joints.
+Each (trace, rate, smoothing) combination is one job for the process pool.
+
+Per setting and mode it reports the count error summed over the traces,
+the share of traces counted exactly, the rep latency (how much later each
+rep is counted than by the full-rate, unsmoothed counter with the same
+thresholds) and the inference rate used. It prints the best setting per
+mode and an accuracy/latency table (best thresholds per rate and
+smoothing). Among the most accurate settings it suggests the lowest
+inference rate whose latency stays within --max-delay-ms, as a floor for
+SKIP_MAX_FPS (the sweep uses fixed rates, the app an adaptive one).
+--out writes every setting as CSV.
+"""
+import argparse
+import csv
+import glob
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import config
+from src.counter import count_sweep
+from src.smoothing import KeypointFilter
+from src.trace import PoseTrace, largest
+from src.utils import ARM_JOINTS, JointAngles
+
+COLUMNS = {"normal": [0, 1], "combine": [2]}
+SIDES = ("left", "right", "combine")
+FIELDS = ["mode", "fps", "min_cutoff", "beta", "up", "down", "abs_error", "exact", "delay_ms", "inference_fps"]
+
+_recordings = {}  # path -> main person's arm joints, loaded once per worker process
+
+
+def _load(path):
+    """(times, (n, 6, 2) arm joints, (n, 6) confidences, (n,) track ids) of the largest person; NaN: nobody."""
+    rec = _recordings.get(path)
+    if rec is not None:
+        return rec
+    trace = PoseTrace(path)
+    n = len(trace)
+    times = trace.times.copy()
+    kps = np.full((n, len(ARM_JOINTS), 2), np.nan, np.float32)
+    conf = np.zeros((n, len(ARM_JOINTS)), np.float32)
+    ids = np.full(n, -1, np.int64)
+    for k, chunk in enumerate(trace.chunks()):
+        main = largest(chunk)
+        found = np.flatnonzero(main >= 0)
+        at = int(trace.chunk_starts[k]) + found
+        rows = main[found]
+        kps[at] = chunk["keypoints"][rows][:, ARM_JOINTS]
+        conf[at] = chunk["kpt_conf"][rows][:, ARM_JOINTS]
+        ids[at] = chunk["ids"][rows]
+    trace.close()
+    rec = _recordings[path] = (times, kps, conf, ids)
+    return rec
+
+
+def _keep(times, fps):
+    """Frames inference would see at a rate cap of `fps` (0: all): the first of each 1/fps interval."""
+    if not fps or len(times) == 0:
+        return np.arange(len(times))
+    return np.unique(np.floor((times - times[0]) * fps), return_index=True)[1]
+
+
+def _smooth(times, kps, conf, ids, min_cutoff, beta):
+    """The arm joints through a KeypointFilter, reset when the main person changes (as the processor does)."""
+    if not min_cutoff:
+        return kps
+    out = kps.copy()
+    f, main = KeypointFilter(min_cutoff, beta, num_keypoints=kps.shape[1]), None
+    for i in np.flatnonzero(~np.isnan(kps[:, 0, 0])):
+        if ids[i] != main:
+            main = ids[i]
+            f.reset()
+        out[i] = f.update(kps[i], conf[i], times[i])
+    return out
+
+
+def run_job(path, mode, count_on, fps, min_cutoff, beta, up, down):
+    """
+    One trace at one rate cap and smoothing, every threshold pair.
+    Returns (rep times, pairs, columns) of every rep counted, the number
+    of frames inference saw and the trace's duration in seconds.
+    """
+    times, kps, conf, ids = _load(path)
+    keep = _keep(times, fps)
+    t = times[keep]
+    arms = _smooth(t, kps[keep], conf[keep], ids[keep], min_cutoff, beta)
+    angles = JointAngles(np.arange(len(ARM_JOINTS)).reshape(2, 3))(arms)
+    frames, pairs, cols = count_sweep(mode, angles, up, down, count_on)
+    duration = float(times[-1] - times[0]) if len(times) > 1 else 0.0
+    return t[frames], pairs, cols, len(keep), duration
+
+
+def _delays(reps, reference, pairs):
+    """Per pair: (summed delay in s, reps matched): each (pair, column)'s k-th rep against the reference's k-th."""
+    def ranked(times, p, c):
+        key = p * 3 + c
+        order = np.lexsort((times, key))
+        key = key[order]
+        return key, np.arange(len(key)) - np.searchsorted(key, key), times[order]
+
+    key, rank, t = ranked(*reps)
+    ref_key, ref_rank, ref_t = ranked(*reference)
+    width = int(max(rank.max(initial=-1), ref_rank.max(initial=-1))) + 1
+    table = np.full(3 * pairs * width, np.nan)
+    table[ref_key * width + ref_rank] = ref_t
+    delay = t - table[key * width + rank]
+    ok = ~np.isnan(delay)
+    return (np.bincount(key[ok] // 3, delay[ok], pairs), np.bincount(key[ok] // 3, minlength=pairs))
+
+
+def _smoothing(row):
+    return f"{row['min_cutoff']:g}/{row['beta']:g}" if row["min_cutoff"] else "off"
+
+
+def parse_values(specs):
+    """Sorted unique values from "start:stop:step" (inclusive) ranges and plain numbers."""
+    values = []
+    for spec in specs:
+        if ":" in spec:
+            start, stop, step = (float(v) for v in spec.split(":"))
+            values.extend(np.arange(start, stop + step / 2, step).tolist())
+        else:
+            values.append(float(spec))
+    return sorted(set(values))
+
+
+def load_truth(path):
+    """The trace's sidecar ground truth, or None."""
+    truth_path = os.path.splitext(path)[0] + ".json"
+    if not os.path.exists(truth_path):
+        return None
+    with open(truth_path, encoding="utf-8") as f:
+        truth = json.load(f)
+    if truth.get("mode", "normal") not in COLUMNS:
+        raise ValueError(f"{truth_path}: mode must be 'normal' or 'combine'")
+    return truth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep rep-counter settings over labelled pose traces.")
+    parser.add_argument("traces", nargs="+", help=".posetrace files or glob patterns (with a .json of true counts)")
+    parser.add_argument("--up", nargs="+", default=["130:170:5"], help="UP_THRESH values or start:stop:step")
+    parser.add_argument("--down", nargs="+", default=["60:110:5"], help="DOWN_THRESH values or start:stop:step")
+    parser.add_argument("--fps", nargs="+", default=["0"], help="Inference rate caps (0: every recorded frame)")
+    parser.add_argument("--min-cutoff", nargs="+", default=["0", str(config.SMOOTH_MIN_CUTOFF)],
+                        help="SMOOTH_MIN_CUTOFF values (0: no smoothing)")
+    parser.add_argument("--beta", nargs="+", default=[str(config.SMOOTH_BETA)], help="SMOOTH_BETA values")
+    parser.add_argument("--count-on", choices=["curl", "extend"], default="curl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-delay-ms", type=float, default=100.0,
+                        help="Rep latency allowed before a lower inference rate stops being preferred")
+    parser.add_argument("--top", type=int, default=5, help="Settings listed per mode")
+    parser.add_argument("--out", help="Write every setting's scores to this CSV file")
+    args = parser.parse_args(argv)
+
+    paths = sorted({p for pattern in args.traces for p in (glob.glob(pattern) or [pattern])})
+    truths = {}
+    for p in paths:
+        truth = load_truth(p)
+        if truth is None:
+            print(f"SKIPPED {p}: no {os.path.splitext(p)[0]}.json with the true counts")
+        else:
+            truths[p] = truth
+    if not truths:
+        raise SystemExit("No labelled traces")
+
+    # Threshold pairs (vectorized in each job) and the rate x smoothing combinations (one job each)
+    up, down = np.meshgrid(parse_values(args.up), parse_values(args.down), indexing="ij")
+    valid = up > down
+    up, down = up[valid].astype(np.float32), down[valid].astype(np.float32)
+    pairs = len(up)
+    smoothing = sorted({(0.0, 0.0) if not c else (c, b)
+                        for c, b in itertools.product(parse_values(args.min_cutoff), parse_values(args.beta))})
+    # The full-rate, unsmoothed run is the latency reference, so it is always included
+    combos = sorted(set(itertools.product(parse_values(args.fps), smoothing)) | {(0.0, (0.0, 0.0))})
+    print(f"{len(truths)} traces x {len(combos)} rate/smoothing combinations x {pairs} threshold pairs "
+          f"= {len(truths) * len(combos) * pairs} evaluations")
+
+    start = time.perf_counter()
+    results = {}  # (path, fps, smoothing) -> run_job output
+    with ProcessPoolExecutor(min(args.workers, len(truths) * len(combos))) as pool:
+        jobs = {
+            pool.submit(run_job, p, truths[p].get("mode", "normal"), truths[p].get("count_on", args.count_on),
+                        fps, c, b, up, down): (p, fps, (c, b))
+            for p in truths for fps, (c, b) in combos
+        }
+        for job in as_completed(jobs):
+            try:
+                results[jobs[job]] = job.result()
+            except Exception as e:
+                print(f"FAILED {jobs[job]}: {e}")
+    frames = sum(r[3] for r in results.values())
+    wall = time.perf_counter() - start
+    print(f"{len(results)} jobs in {wall:.1f}s: {frames * pairs / wall:,.0f} frame-settings/s")
+
+    # Scores per (mode, rate, smoothing), each an array over the threshold pairs
+    scores = {}
+    for (p, fps, smooth), (t, p_idx, cols, kept, duration) in results.items():
+        reference = results.get((p, 0.0, (0.0, 0.0)))
+        if reference is None:
+            continue
+        truth = truths[p]
+        mode = truth.get("mode", "normal")
+        counts = np.bincount(p_idx * 3 + cols, minlength=3 * pairs).reshape(pairs, 3)
+        want = np.array([int(truth.get(SIDES[c], 0)) for c in COLUMNS[mode]])
+        error = np.abs(counts[:, COLUMNS[mode]] - want).sum(axis=1)
+        delay, matched = _delays((t, p_idx, cols), reference[:3], pairs)
+
+        s = scores.setdefault((mode, fps, smooth), {"error": 0, "exact": 0, "traces": 0, "delay": 0.0,
+                                                     "matched": 0, "frames": 0, "seconds": 0.0})
+        s["error"] = s["error"] + error
+        s["exact"] = s["exact"] + (error == 0)
+        s["traces"] += 1
+        s["delay"] = s["delay"] + delay
+        s["matched"] = s["matched"] + matched
+        s["frames"] += kept
+        s["seconds"] += duration
+
+    rows = []
+    for (mode, fps, (c, b)), s in sorted(scores.items()):
+        delay_ms = 1000.0 * s["delay"] / np.maximum(s["matched"], 1)
+        rate = s["frames"] / s["seconds"] if s["seconds"] else 0.0
+        for g in range(pairs):
+            rows.append({"mode": mode, "fps": fps, "min_cutoff": c, "beta": b, "up": float(up[g]),
+                         "down": float(down[g]), "abs_error": int(s["error"][g]),
+                         "exact": round(float(s["exact"][g]) / s["traces"], 3),
+                         "delay_ms": round(float(delay_ms[g]), 1), "inference_fps": round(rate, 2)})
+
+    # Best: fewest miscounted reps, then the lowest inference rate within the latency budget,
+    # then least latency; ties go to the thresholds closest to the current ones
+    rank = lambda r: (r["abs_error"], r["delay_ms"] > args.max_delay_ms, r["inference_fps"], r["delay_ms"],
+                      abs(r["up"] - config.UP_THRESH) + abs(r["down"] - config.DOWN_THRESH))
+    for mode in sorted({r["mode"] for r in rows}):
+        mine = sorted((r for r in rows if r["mode"] == mode), key=rank)
+        n = next(s["traces"] for (m, _, _), s in scores.items() if m == mode)
+        print(f"\n{mode} ({n} traces): best settings")
+        for r in mine[:args.top]:
+            print(f"  up {r['up']:5.1f}  down {r['down']:5.1f}  fps {r['fps'] or 'all':>4}  "
+                  f"smoothing {_smoothing(r):>9}  error {r['abs_error']:3d}  "
+                  f"exact {r['exact']:.0%}  delay {r['delay_ms']:6.1f} ms  {r['inference_fps']:5.1f} inferences/s")
+
+        print("  accuracy / latency by rate and smoothing (best thresholds each):")
+        best = {}
+        for r in mine:
+            best.setdefault((r["fps"], r["min_cutoff"], r["beta"]), r)
+        for (fps, c, b), r in sorted(best.items()):
+            print(f"    fps {fps or 'all':>4}  smoothing {_smoothing(r):>9}  error {r['abs_error']:3d}  "
+                  f"delay {r['delay_ms']:6.1f} ms  (up {r['up']:.0f}, down {r['down']:.0f})")
+
+        top = mine[0]
+        print(f"  suggested config.py: UP_THRESH = {top['up']:g}, DOWN_THRESH = {top['down']:g}"
+              + (f", SMOOTH_ENABLED = True, SMOOTH_MIN_CUTOFF = {top['min_cutoff']:g}, SMOOTH_BETA = {top['beta']:g}"
+                 if top["min_cutoff"] else ", SMOOTH_ENABLED = False"))
+        # The sweep caps the rate at a fixed value; the app's skipper moves between SKIP_MIN_FPS
+        # and SKIP_MAX_FPS, running at the maximum mid-rep, so the fixed rate is a floor for the latter
+        if top["fps"]:
+            print(f"  inference rate: {top['fps']:g} fps fixed-rate equivalent, so SKIP_MAX_FPS >= "
+                  f"{max(top['fps'], config.SKIP_MIN_FPS):g} (the mid-rep rate; currently {config.SKIP_MAX_FPS:g})")
+        else:
+            print("  inference rate: every recorded frame was needed; keep SKIP_MAX_FPS at the camera's frame rate")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
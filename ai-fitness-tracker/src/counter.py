@@ -0,0 +1,296 @@
+# src/counter.py
+import operator
+
+import numpy as np
+
+import config
+
+# Rep bits returned by update(): which counters went up on this frame
+REP_LEFT = 1
+REP_RIGHT = 2
+REP_COMBINE = 4
+# REP_SIDES[bits] -> counter names, precomputed so callers never build lists
+REP_SIDES = tuple(
+    tuple(name for bit, name in ((REP_LEFT, "left"), (REP_RIGHT, "right"), (REP_COMBINE, "combine")) if bits & bit)
+    for bits in range(8)
+)
+
+MODE_NONE = 0
+MODE_NORMAL = 1
+MODE_COMBINE = 2
+
+
+def parse_mode(mode):
+    """Maps a mode label ("Normal (Single Arm)", "combine", ...) to a MODE_* constant."""
+    mode = (mode or "").lower()
+    if "normal" in mode:
+        return MODE_NORMAL
+    if "combine" in mode:
+        return MODE_COMBINE
+    return MODE_NONE
+
+
+def _rules(up_thresh, down_thresh, count_on):
+    """
+    (arm test, arm threshold, fire test, fire threshold) for a direction.
+    count_on="curl":   armed when extended (> up), counted when curled (< down). App.
+    count_on="extend": armed when curled (<= down), counted when extended (>= up).
+                       This is the research script's direction.
+    """
+    if count_on == "curl":
+        return operator.gt, up_thresh, operator.lt, down_thresh
+    if count_on == "extend":
+        return operator.le, down_thresh, operator.ge, up_thresh
+    raise ValueError(f"count_on must be 'curl' or 'extend', not {count_on!r}")
+
+
+class RepCounter:
+    """
+    Bicep-curl rep counting state machine, driven by an elbow-angle stream.
+    States (0: not armed, 1: armed). The mode is resolved once, here, into
+    the bound `update` method; update() keeps no per-frame allocations and
+    returns REP_* bits for the counters that went up (0 for none).
+    """
+
+    __slots__ = (
+        "mode", "up_thresh", "down_thresh", "count_on",
+        "count_left", "count_right", "count_combine",
+        "state_left", "state_right", "state_combine",
+        "update", "_arm", "_arm_at", "_fire", "_fire_at",
+    )
+
+    def __init__(self, mode, up_thresh=None, down_thresh=None, count_on="curl"):
+        self.mode = parse_mode(mode)
+        self.up_thresh = config.UP_THRESH if up_thresh is None else up_thresh
+        self.down_thresh = config.DOWN_THRESH if down_thresh is None else down_thresh
+        self.count_on = count_on
+        self._arm, self._arm_at, self._fire, self._fire_at = _rules(self.up_thresh, self.down_thresh, count_on)
+
+        # Counters
+        self.count_left = 0
+        self.count_right = 0
+        self.count_combine = 0
+
+        # States
+        self.state_left = 0
+        self.state_right = 0
+        self.state_combine = 0
+
+        # Precompiled mode dispatch
+        self.update = {
+            MODE_NORMAL: self._update_normal,
+            MODE_COMBINE: self._update_combine,
+        }.get(self.mode, self._update_none)
+
+    def _update_normal(self, angle_left, angle_right):
+        arm, arm_at, fire, fire_at = self._arm, self._arm_at, self._fire, self._fire_at
+        reps = 0
+
+        # Left
+        if arm(angle_left, arm_at): self.state_left = 1
+        if fire(angle_left, fire_at) and self.state_left == 1:
+            self.state_left = 0
+            self.count_left += 1
+            reps |= REP_LEFT
+
+        # Right
+        if arm(angle_right, arm_at): self.state_right = 1
+        if fire(angle_right, fire_at) and self.state_right == 1:
+            self.state_right = 0
+            self.count_right += 1
+            reps |= REP_RIGHT
+
+        return reps
+
+    def _update_combine(self, angle_left, angle_right):
+        arm, arm_at, fire, fire_at = self._arm, self._arm_at, self._fire, self._fire_at
+        if arm(angle_left, arm_at) and arm(angle_right, arm_at):
+            self.state_combine = 1
+        if fire(angle_left, fire_at) and fire(angle_right, fire_at) and self.state_combine == 1:
+            self.state_combine = 0
+            self.count_combine += 1
+            return REP_COMBINE
+        return 0
+
+    def _update_none(self, angle_left, angle_right):
+        return 0
+
+    def reset_counts(self):
+        """Zeroes the counters, keeping the arm states."""
+        self.count_left = self.count_right = self.count_combine = 0
+
+    def counts(self):
+        return {"left": self.count_left, "right": self.count_right, "combine": self.count_combine}
+
+
+class CounterBank:
+    """
+    Rep counters for many sessions (or people), updated in one vectorized call.
+    Row i holds one counter; columns are (left, right, combine). Each row has
+    its own mode and thresholds, resolved into masks when the row is set.
+    Scratch buffers are allocated once for `capacity` rows.
+    Gives exactly the same counts as RepCounter fed the same angles.
+    """
+
+    COLUMNS = ("left", "right", "combine")
+
+    def __init__(self, capacity, count_on="curl"):
+        self.capacity = capacity
+        self.count_on = count_on
+        self.counts = np.zeros((capacity, 3), np.int64)
+        self.states = np.zeros((capacity, 3), bool)
+        self.mode_mask = np.zeros((capacity, 3), bool)   # Columns a row's mode updates
+        self.up_thresh = np.full(capacity, float(config.UP_THRESH), np.float32)
+        self.down_thresh = np.full(capacity, float(config.DOWN_THRESH), np.float32)
+
+        if count_on == "curl":
+            self._arm, self._arm_at, self._fire, self._fire_at = np.greater, self.up_thresh, np.less, self.down_thresh
+        elif count_on == "extend":
+            self._arm, self._arm_at, self._fire, self._fire_at = np.less_equal, self.down_thresh, np.greater_equal, self.up_thresh
+        else:
+            raise ValueError(f"count_on must be 'curl' or 'extend', not {count_on!r}")
+
+        # Scratch
+        self._armed = np.empty((capacity, 3), bool)
+        self._fired = np.empty((capacity, 3), bool)
+        self._reps = np.empty((capacity, 3), bool)
+
+    def set_row(self, row, mode, up_thresh=None, down_thresh=None):
+        """(Re)initialises one row: counts and states cleared, mode compiled to a mask."""
+        mode = parse_mode(mode)
+        self.counts[row] = 0
+        self.states[row] = False
+        self.mode_mask[row] = (mode == MODE_NORMAL, mode == MODE_NORMAL, mode == MODE_COMBINE)
+        self.up_thresh[row] = config.UP_THRESH if up_thresh is None else up_thresh
+        self.down_thresh[row] = config.DOWN_THRESH if down_thresh is None else down_thresh
+
+    def update(self, angles, rows=None):
+        """
+        angles = (n, 2) float array of (left, right) elbow angles
+        rows   = (n,) row indices, or None for rows 0..n-1
+        Returns an (n, 3) bool view: True where a counter went up. The view is
+        overwritten by the next call.
+        """
+        n = len(angles)
+        if rows is None:
+            rows = slice(0, n)
+        arm_at = self._arm_at[rows, None]
+        fire_at = self._fire_at[rows, None]
+
+        armed, fired, reps = self._armed[:n], self._fired[:n], self._reps[:n]
+
+        # Per-arm tests in columns 0/1; combine (column 2) needs both arms
+        self._arm(angles, arm_at, out=armed[:, :2])
+        np.logical_and(armed[:, 0], armed[:, 1], out=armed[:, 2])
+        self._fire(angles, fire_at, out=fired[:, :2])
+        np.logical_and(fired[:, 0], fired[:, 1], out=fired[:, 2])
+
+        mask = self.mode_mask[rows]
+        np.logical_and(armed, mask, out=armed)
+        np.logical_and(fired, mask, out=fired)
+
+        # Arm first, then fire if armed (same order as RepCounter)
+        np.logical_or(self.states[rows], armed, out=armed)
+        np.logical_and(fired, armed, out=reps)
+        np.logical_and(armed, np.logical_not(reps, out=fired), out=armed)
+
+        self.states[rows] = armed
+        self.counts[rows] += reps
+        return reps
+
+
+def count_series(mode, angles, up_thresh=None, down_thresh=None, count_on="curl"):
+    """
+    Replays a whole (n, 2) elbow-angle series at once; NaN rows (nobody in
+    view) neither arm nor fire. Returns the (n, 3) running (left, right,
+    combine) counts, identical to feeding RepCounter frame by frame.
+    Arm and fire conditions never hold together (up > down), so a frame
+    counts a rep exactly when it fires and the last frame that armed or
+    fired before it armed.
+    """
+    up_thresh = config.UP_THRESH if up_thresh is None else up_thresh
+    down_thresh = config.DOWN_THRESH if down_thresh is None else down_thresh
+    arm, arm_at, fire, fire_at = _rules(up_thresh, down_thresh, count_on)
+    angles = np.asarray(angles, dtype=np.float32).reshape(-1, 2)
+    mode = parse_mode(mode)
+
+    with np.errstate(invalid="ignore"):
+        armed, fired = arm(angles, arm_at), fire(angles, fire_at)
+    if mode == MODE_COMBINE:
+        armed, fired = armed.all(axis=1, keepdims=True), fired.all(axis=1, keepdims=True)
+        columns = [2]
+    elif mode == MODE_NORMAL:
+        columns = [0, 1]
+    else:
+        return np.zeros((len(angles), 3), np.int64)
+
+    counts = np.zeros((len(angles), 3), np.int64)
+    for k, col in enumerate(columns):
+        events = np.flatnonzero(armed[:, k] | fired[:, k])
+        is_fire = fired[events, k]
+        reps = np.zeros(len(angles), np.int64)
+        reps[events[1:][is_fire[1:] & ~is_fire[:-1]]] = 1
+        counts[:, col] = np.cumsum(reps)
+    return counts
+
+
+def count_sweep(mode, angles, up_thresh, down_thresh, count_on="curl"):
+    """
+    count_series for G threshold pairs at once: up_thresh and down_thresh
+    are (G,) arrays with up > down in every pair. Returns (frames, pairs,
+    columns): index arrays of every rep counted, in frame order;
+    np.bincount(pairs * 3 + columns, minlength=3 * G).reshape(G, 3) gives
+    the final counts.
+    A frame that fires counts a rep exactly when some frame since the
+    previous firing frame armed. For count_on="curl" that means the largest
+    arm-test angle in between is above `up`, so each distinct firing
+    threshold takes one pass over the frames (a segmented maximum between
+    its firing frames) and every `up` paired with it is then a comparison
+    per firing frame: O(frames x distinct thresholds), not x pairs.
+    "extend" is the mirror image (smallest angle at or below `down`).
+    """
+    up = np.asarray(up_thresh, dtype=np.float32).reshape(-1)
+    down = np.asarray(down_thresh, dtype=np.float32).reshape(-1)
+    arm, _, fire, _ = _rules(up, down, count_on)
+    angles = np.asarray(angles, dtype=np.float32).reshape(-1, 2)
+    mode = parse_mode(mode)
+    curl = count_on == "curl"
+    # Per pair: the firing threshold (one pass each) and the arming threshold (compared per firing frame)
+    fire_at, arm_at = (down, up) if curl else (up, down)
+    extreme = np.maximum if curl else np.minimum
+
+    with np.errstate(invalid="ignore"):
+        if mode == MODE_COMBINE:
+            # Both arms must pass: the worse arm decides each test
+            both_hi, both_lo = np.fmax(angles[:, 0], angles[:, 1]), np.fmin(angles[:, 0], angles[:, 1])
+            missing = np.isnan(angles).any(axis=1)
+            both_hi[missing] = both_lo[missing] = np.nan
+            signals = [(2, both_hi, both_lo) if curl else (2, both_lo, both_hi)]   # (column, fire test, arm test)
+        elif mode == MODE_NORMAL:
+            signals = [(0, angles[:, 0], angles[:, 0]), (1, angles[:, 1], angles[:, 1])]
+        else:
+            signals = []
+
+    found = []
+    for col, fire_x, arm_x in signals:
+        # NaN (nobody in view) never arms
+        arm_x = np.where(np.isnan(arm_x), np.float32(-np.inf if curl else np.inf), arm_x)
+        for level in np.unique(fire_at):
+            with np.errstate(invalid="ignore"):
+                fires = np.flatnonzero(fire(fire_x, level))
+            if len(fires) == 0:
+                continue
+            # Most-armed angle from after the previous firing frame up to this one (the
+            # firing frame itself can never arm, so including it changes nothing)
+            starts = np.concatenate([[0], fires[:-1] + 1])
+            peak = extreme.reduceat(arm_x[:fires[-1] + 1], starts)
+            members = np.flatnonzero(fire_at == level)
+            rep, k = np.nonzero(arm(peak[:, None], arm_at[members][None, :]))
+            found.append((fires[rep], members[k], np.full(len(rep), col)))
+
+    if not found:
+        empty = np.zeros(0, np.int64)
+        return empty, empty, empty
+    frames, pairs, cols = (np.concatenate(parts).astype(np.int64) for parts in zip(*found))
+    order = np.argsort(frames, kind="stable")
+    return frames[order], pairs[order], cols[order]
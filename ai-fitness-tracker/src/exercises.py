@@ -0,0 +1,268 @@
+# src/exercises.py
+import os
+import threading
+
+import numpy as np
+import yaml
+
+import config
+from src.counter import MODE_COMBINE, MODE_NONE, MODE_NORMAL, REP_COMBINE, REP_LEFT, REP_RIGHT, parse_mode
+from src.utils import JointAngles
+
+SIDES = ("left", "right", "combine")  # Counter columns of each exercise
+OPS = (">", ">=", "<", "<=")
+
+_library = None
+_lock = threading.Lock()
+
+
+class Exercise:
+    """
+    One library entry, checked and resolved: angle triplets per side,
+    phases as [(angle, op, threshold)] with hysteresis applied, and the
+    supported MODE_* values (the first is the default).
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.label = spec.get("label", name.replace("_", " ").title())
+        self.rep_label = spec.get("rep_label", "Combine")
+        self.hysteresis = float(spec.get("hysteresis", 0.0))
+
+        self.angles = {}
+        for angle, sides in (spec.get("angles") or {}).items():
+            sides = np.asarray(sides, dtype=np.intp)
+            if sides.shape != (2, 3) or sides.min() < 0:
+                raise ValueError(f"{name}: angle {angle!r} needs [left triplet, right triplet] of keypoint indices")
+            self.angles[angle] = sides
+        if not self.angles:
+            raise ValueError(f"{name}: no angles defined")
+
+        self.phases = []
+        for phase in spec.get("phases") or []:
+            terms = []
+            for angle, (op, threshold) in phase.items():
+                if angle not in self.angles:
+                    raise ValueError(f"{name}: phase uses undefined angle {angle!r}")
+                if op not in OPS:
+                    raise ValueError(f"{name}: {op!r} is not one of {', '.join(OPS)}")
+                if isinstance(threshold, str):
+                    if not hasattr(config, threshold):
+                        raise ValueError(f"{name}: no config constant {threshold!r}")
+                    threshold = getattr(config, threshold)
+                shift = self.hysteresis if op[0] == ">" else -self.hysteresis
+                terms.append((angle, op, float(threshold) + shift))
+            if not terms:
+                raise ValueError(f"{name}: empty phase")
+            self.phases.append(terms)
+        if len(self.phases) < 2:
+            raise ValueError(f"{name}: a rep needs at least two phases")
+
+        self.modes = [parse_mode(m) for m in spec.get("modes", ["normal", "combine"])]
+        if not self.modes or MODE_NONE in self.modes:
+            raise ValueError(f"{name}: modes must be 'normal' and/or 'combine'")
+
+        # The first angle is the one drawn, recorded and used for the in-rep band
+        self.primary = next(iter(self.angles))
+        self.joints = self.angles[self.primary].ravel()  # Left first/mid/end, then right
+        bounds = [t for terms in self.phases for angle, _, t in terms if angle == self.primary]
+        self.band = (min(bounds), max(bounds)) if bounds else (0.0, 180.0)
+
+    def mode(self, mode):
+        """The MODE_* to count in: `mode` (a label or MODE_*) if supported, else the default."""
+        mode = parse_mode(mode) if isinstance(mode, str) or mode is None else mode
+        return mode if mode in self.modes else self.modes[0]
+
+
+def load_library(path=None):
+    """{name: Exercise} from a YAML library (config.EXERCISE_LIBRARY by default), in file order."""
+    path = os.path.join(os.path.dirname(os.path.abspath(config.__file__)), path or config.EXERCISE_LIBRARY)
+    with open(path, encoding="utf-8") as f:
+        specs = yaml.safe_load(f) or {}
+    return {name: Exercise(name, spec) for name, spec in specs.items()}
+
+
+def get_library():
+    """The process-wide exercise library, loaded on first use."""
+    global _library
+    with _lock:
+        if _library is None:
+            _library = load_library()
+        return _library
+
+
+class RuleTable:
+    """
+    A set of exercises compiled for one vectorized pass.
+    triplets (T, 3): every distinct joint triplet, so an angle shared by
+    several exercises is measured once. Counter columns are (left, right,
+    combine) per exercise, C = 3 * exercises; a combine counter tests both
+    sides' terms. Row c * P + p of the (C * P, A) tables holds the terms of
+    column c in phase p: the angle column to read, and a sign and bound so
+    that every term is `angle * sign > bound` (">=" and "<=" become strict
+    float32 tests against the next threshold down or up). Short phases are
+    padded by repeating a term, which changes nothing.
+    """
+
+    def __init__(self, exercises):
+        self.exercises = list(exercises)
+        c = 3 * len(self.exercises)
+        self.phases = p = max(len(ex.phases) for ex in self.exercises)
+        a = 2 * max(len(terms) for ex in self.exercises for terms in ex.phases)
+
+        columns = {}
+        column = lambda triplet: columns.setdefault(tuple(int(i) for i in triplet), len(columns))
+
+        self.index = np.zeros((c * p, a), np.intp)
+        self.sign = np.ones((c * p, a), np.float32)
+        self.bound = np.zeros((c * p, a), np.float32)
+        self.n_phases = np.zeros(c, np.intp)
+        self.primary = np.zeros((len(self.exercises), 2), np.intp)  # Angle columns of each primary angle
+
+        for e, ex in enumerate(self.exercises):
+            left, right, both = 3 * e, 3 * e + 1, 3 * e + 2
+            self.n_phases[left:both + 1] = len(ex.phases)
+            self.primary[e] = [column(t) for t in ex.angles[ex.primary]]
+            for k, terms in enumerate(ex.phases):
+                tests = {left: [], right: [], both: []}
+                for angle, op, threshold in terms:
+                    threshold = np.float32(threshold)
+                    if op == ">=":
+                        threshold = np.nextafter(threshold, np.float32(-np.inf))
+                    elif op == "<=":
+                        threshold = np.nextafter(threshold, np.float32(np.inf))
+                    sign = np.float32(1.0 if op[0] == ">" else -1.0)
+                    l, r = (column(t) for t in ex.angles[angle])
+                    tests[left].append((l, sign, sign * threshold))
+                    tests[right].append((r, sign, sign * threshold))
+                    tests[both] += [(l, sign, sign * threshold), (r, sign, sign * threshold)]
+                for col, row in tests.items():
+                    row = (row * a)[:a]  # Pad by repeating
+                    self.index[col * p + k], self.sign[col * p + k], self.bound[col * p + k] = zip(*row)
+
+        self.triplets = np.array(list(columns), np.intp).reshape(-1, 3)
+
+
+class ExerciseBank:
+    """
+    Rep counters for many people and exercises, updated in one vectorized call.
+    Row i is one person (or session); its columns are (left, right, combine)
+    for each exercise. Per frame every distinct angle is measured once, then
+    each counter's current-phase terms are gathered from the rule table and
+    tested together: a counter whose phase holds moves to the next one, and
+    counts a rep when it gets past the last. No per-exercise Python code runs.
+    Gives the same bicep-curl counts as RepCounter fed the same keypoints.
+    """
+
+    def __init__(self, exercises=None, capacity=1, library=None):
+        library = library or get_library()
+        chosen = []
+        for name in exercises or [config.EXERCISE]:
+            if name not in library:
+                raise ValueError(f"Unknown exercise {name!r} (library has {', '.join(library)})")
+            chosen.append(library[name])
+        self.rules = RuleTable(chosen)
+        self.exercises = self.rules.exercises
+        self.sides = SIDES * len(self.exercises)  # Side name of each column
+        self.capacity = capacity
+        self.kernel = JointAngles(self.rules.triplets)
+        self.min_keypoints = int(self.rules.triplets.max()) + 1  # Keypoints per person the rules read
+
+        c = len(self.sides)
+        self.counts = np.zeros((capacity, c), np.int64)
+        self.phase = np.zeros((capacity, c), np.intp)
+        self.mode_mask = np.zeros((capacity, c), bool)   # Columns a row's mode updates
+        self.angles = np.zeros((0, len(self.rules.triplets)), np.float32)
+        self._base = np.arange(c) * self.rules.phases  # Table row of each column's first phase
+
+    def set_row(self, row, mode, exercises=None):
+        """
+        (Re)initialises one row: counts and phases cleared. Each exercise
+        counts in `mode` if it supports it, else in its default mode;
+        `exercises` limits the row to those names (default: all).
+        """
+        self.counts[row] = 0
+        self.phase[row] = 0
+        self.mode_mask[row] = False
+        for e, ex in enumerate(self.exercises):
+            if exercises is not None and ex.name not in exercises:
+                continue
+            m = ex.mode(mode)
+            self.mode_mask[row, 3 * e:3 * e + 3] = (m == MODE_NORMAL, m == MODE_NORMAL, m == MODE_COMBINE)
+
+    def update(self, keypoints, rows=None):
+        """
+        keypoints = (n, K, 2) keypoints of the people in `rows`
+        rows      = (n,) row indices, or None for rows 0..n-1
+        Returns an (n, C) bool array: True where a counter went up.
+        self.angles holds the frame's (n, T) angles until the next call.
+        """
+        n = len(keypoints)
+        if rows is None:
+            rows = slice(0, n)
+        rules = self.rules
+        self.angles = angles = self.kernel(keypoints)
+
+        # Current phase of every counter -> its (n, C, A) terms, all tested as angle * sign > bound
+        phase = self.phase[rows]
+        terms = self._base + phase
+        values = np.take_along_axis(angles, rules.index[terms].reshape(n, -1), axis=1).reshape(terms.shape + (-1,))
+        held = values * rules.sign[terms] > rules.bound[terms]
+
+        # All terms hold: next phase; past the last one: a rep, back to the first
+        moved = held.all(axis=2) & self.mode_mask[rows]
+        phase += moved
+        reps = phase >= rules.n_phases
+        phase[reps] = 0
+        self.phase[rows] = phase
+        self.counts[rows] += reps
+        return reps
+
+    def primary_angles(self, exercise=0):
+        """(n, 2) left/right primary angles of one exercise from the last update."""
+        return self.angles[:, self.rules.primary[exercise]]
+
+
+class ExerciseCounter:
+    """
+    One session's counter for one exercise, with RepCounter's interface:
+    update() takes the main person's (K, 2) keypoints instead of elbow
+    angles and returns REP_* bits for the counters that went up.
+    """
+
+    def __init__(self, exercise=None, mode=None, library=None):
+        self.bank = ExerciseBank([exercise or config.EXERCISE], 1, library)
+        self.exercise = self.bank.exercises[0]
+        self.mode = self.exercise.mode(mode)
+        self.bank.set_row(0, self.mode)
+        self.joints = self.exercise.joints
+        self.angle_left = self.angle_right = float("nan")
+
+    def update(self, keypoints):
+        reps = self.bank.update(np.asarray(keypoints)[None])[0]
+        self.angle_left, self.angle_right = (float(a) for a in self.bank.primary_angles()[0])
+        return REP_LEFT * bool(reps[0]) | REP_RIGHT * bool(reps[1]) | REP_COMBINE * bool(reps[2])
+
+    def in_rep(self):
+        """True while the primary angle is between its lowest and highest threshold."""
+        low, high = self.exercise.band
+        return low < min(self.angle_left, self.angle_right) < high
+
+    @property
+    def count_left(self):
+        return int(self.bank.counts[0, 0])
+
+    @property
+    def count_right(self):
+        return int(self.bank.counts[0, 1])
+
+    @property
+    def count_combine(self):
+        return int(self.bank.counts[0, 2])
+
+    def reset_counts(self):
+        """Zeroes the counters, keeping the phases."""
+        self.bank.counts[0] = 0
+
+    def counts(self):
+        return {"left": self.count_left, "right": self.count_right, "combine": self.count_combine}
@@ -0,0 +1,458 @@
+# src/fleet.py
+"""
+Inference fleet: N worker processes, each with its own model, its own
+thread count and (on Linux) its own share of the cores, so sessions stop
+competing for one interpreter's GIL.
+
+Frames travel through shared memory: every worker has a FrameRing of
+fixed-size slots, the app copies a frame into a free slot and sends only
+(slot, shape, region) down a pipe. The worker crops, runs the model
+(micro-batching whatever arrived together) and tracks, then sends back
+the small PoseFrame. A session always talks to the same worker, which
+keeps that session's tracker. Workers that die are restarted with
+back-off; their sessions move to a live worker and start a new track.
+
+Enabled with FLEET_WORKERS > 0; otherwise the in-process scheduler is used.
+"""
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from multiprocessing import connection
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+import config
+
+
+class FrameRing:
+    """
+    `slots` frame buffers of `slot_bytes` each in one shared-memory block.
+    The owner creates it (name=None) and hands out slots; a worker attaches
+    by name and only reads views. A slot is freed when its result is back.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = SharedMemory(name=name)
+        self._free = list(range(slots - 1, -1, -1))
+        self._cond = threading.Condition()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape):
+        """uint8 array of `shape` over a slot (no copy)."""
+        return np.ndarray(shape, np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def acquire(self, timeout=None):
+        """A free slot number, or None if none frees up within `timeout`."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._free, timeout):
+                return None
+            return self._free.pop()
+
+    def release(self, slot):
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify()
+
+    def in_use(self):
+        with self._cond:
+            return self.slots - len(self._free)
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _gather(requests, max_batch, max_wait):
+    """Next message plus whatever else arrives within max_wait (up to max_batch)."""
+    msgs = [requests.recv()]
+    deadline = time.perf_counter() + max_wait
+    while len(msgs) < max_batch:
+        if not requests.poll(max(deadline - time.perf_counter(), 0.0)):
+            break
+        msgs.append(requests.recv())
+    return msgs
+
+
+def _run_jobs(model, ring, trackers, jobs, results):
+    """One forward pass per inference size (like the in-process scheduler), then per-session tracking."""
+    from src.roi import RoiCropper
+    from src.tracking import SessionTracker
+
+    for imgsz in dict.fromkeys(job[5] for job in jobs):
+        group = [job for job in jobs if job[5] == imgsz]
+        frames = [ring.view(job[3], job[4]) for job in group]
+        inputs = [f if job[6] is None else RoiCropper.crop(f, job[6]) for f, job in zip(frames, group)]
+        try:
+            poses = model.predict(inputs, imgsz=imgsz)
+        except Exception as e:
+            for job in group:
+                results.send(("error", job[1], repr(e)))
+            continue
+
+        for (_, req, session, _, shape, _, region), frame, pose in zip(group, frames, poses):
+            if region is not None:
+                x1, y1, _, _, scale = region
+                pose = RoiCropper.to_full(pose, (x1, y1, scale), shape)
+            tracker = trackers.get(session)
+            if tracker is None:
+                tracker = trackers[session] = SessionTracker()
+            pose = tracker.update(pose, frame)
+            # Sending the result hands the slot back: nothing may touch `frame` after this
+            results.send(("pose", req, pose))
+
+
+def _serve(index, ring_name, slots, slot_bytes, requests, results, spec):
+    """Worker process: load the model, then answer frames until stopped or orphaned."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C goes to the app, which stops us
+    if spec["cpus"] and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, spec["cpus"])
+
+    from src.backends import load_backend
+
+    model = load_backend(spec["backend"], spec["model_path"], spec["threads"])
+    if config.MODEL_WARMUP:
+        model.predict([np.zeros((640, 640, 3), np.uint8)])
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+    trackers = {}  # session key -> SessionTracker
+    results.send(("ready", os.getpid()))
+
+    try:
+        while True:
+            msgs = _gather(requests, spec["max_batch"], spec["max_wait"])
+            jobs = []
+            for msg in msgs:
+                if msg[0] == "infer":
+                    jobs.append(msg)
+                elif msg[0] == "end":
+                    trackers.pop(msg[1], None)
+                elif msg[0] == "stop":
+                    return
+
+            _run_jobs(model, ring, trackers, jobs, results)
+    except EOFError:
+        pass  # The app went away
+    finally:
+        trackers.clear()
+        ring.close()
+
+
+class _Worker:
+    """Parent-side record of one worker process and its frame ring."""
+
+    def __init__(self, index, ring, cpus):
+        self.index = index
+        self.ring = ring
+        self.cpus = cpus
+        self.lock = threading.Lock()
+        self.process = None
+        self.requests = None     # Parent -> worker pipe end
+        self.results = None      # Worker -> parent pipe end
+        self.ready = False
+        self.started = 0.0
+        self.failures = 0        # Consecutive early crashes (restart back-off)
+        self.inflight = {}       # request id -> (Future, slot)
+        self.sessions = 0
+
+
+class InferenceFleet:
+    """
+    Worker processes with sticky session routing.
+    One collector thread reads every worker's result pipe and resolves the
+    callers' Futures; a closed pipe means the worker died, which fails its
+    in-flight frames and schedules a restart.
+    """
+
+    def __init__(self, size, model_path=None, backend=None, threads=None, slots=None, max_frame=None, pin=None):
+        self.size = max(1, int(size))
+        self._ctx = mp.get_context("spawn")  # Never fork a process that is full of threads
+
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+        share = max(1, len(cpus) // self.size)
+        pin = config.FLEET_PIN_CPUS if pin is None else pin
+        self.threads = threads or config.FLEET_THREADS or share
+        self.spec = {
+            "backend": backend or config.INFERENCE_BACKEND,
+            "model_path": model_path or config.MODEL_PATH,
+            "threads": self.threads,
+            "max_batch": max(1, int(config.BATCH_MAX_SIZE)),
+            "max_wait": config.BATCH_MAX_WAIT,
+        }
+
+        h, w = max_frame or config.FLEET_MAX_FRAME
+        slots = slots or config.FLEET_SLOTS
+        self.workers = []
+        for i in range(self.size):
+            worker_cpus = cpus[(i * share) % len(cpus):][:share] if pin and len(cpus) >= self.size else None
+            self.workers.append(_Worker(i, FrameRing(slots, h * w * 3), worker_cpus))
+
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._any_ready = threading.Event()
+        self._closed = False
+        self.frames = 0
+        self.failed = 0          # Frames lost to a crash or a model error
+        self.oversize = 0        # Frames larger than a slot (skipped)
+        self.restarts = 0
+        self.moved = 0           # Sessions moved off a dead worker
+
+        for worker in self.workers:
+            self._spawn(worker)
+        threading.Thread(target=self._collect, name="fleet-results", daemon=True).start()
+        atexit.register(self.close)
+
+    # --- Processes ---
+
+    def _spawn(self, worker):
+        if self._closed:
+            return
+        req_read, req_write = self._ctx.Pipe(duplex=False)
+        res_read, res_write = self._ctx.Pipe(duplex=False)
+        spec = dict(self.spec, cpus=worker.cpus)
+        process = self._ctx.Process(
+            target=_serve, name=f"pose-worker-{worker.index}", daemon=True,
+            args=(worker.index, worker.ring.name, worker.ring.slots, worker.ring.slot_bytes, req_read, res_write, spec),
+        )
+        process.start()
+        req_read.close()  # Only the child holds these now, so its death shows up as EOF
+        res_write.close()
+        with worker.lock:
+            worker.process, worker.requests, worker.results = process, req_write, res_read
+            worker.started = time.monotonic()
+
+    def _crashed(self, worker):
+        with worker.lock:
+            worker.ready = False
+            lost, worker.inflight = worker.inflight, {}
+            for conn in (worker.requests, worker.results):
+                conn.close()
+            worker.requests = worker.results = None
+            process = worker.process
+        for future, slot in lost.values():
+            worker.ring.release(slot)
+            future.set_exception(RuntimeError(f"pose worker {worker.index} died"))
+        process.join(timeout=1)
+        if self._closed:
+            return
+
+        with self._lock:
+            self.failed += len(lost)
+            self.restarts += 1
+        # A worker that crashes soon after starting (bad model, OOM) backs off exponentially
+        early = time.monotonic() - worker.started < 60.0
+        worker.failures = worker.failures + 1 if early else 0
+        delay = min(2.0 ** worker.failures - 1.0, config.FLEET_MAX_BACKOFF)
+        timer = threading.Timer(delay, self._spawn, (worker,))
+        timer.daemon = True
+        timer.start()
+
+    def _collect(self):
+        while not self._closed:
+            conns = {w.results: w for w in self.workers if w.results is not None}
+            if not conns:
+                time.sleep(0.1)
+                continue
+            for conn in connection.wait(list(conns), timeout=0.5):
+                worker = conns[conn]
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    self._crashed(worker)
+                    continue
+                self._handle(worker, msg)
+
+    def _handle(self, worker, msg):
+        if msg[0] == "ready":
+            worker.ready = True
+            self._any_ready.set()
+            return
+        with worker.lock:
+            future, slot = worker.inflight.pop(msg[1], (None, None))
+        if future is None:
+            return
+        worker.ring.release(slot)
+        if msg[0] == "pose":
+            future.set_result(msg[2])
+            with self._lock:
+                self.frames += 1
+        else:
+            future.set_exception(RuntimeError(msg[2]))
+            with self._lock:
+                self.failed += 1
+
+    def wait_ready(self, timeout=None):
+        """True once at least one worker has loaded its model."""
+        return self._any_ready.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self.workers:
+            with worker.lock:
+                try:
+                    if worker.requests is not None:
+                        worker.requests.send(("stop",))
+                except OSError:
+                    pass
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            worker.ring.close(unlink=True)
+
+    # --- Sessions ---
+
+    def session(self):
+        """A new stream's handle, bound to the least busy live worker."""
+        return FleetSession(self)
+
+    def _assign(self):
+        with self._lock:
+            live = [w for w in self.workers if w.ready] or self.workers
+            worker = min(live, key=lambda w: w.sessions)
+            worker.sessions += 1
+            return worker.index
+
+    def _unassign(self, index):
+        with self._lock:
+            self.workers[index].sessions -= 1
+
+    def submit(self, index, session, img, region=None, imgsz=None, timeout=None):
+        """
+        Copies img into a slot of worker `index` and queues it. Returns a
+        Future of the tracked full-frame PoseFrame, or None if the frame
+        could not be sent (worker down, no free slot in time, too large).
+        """
+        worker = self.workers[index]
+        if img.nbytes > worker.ring.slot_bytes:
+            with self._lock:
+                self.oversize += 1
+            return None
+        slot = worker.ring.acquire(timeout)
+        if slot is None:
+            return None
+        np.copyto(worker.ring.view(slot, img.shape), img)  # The only copy of the frame
+
+        future = Future()
+        future.set_running_or_notify_cancel()  # Never cancelled: a late result is just dropped
+        req = next(self._ids)
+        with worker.lock:
+            if worker.ready:
+                try:
+                    worker.inflight[req] = (future, slot)
+                    worker.requests.send(("infer", req, session, slot, img.shape, imgsz, region))
+                    return future
+                except OSError:
+                    worker.inflight.pop(req, None)  # Died just now; the collector restarts it
+        worker.ring.release(slot)
+        return None
+
+    def end(self, index, session):
+        """Drops a finished session's tracker on its worker."""
+        worker = self.workers[index]
+        with worker.lock:
+            if worker.ready:
+                try:
+                    worker.requests.send(("end", session))
+                except OSError:
+                    pass
+        self._unassign(index)
+
+    def stats(self):
+        with self._lock:
+            out = {
+                "workers": self.size,
+                "ready": sum(w.ready for w in self.workers),
+                "threads": self.threads,
+                "sessions": sum(w.sessions for w in self.workers),
+                "frames": self.frames,
+                "failed": self.failed,
+                "oversize": self.oversize,
+                "restarts": self.restarts,
+                "moved": self.moved,
+            }
+        out["inflight"] = sum(w.ring.in_use() for w in self.workers)
+        return out
+
+
+class FleetSession:
+    """
+    One stream's connection to the fleet. All its frames go to one worker,
+    which keeps its tracker; if that worker dies the session moves on.
+    """
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self.key = uuid.uuid4().hex
+        self.worker = fleet._assign()
+        self.closed = False
+
+    def infer(self, img, region=None, imgsz=None, timeout=None):
+        """
+        Tracked PoseFrame in full-frame coordinates, or None if the result is
+        late or was lost. region is RoiCropper.region() (None = full frame).
+        """
+        if self.closed:
+            return None
+        if not self.fleet.workers[self.worker].ready:
+            # Worker restarting: continue on another one (the tracker starts over there)
+            fleet = self.fleet
+            fleet._unassign(self.worker)
+            self.worker = fleet._assign()
+            with fleet._lock:
+                fleet.moved += 1
+        future = self.fleet.submit(self.worker, self.key, img, region, imgsz, timeout)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None  # Late, or the worker died / the model raised
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.fleet.end(self.worker, self.key)
+
+
+_fleet = None
+_fleet_failed = False
+_fleet_lock = threading.Lock()
+
+
+def get_fleet():
+    """
+    Process-wide fleet when FLEET_WORKERS > 0, started on first call and
+    returned once a worker has loaded the model. None when disabled, or if
+    no worker came up within FLEET_START_TIMEOUT.
+    """
+    global _fleet, _fleet_failed
+    if not config.FLEET_WORKERS or _fleet is not None or _fleet_failed:
+        return _fleet
+
+    with _fleet_lock:
+        if _fleet is None and not _fleet_failed:
+            fleet = InferenceFleet(config.FLEET_WORKERS)
+            if fleet.wait_ready(config.FLEET_START_TIMEOUT):
+                _fleet = fleet
+            else:
+                fleet.close()
+                _fleet_failed = True
+    return _fleet
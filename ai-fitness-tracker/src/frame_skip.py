@@ -0,0 +1,144 @@
+# src/frame_skip.py
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import config
+
+# Arm keypoints (shoulders, elbows, wrists) used to measure movement by default
+ARM_KEYPOINTS = [5, 6, 7, 8, 9, 10]
+
+
+class _HostLoad:
+    """Host CPU load as a fraction of all cores, sampled at most once a second."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.cores = os.cpu_count() or 1
+        self._value = 0.0
+        self._stamp = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._stamp >= self.interval:
+                self._stamp = now
+                try:
+                    self._value = os.getloadavg()[0] / self.cores
+                except (AttributeError, OSError):
+                    self._value = 0.0  # Not available on this platform
+            return self._value
+
+
+_host_load = _HostLoad()
+
+
+class AdaptiveFrameSkipper:
+    """
+    Decides per session which incoming frames go to inference.
+    The target rate follows joint speed (low when still, high mid-rep) and
+    is capped by the measured inference latency and the host CPU budget.
+    """
+
+    def __init__(self, min_fps=None, max_fps=None, cpu_budget=None, joints=None):
+        self.min_fps = min_fps or config.SKIP_MIN_FPS
+        self.max_fps = max_fps or config.SKIP_MAX_FPS
+        self.cpu_budget = cpu_budget or config.CPU_BUDGET
+        self.joints = np.asarray(ARM_KEYPOINTS if joints is None else joints, np.intp)  # Exercise's moving joints
+
+        self.target_fps = self.max_fps  # Start fast until we have measurements
+        self.latency = 0.0              # EMA of inference latency (s)
+        self.speed = 0.0                # EMA of joint speed (shoulder widths / s)
+
+        self.frames = 0
+        self.processed = 0
+        self.dropped = 0
+
+        self._last_run = 0.0
+        self._prev_arm = None
+        self._prev_time = 0.0
+        self._run_times = deque(maxlen=30)
+        self._in_times = deque(maxlen=30)
+
+    def should_process(self, now=None):
+        """Call once per incoming frame. True means run inference on it."""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        self._in_times.append(now)
+
+        if now - self._last_run >= 1.0 / self.target_fps:
+            self._last_run = now
+            self.processed += 1
+            self._run_times.append(now)
+            return True
+
+        self.dropped += 1
+        return False
+
+    def report_inference(self, latency, alpha=0.2):
+        """Feeds back how long the last inference took (seconds)."""
+        self.latency = latency if self.latency == 0.0 else (1 - alpha) * self.latency + alpha * latency
+        self._update_target()
+
+    def report_motion(self, kps, in_rep=False, now=None, alpha=0.5):
+        """
+        Feeds back the main person's keypoints (or None if nobody was found).
+        in_rep = True mid-rep (primary angle between the exercise's thresholds).
+        """
+        now = time.monotonic() if now is None else now
+        if kps is None or len(kps) <= max(self.joints.max(), 6):
+            self._prev_arm = None
+            self.speed = 0.0
+            self._update_target(in_rep=False)
+            return
+
+        arm = kps[self.joints]
+        if self._prev_arm is not None and now > self._prev_time:
+            shoulder_width = max(float(np.linalg.norm(kps[5] - kps[6])), 1.0)
+            step = np.linalg.norm(arm - self._prev_arm, axis=1).max()
+            speed = step / shoulder_width / (now - self._prev_time)
+            self.speed = (1 - alpha) * self.speed + alpha * speed
+        self._prev_arm = arm.copy()
+        self._prev_time = now
+        self._update_target(in_rep)
+
+    def _update_target(self, in_rep=False):
+        # Motion: interpolate between idle and full rate
+        span = max(config.FAST_SPEED - config.STILL_SPEED, 1e-6)
+        level = min(max((self.speed - config.STILL_SPEED) / span, 0.0), 1.0)
+        if in_rep:
+            level = 1.0
+        target = self.min_fps + level * (self.max_fps - self.min_fps)
+
+        # Latency: no point asking for frames faster than we can infer them
+        if self.latency > 0:
+            target = min(target, 1.0 / self.latency)
+
+        # CPU budget: back off proportionally when the host is over budget
+        load = _host_load.get()
+        if load > self.cpu_budget:
+            target *= self.cpu_budget / load
+
+        self.target_fps = max(target, self.min_fps)
+
+    @staticmethod
+    def _rate(times):
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stats(self):
+        return {
+            "target_fps": float(self.target_fps),
+            "effective_fps": self._rate(self._run_times),
+            "input_fps": self._rate(self._in_times),
+            "frames": self.frames,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "latency_ms": float(self.latency) * 1000.0,
+            "arm_speed": float(self.speed),
+        }
@@ -0,0 +1,27 @@
+# src/frames.py
+import av
+import numpy as np
+
+
+def bgr_view(frame):
+    """
+    Returns (out, img): `frame` converted to bgr24 and a writable NumPy view
+    of its pixels. Drawing on img draws on out, so out can be returned from
+    recv as is - no to_ndarray/from_ndarray round trip. The colour
+    conversion is the only full-frame pass.
+    """
+    out = frame.reformat(format="bgr24")  # Keeps pts/time_base; no-op if already bgr24
+    img = _plane_view(out)
+    if not img.flags.writeable:
+        # Read-only frame buffer: fall back to one copy into a frame we own
+        copy = av.VideoFrame.from_ndarray(img, format="bgr24")
+        copy.pts, copy.time_base = out.pts, out.time_base
+        out, img = copy, _plane_view(copy)
+    return out, img
+
+
+def _plane_view(frame):
+    plane = frame.planes[0]
+    # Rows may be padded: line_size can exceed width * 3
+    return np.ndarray((frame.height, frame.width, 3), np.uint8, buffer=plane,
+                      strides=(plane.line_size, 3, 1))
@@ -0,0 +1,277 @@
+# src/history.py
+"""
+Workout history: every rep, with its time, angles and mode, appended to a
+SQLite database in WAL mode. Recording only queues the event; a writer
+thread commits batches, so the video and inference threads never wait on
+disk. Queries use their own read connections (WAL readers do not block
+the writer).
+
+    python -m src.history --user alice       # print someone's recent sessions
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+
+SIDES = ("left", "right", "combine")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          TEXT PRIMARY KEY,
+    user        TEXT NOT NULL,
+    mode        TEXT NOT NULL,
+    started     REAL NOT NULL,
+    ended       REAL,
+    count_left  INTEGER,
+    count_right INTEGER,
+    count_combine INTEGER
+);
+CREATE INDEX IF NOT EXISTS sessions_user_started ON sessions (user, started);
+
+CREATE TABLE IF NOT EXISTS reps (
+    user        TEXT NOT NULL,
+    session     TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    side        INTEGER NOT NULL,   -- 0 left, 1 right, 2 combine
+    count       INTEGER NOT NULL,   -- Counter value after this rep
+    angle_left  REAL,
+    angle_right REAL,
+    track       INTEGER             -- Tracker id in group mode, else NULL
+);
+-- Covering index for per-user ranges and aggregates; rows are only ever appended.
+-- track is included so the user's own reps (track IS NULL) are counted from the index alone
+DROP INDEX IF EXISTS reps_user_ts;
+CREATE INDEX IF NOT EXISTS reps_user_ts_track ON reps (user, ts, side, track);
+CREATE INDEX IF NOT EXISTS reps_session ON reps (session, ts);
+"""
+
+
+def connect(path, readonly=False):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; a crash loses at most the last batch
+    if readonly:
+        conn.execute("PRAGMA query_only=1")
+    return conn
+
+
+class WorkoutStore:
+    """
+    Append-only rep log.
+    start_session / record_rep / end_session only put a tuple on a bounded
+    queue (events are dropped and counted if the writer falls that far
+    behind). The writer commits every `batch` events or every
+    `flush_interval` seconds, whichever comes first.
+    """
+
+    def __init__(self, path=None, batch=None, flush_interval=None, backlog=None):
+        self.path = path or config.HISTORY_DB
+        self.batch = batch or config.HISTORY_BATCH_SIZE
+        self.flush_interval = flush_interval or config.HISTORY_FLUSH_SECONDS
+        self._queue = queue.Queue(maxsize=backlog or config.HISTORY_MAX_BACKLOG)
+        self._local = threading.local()
+
+        conn = connect(self.path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # --- Recording (any thread, never blocks) ---
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def start_session(self, user, mode, started=None):
+        """Returns the new session's id (generated here, so no round trip to the writer)."""
+        session = uuid.uuid4().hex
+        self._put(("session", (session, user, mode, started or time.time())))
+        return session
+
+    def record_rep(self, user, session, side, count, angle_left=None, angle_right=None, track=None, ts=None):
+        """side = "left" | "right" | "combine"."""
+        self._put(("rep", (user, session, ts or time.time(), SIDES.index(side), int(count),
+                           None if angle_left is None else float(angle_left),
+                           None if angle_right is None else float(angle_right),
+                           None if track is None else int(track))))
+
+    def end_session(self, session, counts, ended=None):
+        """counts = final {"left", "right", "combine"}, or None to have sessions() count the reps recorded."""
+        final = (None, None, None) if counts is None else (counts["left"], counts["right"], counts["combine"])
+        self._put(("end", (ended or time.time(), *final, session)))
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything queued so far is committed (tests, shutdown)."""
+        marker = threading.Event()
+        self._queue.put(("flush", marker))
+        return marker.wait(timeout)
+
+    def close(self):
+        self._queue.put(("close", None))
+        self._thread.join(timeout=10)
+
+    # --- Writer thread ---
+
+    def _run(self):
+        conn = connect(self.path)
+        pending, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ("timeout", None)
+
+            kind = item[0]
+            if kind in ("session", "rep", "end"):
+                pending.append(item)
+                deadline = deadline or time.monotonic() + self.flush_interval
+                if len(pending) < self.batch:
+                    continue
+
+            if pending:
+                try:
+                    self._commit(conn, pending)
+                except sqlite3.Error:
+                    self.errors += 1  # Batch rolled back; keep the writer alive
+                pending, deadline = [], None
+            if kind == "flush":
+                item[1].set()
+            elif kind == "close":
+                conn.close()
+                return
+
+    def _commit(self, conn, items):
+        sessions = [args for kind, args in items if kind == "session"]
+        reps = [args for kind, args in items if kind == "rep"]
+        ends = [args for kind, args in items if kind == "end"]
+        with conn:  # One transaction per batch
+            if sessions:
+                conn.executemany("INSERT OR IGNORE INTO sessions (id, user, mode, started) VALUES (?, ?, ?, ?)",
+                                 sessions)
+            if reps:
+                conn.executemany("INSERT INTO reps VALUES (?, ?, ?, ?, ?, ?, ?, ?)", reps)
+            if ends:
+                conn.executemany("UPDATE sessions SET ended = ?, count_left = ?, count_right = ?, count_combine = ? "
+                                 "WHERE id = ?", ends)
+        self.written += len(items)
+        self.batches += 1
+
+    # --- Queries (any thread, own read connection) ---
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path, readonly=True)
+        return conn
+
+    def sessions(self, user, since=None, until=None, limit=50):
+        """
+        Most recent sessions first, as dicts with their rep counts.
+        Sessions that never ended (crash, closed tab) are counted from their reps.
+        """
+        rows = self._reader().execute(
+            """
+            SELECT s.id, s.mode, s.started, s.ended,
+                   COALESCE(s.count_left,    (SELECT COUNT(*) FROM reps r WHERE r.session = s.id AND r.side = 0)),
+                   COALESCE(s.count_right,   (SELECT COUNT(*) FROM reps r WHERE r.session = s.id AND r.side = 1)),
+                   COALESCE(s.count_combine, (SELECT COUNT(*) FROM reps r WHERE r.session = s.id AND r.side = 2))
+            FROM sessions s
+            WHERE s.user = ? AND s.started >= ? AND s.started < ?
+            ORDER BY s.started DESC LIMIT ?
+            """,
+            (user, since or 0.0, until or float("inf"), limit),
+        ).fetchall()
+        keys = ("id", "mode", "started", "ended", "left", "right", "combine")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def reps(self, session):
+        """Every rep of one session, in order: (ts, side, count, angle_left, angle_right, track)."""
+        rows = self._reader().execute(
+            "SELECT ts, side, count, angle_left, angle_right, track FROM reps WHERE session = ? ORDER BY ts",
+            (session,),
+        ).fetchall()
+        return [(ts, SIDES[side], count, al, ar, track) for ts, side, count, al, ar, track in rows]
+
+    def totals(self, user, since=None, until=None):
+        """
+        {"left": n, "right": n, "combine": n} over a time range (index-only scan).
+        Only the user's own reps: group-mode reps belong to whoever was
+        tracked in frame, not to the logged-in user.
+        """
+        rows = self._reader().execute(
+            "SELECT side, COUNT(*) FROM reps WHERE user = ? AND ts >= ? AND ts < ? AND track IS NULL GROUP BY side",
+            (user, since or 0.0, until or float("inf")),
+        ).fetchall()
+        out = dict.fromkeys(SIDES, 0)
+        out.update({SIDES[side]: n for side, n in rows})
+        return out
+
+    def daily(self, user, days=30, now=None, utc_offset=None):
+        """
+        [(day start timestamp, {"left", "right", "combine"})] for the last
+        `days` days, oldest first. Own reps only, as in totals().
+        """
+        now = now or time.time()
+        offset = -time.timezone if utc_offset is None else utc_offset  # Local days by default
+        rows = self._reader().execute(
+            """
+            SELECT CAST((ts + ?) / 86400 AS INTEGER) AS day, side, COUNT(*)
+            FROM reps WHERE user = ? AND ts >= ? AND track IS NULL
+            GROUP BY day, side ORDER BY day
+            """,
+            (offset, user, now - days * 86400.0),
+        ).fetchall()
+        out = {}
+        for day, side, n in rows:
+            out.setdefault(day * 86400.0 - offset, dict.fromkeys(SIDES, 0))[SIDES[side]] = n
+        return sorted(out.items())
+
+    def stats(self):
+        return {"written": self.written, "batches": self.batches, "dropped": self.dropped,
+                "errors": self.errors, "queued": self._queue.qsize()}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide workout store, or None when history is disabled."""
+    global _store
+    if not config.HISTORY_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = WorkoutStore()
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show a user's workout history.")
+    parser.add_argument("--user", default=config.HISTORY_DEFAULT_USER)
+    parser.add_argument("--db", default=config.HISTORY_DB)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        raise SystemExit(f"No history database at {args.db}")
+
+    store = WorkoutStore(args.db)
+    for s in store.sessions(args.user, limit=args.limit):
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(s["started"]))
+        print(f"{started}  {s['mode']:22s} left {s['left']:4d}  right {s['right']:4d}  combine {s['combine']:4d}")
+    print("totals:", store.totals(args.user))
+    store.close()
@@ -0,0 +1,340 @@
+# src/metrics.py
+"""
+Hot-path instrumentation for the pose pipeline.
+
+Each session records how long every stage of recv/analyze takes into a
+StageHistogram: fixed Prometheus buckets (cumulative, for scraping) plus a
+ring buffer of recent samples (for p50/p95/p99). The process-wide
+registry adds live aggregates (active sessions, model queue depth,
+effective FPS) and serves everything in the Prometheus text format:
+
+    curl localhost:9108/metrics
+    curl "localhost:9108/profile?seconds=10" > stacks.txt   # sampling profiler, collapsed stacks
+"""
+import logging
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import config
+
+log = logging.getLogger(__name__)
+
+# Upper bounds in seconds (Prometheus "le" labels); +Inf is implicit
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+
+class StageHistogram:
+    """
+    Durations of one stage. add() is a bisect, a few increments and a ring
+    buffer write - no lock: each stage is written by a single thread, and
+    a scrape reading a half-updated sample is harmless.
+    """
+
+    __slots__ = ("counts", "sum", "count", "_recent", "_next")
+
+    def __init__(self, window=512):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Non-cumulative, last = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._recent = np.zeros(window, np.float64)
+        self._next = 0
+
+    def add(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self._recent[self._next % len(self._recent)] = seconds
+        self._next += 1
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def percentiles(self, q=(50, 95, 99)):
+        """Milliseconds over the recent window, or None before the first sample."""
+        n = min(self._next, len(self._recent))
+        if n == 0:
+            return None
+        return [float(v) * 1000.0 for v in np.percentile(self._recent[:n], q)]
+
+
+class SessionMetrics:
+    """Per-session stage timers. Registered with the process-wide registry on creation, until close()."""
+
+    def __init__(self, name=None, registry=None):
+        self.stages = {}
+        self.registry = registry or get_registry()
+        self.name = name or f"session-{id(self):x}"
+        self.sources = {}   # "skipper" / "pipeline" -> stats callable, "scheduler" / "fleet" -> shared inference
+        self.registry.register(self)
+
+    def add(self, stage, seconds):
+        hist = self.stages.get(stage)
+        if hist is None:
+            hist = self.stages[stage] = StageHistogram()
+        hist.add(seconds)
+
+    def close(self):
+        """Leaves the active sessions now, rather than when garbage collected; stages go to the totals."""
+        self.registry.unregister(self)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def summary(self):
+        """{stage: {"count", "p50_ms", "p95_ms", "p99_ms"}} over the recent window."""
+        out = {}
+        for stage, hist in list(self.stages.items()):
+            pct = hist.percentiles()
+            if pct is not None:
+                out[stage] = {"count": hist.count, "p50_ms": pct[0], "p95_ms": pct[1], "p99_ms": pct[2]}
+        return out
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on and off at runtime: a
+    thread snapshots every other thread's stack `hz` times a second and
+    counts the stacks. Zero cost while stopped.
+    """
+
+    def __init__(self, hz=None):
+        self.hz = hz or config.METRICS_PROFILE_HZ
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self.stacks.clear()
+            self.samples = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(1.0 / self.hz):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self, top=None):
+        """Flamegraph input: "thread;outer;...;inner count" per line, most frequent first."""
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common(top))
+
+    def profile(self, seconds):
+        """Samples for `seconds` and returns the collapsed stacks."""
+        self.start()
+        time.sleep(seconds)
+        self.stop()
+        return self.collapsed()
+
+
+class MetricsRegistry:
+    """Process-wide view: live sessions, stage totals (including ended sessions) and gauges."""
+
+    def __init__(self):
+        self._sessions = weakref.WeakSet()
+        self._retired = {}  # stage -> StageHistogram of sessions already gone
+        self._finalizers = {}  # id(session) -> weakref.finalize that retires it
+        self._lock = threading.Lock()
+        self.profiler = SamplingProfiler()
+        self.sessions_total = 0
+
+    def register(self, session):
+        with self._lock:
+            self._sessions.add(session)
+            self.sessions_total += 1
+            # Keep the counters monotonic: fold a session's stages in when it goes away
+            self._finalizers[id(session)] = weakref.finalize(session, self._retire, id(session), session.stages)
+
+    def unregister(self, session):
+        """Retires a session now. A finalizer runs once, so this and garbage collection never both count it."""
+        with self._lock:
+            self._sessions.discard(session)
+            finalizer = self._finalizers.get(id(session))
+        if finalizer is not None:
+            finalizer()
+
+    def _retire(self, key, stages):
+        with self._lock:
+            self._finalizers.pop(key, None)
+            for stage, hist in stages.items():
+                self._retired.setdefault(stage, StageHistogram(window=1)).merge(hist)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def stage_totals(self):
+        with self._lock:
+            totals = {}
+            for stage, hist in self._retired.items():
+                totals.setdefault(stage, StageHistogram(window=1)).merge(hist)
+            sessions = list(self._sessions)
+        for session in sessions:
+            for stage, hist in list(session.stages.items()):
+                totals.setdefault(stage, StageHistogram(window=1)).merge(hist)
+        return totals
+
+    def gauges(self):
+        sessions = self.sessions()
+        fps, scheduler, fleet = 0.0, None, None
+        for session in sessions:
+            skipper = session.sources.get("skipper")
+            if skipper is not None:
+                fps += skipper()["effective_fps"]
+            scheduler = scheduler or session.sources.get("scheduler")
+            fleet = fleet or session.sources.get("fleet")
+        out = {
+            "pose_active_sessions": len(sessions),
+            "pose_sessions_total": self.sessions_total,
+            "pose_effective_fps": fps,
+            "pose_profiler_running": int(self.profiler.running),
+        }
+        if scheduler is not None:
+            batch, pool = scheduler.stats(), scheduler.pool.stats()
+            out.update({
+                "pose_model_queue_depth": batch["queued"],
+                "pose_model_slots": pool["size"],
+                "pose_model_slots_in_use": pool["in_use"],
+                "pose_model_waiting": pool["waiting"],
+                "pose_batches_total": batch["batches"],
+                "pose_frames_inferred_total": batch["frames"],
+            })
+        if fleet is not None:
+            stats = fleet.stats()
+            out.update({
+                "pose_model_queue_depth": stats["inflight"],
+                "pose_fleet_workers": stats["workers"],
+                "pose_fleet_workers_ready": stats["ready"],
+                "pose_fleet_restarts_total": stats["restarts"],
+                "pose_fleet_failed_frames_total": stats["failed"],
+                "pose_frames_inferred_total": stats["frames"],
+            })
+        return out
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        for name, value in self.gauges().items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+
+        lines += ["# HELP pose_stage_seconds Time spent in each pipeline stage",
+                  "# TYPE pose_stage_seconds histogram"]
+        for stage, hist in sorted(self.stage_totals().items()):
+            cumulative = list(accumulate(hist.counts))
+            for le, n in zip(BUCKETS, cumulative):
+                lines.append(f'pose_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {n}')
+            lines.append(f'pose_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'pose_stage_seconds_sum{{stage="{stage}"}} {hist.sum}')
+            lines.append(f'pose_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            body = self.registry.prometheus()
+        elif url.path == "/profile":
+            try:
+                seconds = float(parse_qs(url.query).get("seconds", ["5"])[0])
+            except ValueError:
+                seconds = float("nan")
+            if not 0.0 <= seconds < float("inf"):  # Also rejects NaN
+                self.send_error(400, "seconds must be a non-negative number")
+                return
+            body = self.registry.profiler.profile(min(seconds, 60.0)) + "\n"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+_registry = None
+_server = None
+_server_failed = False  # Bind failed once: later sessions do not retry
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide metrics registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+    return _registry
+
+
+def start_server(port=None):
+    """Serves /metrics and /profile on a daemon thread, once per process. Port 0 = disabled."""
+    global _server, _server_failed
+    port = config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    registry = get_registry()
+    with _registry_lock:
+        if _server is None and not _server_failed:
+            handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+            try:
+                _server = ThreadingHTTPServer((config.METRICS_HOST, port), handler)
+            except OSError as e:
+                # Port taken, e.g. by another worker process
+                _server_failed = True
+                log.warning("Metrics endpoint disabled: cannot listen on %s:%s (%s)", config.METRICS_HOST, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,114 @@
+# src/model_pool.py
+import logging
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+import config
+
+log = logging.getLogger(__name__)
+
+
+class ModelPool:
+    """
+    Process-wide pool of pose models shared by every session.
+    The weights are read from disk once. Each slot is a clone of that
+    backend: the network (and its weights) is shared, while per-call state
+    (the ultralytics predictor, an OpenVINO infer request) is private to
+    the slot, so two slots can run inference at the same time.
+    """
+
+    def __init__(self, model_path, size, backend=None, threads=None):
+        from src.backends import load_backend
+
+        base = load_backend(backend, model_path, threads)
+        self.model_path = model_path
+        self.backend = base.name
+        self.size = max(1, int(size))
+        self._free = [base] + [base.clone() for _ in range(self.size - 1)]
+        self._sem = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+
+        # Occupancy counters
+        self.in_use = 0
+        self.waiting = 0
+        self.served = 0
+        self.timeouts = 0
+
+    def warmup(self, imgsz=640):
+        """Runs one dummy inference per slot so the first real frame is not slow."""
+        dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        # Slots share one network, so warm them one after another: the first
+        # predictor fuses the layers in place and the others must see that.
+        for model in list(self._free):
+            model.predict([dummy])
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Checks out a model for one inference call. Yields None on timeout."""
+        with self._lock:
+            self.waiting += 1
+        acquired = self._sem.acquire(timeout=timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.timeouts += 1
+            else:
+                model = self._free.pop()
+                self.in_use += 1
+
+        if not acquired:
+            yield None
+            return
+
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._free.append(model)
+                self.in_use -= 1
+                self.served += 1
+            self._sem.release()
+
+    def stats(self):
+        """Snapshot of pool occupancy."""
+        with self._lock:
+            return {
+                "model": self.model_path,
+                "backend": self.backend,
+                "size": self.size,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "served": self.served,
+                "timeouts": self.timeouts,
+            }
+
+
+_pool = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the process-wide ModelPool, loading and warming it on first call.
+    Returns None if the model cannot be loaded, like the old per-session path.
+    """
+    global _pool, _pool_failed
+    if _pool is not None or _pool_failed:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None and not _pool_failed:
+            try:
+                pool = ModelPool(config.MODEL_PATH, config.MODEL_POOL_SIZE)
+                if config.MODEL_WARMUP:
+                    pool.warmup()
+                _pool = pool
+            except Exception:
+                # Cached until restart, so say why once
+                log.exception("Pose model could not be loaded (%s, %s); inference is disabled",
+                              config.INFERENCE_BACKEND, config.MODEL_PATH)
+                _pool_failed = True
+    return _pool
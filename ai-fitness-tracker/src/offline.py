@@ -0,0 +1,340 @@
+# src/offline.py
+"""
+Headless re-scoring of recorded workout videos.
+Runs the same pose -> smoothing -> rep-counting pipeline as the live app
+(any exercise in the library), with decoding, inference and counting as
+pipelined stages, and spreads files across a process pool.
+
+    python -m src.offline clips/*.mp4 --mode combine --out results/ --workers 4 --save-traces traces/
+    python -m src.offline clips/*.mp4 --exercise squat --no-smooth
+    python -m src.offline traces/*.posetrace --mode normal     # re-count without the model
+
+Inputs ending in .posetrace (see src/trace.py) are replayed from the
+recorded poses in this process, without loading a model.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import config
+from src.backends import BACKENDS
+from src.counter import REP_SIDES
+from src.exercises import ExerciseCounter, get_library
+from src.smoothing import KeypointFilter
+from src.trace import PoseTrace, TraceWriter, replay
+
+_END = object()
+_model = None  # One model per worker process (see _init_worker)
+
+MODES = {"normal": "Normal (Single Arm)", "combine": "Combine (Double Arm)"}
+TIMELINE_FIELDS = ["frame", "time", "angle_left", "angle_right", "count_left", "count_right", "count_combine"]
+
+
+def _init_worker(backend, model_path, threads):
+    global _model
+    from src.backends import load_backend
+
+    _model = load_backend(backend, model_path, threads)
+
+
+class _Stage(threading.Thread):
+    """Pipeline stage thread; re-raises its error in the consumer via join_checked()."""
+
+    def __init__(self, target, *args):
+        super().__init__(daemon=True)
+        self._target_fn, self._args = target, args
+        self.error = None
+
+    def run(self):
+        try:
+            self._target_fn(*self._args)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._args[-1].put(_END)  # Last argument is always the output queue
+
+    def join_checked(self):
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
+def _decode(path, stride, info, out_q):
+    """Stage 1: read frames, keeping every `stride`-th one."""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+    info["fps"] = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    try:
+        idx = 0
+        while cap.grab():  # grab() skips decoding work for dropped frames
+            if idx % stride == 0:
+                ok, img = cap.retrieve()
+                if not ok:
+                    break
+                out_q.put((idx, img))
+            idx += 1
+        info["frames"] = idx
+    finally:
+        cap.release()
+
+
+def _infer(in_q, batch, tracker, out_q):
+    """Stage 2: batched pose inference + tracking, in frame order."""
+    done = False
+    while not done:
+        items = [in_q.get()]
+        # Take whatever else is already decoded, up to the batch size
+        while len(items) < batch:
+            try:
+                items.append(in_q.get_nowait())
+            except queue.Empty:
+                break
+        if items[-1] is _END:
+            items.pop()
+            done = True
+        if not items:
+            break
+
+        poses = _model.predict([img for _, img in items])
+        for (idx, img), pose in zip(items, poses):
+            out_q.put((idx, tracker.update(pose, img)))
+
+
+def process_file(path, mode, stride=1, batch=8, out_dir=None, formats=("json",), trace_dir=None, float16=False,
+                 exercise=None, smooth=None):
+    """
+    Scores one video. Returns a summary dict; writes outputs if out_dir is
+    set, and the tracked poses as a .posetrace file if trace_dir is set.
+    exercise defaults to config.EXERCISE and smooth to config.SMOOTH_ENABLED.
+    As in the live app, the main person's keypoints are smoothed, and with
+    a stride the frames in between are counted on predicted keypoints.
+    """
+    from src.tracking import SessionTracker
+
+    info = {"fps": 30.0, "frames": 0}
+    frames_q = queue.Queue(maxsize=batch * 4)
+    poses_q = queue.Queue(maxsize=batch * 4)
+
+    start = time.perf_counter()
+    decoder = _Stage(_decode, path, stride, info, frames_q)
+    decoder.start()
+    tracker = SessionTracker()
+    inferer = _Stage(_infer, frames_q, batch, tracker, poses_q)
+    inferer.start()
+
+    # Stage 3: counting (this thread)
+    counter = ExerciseCounter(exercise, MODES[mode])
+    smoother = KeypointFilter() if (config.SMOOTH_ENABLED if smooth is None else smooth) else None
+    main_id = None
+    timeline, reps = [], []
+    trace = None
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        trace = TraceWriter(os.path.join(trace_dir, f"{stem}.posetrace"), "float16" if float16 else "float32",
+                            meta={"source": path, "stride": stride})
+    while True:
+        item = poses_q.get()
+        if item is _END:
+            break
+        idx, pose = item
+        t = idx / info["fps"]
+        if trace is not None:
+            trace.write(t, pose)
+        row = {"frame": idx, "time": round(t, 3), "angle_left": None, "angle_right": None}
+
+        main = pose.largest()
+        if main != -1 and len(pose.keypoints[main]) >= counter.bank.min_keypoints:
+            kps = pose.keypoints[main]
+            if smoother is not None:
+                # A different person took over: their joints share no history
+                if pose.ids[main] != main_id:
+                    main_id = pose.ids[main]
+                    smoother.reset()
+                # Frames dropped by the stride are counted on predicted joints
+                for skipped in range(idx - stride + 1, idx):
+                    predicted = smoother.predict(skipped / info["fps"])
+                    if predicted is not None:
+                        _count(counter, predicted, skipped, skipped / info["fps"], reps)
+                kps = smoother.update(kps, pose.kpt_conf[main], t)
+            _count(counter, kps, idx, t, reps)
+            row["angle_left"], row["angle_right"] = round(counter.angle_left, 2), round(counter.angle_right, 2)
+
+        row.update({f"count_{k}": v for k, v in counter.counts().items()})
+        timeline.append(row)
+
+    inferer.join()
+    while decoder.is_alive():  # Unblock the decoder if inference died early
+        try:
+            frames_q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    if trace is not None:
+        trace.close()
+    decoder.join_checked()
+    inferer.join_checked()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "file": path,
+        "mode": mode,
+        "exercise": counter.exercise.name,
+        "frames": info["frames"],
+        "processed": len(timeline),
+        "seconds": round(elapsed, 3),
+        "fps": round(len(timeline) / elapsed, 2) if elapsed else 0.0,
+        "counts": counter.counts(),
+    }
+    if out_dir:
+        _write_outputs(out_dir, summary, reps, timeline, formats)
+    return summary
+
+
+def _count(counter, kps, idx, t, reps):
+    """Feeds one frame's keypoints to the counter; appends a row to `reps` per counter that went up."""
+    went_up = counter.update(kps)
+    if went_up:
+        counts = counter.counts()
+        for side in REP_SIDES[went_up]:
+            reps.append({"frame": idx, "time": round(t, 3), "side": side, "count": counts[side]})
+
+
+def replay_file(path, mode, out_dir=None, formats=("json",), exercise=None, smooth=None):
+    """Scores a recorded .posetrace without the model; same counting and outputs as process_file."""
+    start = time.perf_counter()
+    trace = PoseTrace(path)
+    times = trace.times
+    exercise = exercise or config.EXERCISE
+    angles, counts = replay(trace, MODES[mode], exercise=exercise,
+                            smooth=config.SMOOTH_ENABLED if smooth is None else smooth)
+    stride = trace.meta.get("stride", 1)
+
+    timeline, reps = [], []
+    went_up = np.diff(counts, axis=0, prepend=np.zeros((1, 3), np.int64)) > 0
+    rows = zip(times.tolist(), angles.tolist(), counts.tolist())
+    for i, (t, (angle_left, angle_right), (left, right, combine)) in enumerate(rows):
+        found = angle_left == angle_left  # NaN: nobody in this frame
+        timeline.append({"frame": i * stride, "time": round(t, 3),
+                         "angle_left": round(angle_left, 2) if found else None,
+                         "angle_right": round(angle_right, 2) if found else None,
+                         "count_left": left, "count_right": right, "count_combine": combine})
+        for col in np.flatnonzero(went_up[i]):
+            side = ("left", "right", "combine")[col]
+            reps.append({"frame": i * stride, "time": round(t, 3), "side": side, "count": int(counts[i, col])})
+    elapsed = time.perf_counter() - start
+
+    final = counts[-1] if len(counts) else np.zeros(3, np.int64)
+    summary = {
+        "file": path,
+        "mode": mode,
+        "exercise": exercise,
+        "frames": len(trace) * stride,
+        "processed": len(trace),
+        "seconds": round(elapsed, 3),
+        "fps": round(len(trace) / elapsed, 2) if elapsed else 0.0,
+        "counts": {"left": int(final[0]), "right": int(final[1]), "combine": int(final[2])},
+    }
+    trace.close()
+    if out_dir:
+        _write_outputs(out_dir, summary, reps, timeline, formats)
+    return summary
+
+
+def _write_outputs(out_dir, summary, reps, timeline, formats):
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(summary["file"]))[0]
+    if "json" in formats:
+        with open(os.path.join(out_dir, f"{stem}.json"), "w", encoding="utf-8") as f:
+            json.dump({**summary, "reps": reps, "timeline": timeline}, f)
+    if "csv" in formats:
+        with open(os.path.join(out_dir, f"{stem}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=TIMELINE_FIELDS)
+            writer.writeheader()
+            writer.writerows(timeline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count reps in recorded workout videos.")
+    parser.add_argument("videos", nargs="+", help="Video files or glob patterns")
+    parser.add_argument("--mode", choices=sorted(MODES), default="normal")
+    parser.add_argument("--exercise", choices=list(get_library()), default=config.EXERCISE,
+                        help="Exercise to count")
+    parser.add_argument("--no-smooth", dest="smooth", action="store_false", default=config.SMOOTH_ENABLED,
+                        help="Count on the raw keypoints")
+    parser.add_argument("--out", default="results", help="Output folder")
+    parser.add_argument("--format", choices=["json", "csv", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=1, help="Inference threads per worker")
+    parser.add_argument("--stride", type=int, default=1, help="Process every N-th frame")
+    parser.add_argument("--batch", type=int, default=config.BATCH_MAX_SIZE)
+    parser.add_argument("--model", default=config.MODEL_PATH)
+    parser.add_argument("--backend", choices=BACKENDS, default=config.INFERENCE_BACKEND)
+    parser.add_argument("--save-traces", metavar="DIR", help="Also save each video's poses as a .posetrace")
+    parser.add_argument("--float16", action="store_true", help="Half-size traces")
+    args = parser.parse_args(argv)
+
+    paths = sorted({p for pattern in args.videos for p in (glob.glob(pattern) or [pattern])})
+    traces = [p for p in paths if p.endswith(".posetrace")]
+    videos = [p for p in paths if not p.endswith(".posetrace")]
+    formats = ("json", "csv") if args.format == "both" else (args.format,)
+
+    start = time.perf_counter()
+    summaries = []
+    # Recorded traces: no model, counted here at memory speed
+    for p in traces:
+        try:
+            s = replay_file(p, args.mode, args.out, formats, args.exercise, args.smooth)
+        except Exception as e:
+            print(f"FAILED {p}: {e}")
+            continue
+        summaries.append(s)
+        print(f"{s['file']}: {s['counts']} ({s['processed']} frames replayed, {s['fps']} fps)")
+
+    if videos:
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                 initargs=(args.backend, args.model, args.threads)) as pool:
+            jobs = {
+                pool.submit(process_file, p, args.mode, args.stride, args.batch, args.out, formats,
+                            args.save_traces, args.float16, args.exercise, args.smooth): p
+                for p in videos
+            }
+            for job in as_completed(jobs):
+                try:
+                    s = job.result()
+                except Exception as e:
+                    print(f"FAILED {jobs[job]}: {e}")
+                    continue
+                summaries.append(s)
+                print(f"{s['file']}: {s['counts']} ({s['processed']} frames, {s['fps']} fps)")
+    wall = time.perf_counter() - start
+
+    if summaries:
+        os.makedirs(args.out, exist_ok=True)
+        with open(os.path.join(args.out, "summary.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "mode", "exercise", "frames", "processed", "seconds", "fps",
+                             "left", "right", "combine"])
+            for s in summaries:
+                c = s["counts"]
+                writer.writerow([s["file"], s["mode"], s["exercise"], s["frames"], s["processed"], s["seconds"], s["fps"],
+                                 c["left"], c["right"], c["combine"]])
+
+    frames = sum(s["processed"] for s in summaries)
+    cores = args.workers * args.threads
+    print(f"{len(summaries)}/{len(paths)} files, {frames} frames in {wall:.1f}s: "
+          f"{frames / wall:.1f} fps total, {frames / wall / cores:.1f} fps per core")
+
+
+if __name__ == "__main__":
+    main()
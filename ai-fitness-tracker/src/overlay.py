@@ -0,0 +1,162 @@
+# src/overlay.py
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import config
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+PAD = 5  # Box padding around label text, as in the original draw_status
+
+# Skeleton as two polylines: left and right shoulder -> elbow -> wrist.
+# Rows index the (6, 2) arm keypoints returned by BicepCurlProcessor.analyze.
+ARM_CHAINS = np.array([[0, 1, 2], [3, 4, 5]], dtype=np.intp)
+
+
+class Sprite:
+    """Pre-rasterized BGR image plus alpha, with its anchor offset."""
+
+    __slots__ = ("bgr", "alpha", "mask", "binary", "dx", "dy")
+
+    def __init__(self, bgr, alpha, dx, dy):
+        self.bgr = bgr
+        self.alpha = alpha                       # (h, w, 1) float32 in [0, 1]
+        self.mask = (alpha[..., 0] == 1.0).astype(np.uint8)  # Fully opaque pixels, for cv2.copyTo
+        # Only 0/1 alpha: a masked copy is enough, no blending arithmetic
+        self.binary = bool(((alpha == 1.0) | (alpha == 0.0)).all())
+        self.dx, self.dy = dx, dy                # Top-left relative to the anchor
+
+
+class LabelCache:
+    """
+    LRU cache of label sprites keyed by (text, colors, scale, thickness).
+    Counter labels change a few times a minute, so almost every frame is a
+    hit and cv2.getTextSize/putText run only for new texts.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or config.LABEL_CACHE_SIZE
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, color=(255, 255, 255), bg_color=(0, 0, 0), scale=1.0, thickness=2):
+        key = (text, tuple(color), tuple(bg_color), scale, thickness)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+
+        sprite = self._rasterize(text, color, bg_color, scale, thickness)
+        with self._lock:
+            self._sprites[key] = sprite
+            while len(self._sprites) > self.capacity:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def _rasterize(text, color, bg_color, scale, thickness):
+        (w, h), _ = cv2.getTextSize(text, FONT, scale, thickness)
+        # cv2.rectangle includes both corners, hence the + 1
+        bgr = np.empty((h + 2 * PAD + 1, w + 2 * PAD + 1, 3), np.uint8)
+        bgr[:] = bg_color
+        cv2.putText(bgr, text, (PAD, h + PAD), FONT, scale, color, thickness)
+        alpha = np.full(bgr.shape[:2] + (1,), config.LABEL_OPACITY, np.float32)
+        # Text pixels are always fully opaque
+        alpha[(bgr != np.asarray(bg_color, np.uint8)).any(axis=2)] = 1.0
+        # Anchor = text baseline start, as cv2.putText uses it
+        return Sprite(bgr, alpha, -PAD, -h - PAD)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._sprites), "hits": self.hits, "misses": self.misses}
+
+
+def blit(img, sprite, pos):
+    """Alpha-blends a sprite into img in place at anchor pos, clipped to the frame."""
+    x0, y0 = pos[0] + sprite.dx, pos[1] + sprite.dy
+    h, w = sprite.bgr.shape[:2]
+    H, W = img.shape[:2]
+    sx0, sy0 = max(0, -x0), max(0, -y0)
+    sx1, sy1 = min(w, W - x0), min(h, H - y0)
+    if sx0 >= sx1 or sy0 >= sy1:
+        return
+
+    roi = img[y0 + sy0:y0 + sy1, x0 + sx0:x0 + sx1]
+    src = sprite.bgr[sy0:sy1, sx0:sx1]
+    if sprite.binary:
+        cv2.copyTo(src, sprite.mask[sy0:sy1, sx0:sx1], roi)
+        return
+    a = sprite.alpha[sy0:sy1, sx0:sx1]
+    roi[:] = (src * a + roi * (1.0 - a)).astype(np.uint8)
+
+
+class Overlay:
+    """
+    The HUD (counter labels) rendered once into a small separate BGRA panel.
+    The panel is rebuilt only when the label texts change; applying it to a
+    frame touches just the panel's pixels, never the rest of the frame.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or get_label_cache()
+        self._key = None
+        self._panel = None   # Sprite covering every label
+        self._origin = (0, 0)
+
+    def set_labels(self, labels):
+        """labels = [(text, (x, y)), ...] with x, y as for cv2.putText."""
+        key = tuple(labels)
+        if key == self._key:
+            return
+        self._key = key
+        if not labels:
+            self._panel = None
+            return
+
+        sprites = [(self.cache.get(text), pos) for text, pos in labels]
+        x0 = min(pos[0] + s.dx for s, pos in sprites)
+        y0 = min(pos[1] + s.dy for s, pos in sprites)
+        x1 = max(pos[0] + s.dx + s.bgr.shape[1] for s, pos in sprites)
+        y1 = max(pos[1] + s.dy + s.bgr.shape[0] for s, pos in sprites)
+
+        bgr = np.zeros((y1 - y0, x1 - x0, 3), np.uint8)
+        alpha = np.zeros((y1 - y0, x1 - x0, 1), np.float32)
+        for s, pos in sprites:
+            x, y = pos[0] + s.dx - x0, pos[1] + s.dy - y0
+            h, w = s.bgr.shape[:2]
+            bgr[y:y + h, x:x + w] = s.bgr
+            alpha[y:y + h, x:x + w] = s.alpha
+        self._panel = Sprite(bgr, alpha, 0, 0)
+        self._origin = (x0, y0)
+
+    def apply(self, img):
+        if self._panel is not None:
+            blit(img, self._panel, self._origin)
+
+
+def draw_skeleton(img, arm_points):
+    """Draws the (6, 2) arm keypoints: all segments in one polylines call, then the joints."""
+    pts = np.rint(arm_points).astype(np.int32)
+    cv2.polylines(img, list(pts[ARM_CHAINS]), False, config.COLOR_LINE, 3)
+    for x, y in pts.tolist():
+        cv2.circle(img, (x, y), 6, config.COLOR_JOINT, -1)
+
+
+_label_cache = None
+_label_cache_lock = threading.Lock()
+
+
+def get_label_cache():
+    """Process-wide label sprite cache shared by every session."""
+    global _label_cache
+    with _label_cache_lock:
+        if _label_cache is None:
+            _label_cache = LabelCache()
+    return _label_cache
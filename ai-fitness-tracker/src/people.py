@@ -0,0 +1,97 @@
+# src/people.py
+import numpy as np
+
+import config
+from src.exercises import ExerciseBank
+
+
+class PeopleCounter:
+    """
+    Rep counters for everyone in view, keyed by tracker id.
+    Each track gets a row of an ExerciseBank; all people's angles and
+    phase transitions are computed in one vectorized step per frame. Rows of
+    tracks not seen for `stale_after` seconds are freed (and their final
+    counts reported), so a group class can cycle through more people than
+    `capacity` over a session. Untracked detections (id -1) are ignored.
+    """
+
+    def __init__(self, mode, capacity=None, stale_after=None, exercise=None):
+        self.mode = mode
+        self.capacity = capacity or config.MULTI_MAX_PEOPLE
+        self.stale_after = config.MULTI_STALE_SECONDS if stale_after is None else stale_after
+        self.bank = ExerciseBank([exercise or config.EXERCISE], self.capacity)
+        self.joints = self.bank.exercises[0].joints
+
+        self.rows = {}                                   # track id -> bank row
+        self.track_ids = np.full(self.capacity, -1, np.int64)
+        self.last_seen = np.full(self.capacity, -np.inf)
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self.evicted = 0
+
+    def _row(self, track_id, now):
+        row = self.rows.get(track_id)
+        if row is not None:
+            return row
+        if not self._free:
+            # Full: recycle whoever was seen least recently
+            self._release(int(self.last_seen.argmin()))
+        row = self._free.pop()
+        self.last_seen[row] = now  # Already taken for this frame: never recycled by the argmin above
+        self.bank.set_row(row, self.mode)
+        self.rows[track_id] = row
+        self.track_ids[row] = track_id
+        return row
+
+    def _release(self, row):
+        del self.rows[int(self.track_ids[row])]
+        self.track_ids[row] = -1
+        self.last_seen[row] = -np.inf
+        self._free.append(row)
+        self.evicted += 1
+
+    def evict(self, now):
+        """Frees rows of tracks unseen for stale_after seconds. Returns [(track id, counts)]."""
+        stale = np.flatnonzero((self.track_ids >= 0) & (now - self.last_seen > self.stale_after))
+        gone = [(int(self.track_ids[r]), self.counts(r)) for r in stale]
+        for r in stale:
+            self._release(int(r))
+        return gone
+
+    def update(self, pose, now):
+        """
+        Counts one frame of tracked people. Returns (idx, rows, angles, reps):
+        indices into pose of the people counted, their bank rows, their
+        (n, 2) primary angles (elbows for curls) and an (n, 3) bool array
+        of which counters went up. angles is overwritten by the next call.
+        """
+        idx = np.flatnonzero(pose.ids >= 0)
+        if len(idx) > self.capacity:
+            # More people than rows: count the largest (closest) ones
+            idx = idx[np.argsort(-pose.areas()[idx], kind="stable")[:self.capacity]]
+        if len(idx) == 0:
+            return idx, idx, np.zeros((0, 2), np.float32), np.zeros((0, 3), bool)
+        # Stamp the tracks already holding rows first, so a new track in the same
+        # frame never recycles the row of someone who is still in view
+        for i in idx:
+            row = self.rows.get(int(pose.ids[i]))
+            if row is not None:
+                self.last_seen[row] = now
+        rows = np.array([self._row(int(pose.ids[i]), now) for i in idx], np.intp)
+
+        reps = self.bank.update(pose.keypoints[idx], rows)
+        return idx, rows, self.bank.primary_angles(), reps
+
+    def counts(self, row):
+        left, right, combine = self.bank.counts[row]
+        return {"left": int(left), "right": int(right), "combine": int(combine)}
+
+    def overlay(self, pose, idx, rows):
+        """[(skeleton keypoints (6, 2), label, label anchor)] per counted person, for the render stage."""
+        out = []
+        combine = self.bank.mode_mask[rows, 2]
+        for i, row, both in zip(idx, rows, combine):
+            left, right, total = self.bank.counts[row]
+            label = f"#{pose.ids[i]}: {total}" if both else f"#{pose.ids[i]}: L{left} R{right}"
+            x1, y1 = pose.boxes[i, :2]
+            out.append((pose.keypoints[i][self.joints], label, (int(x1) + 5, max(int(y1) - 10, 30))))
+        return out
@@ -0,0 +1,186 @@
+# src/pipeline.py
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+
+log = logging.getLogger(__name__)
+
+
+class LatestSlot:
+    """
+    Single-item buffer between two stages: a new item replaces the one
+    waiting, so a slow consumer always gets the newest data and never a
+    backlog. Replaced items are counted as dropped.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        """Stores item; returns the unconsumed item it replaced, or None."""
+        with self._lock:
+            replaced, self._item = self._item, item
+            if replaced is not None:
+                self.dropped += 1
+            return replaced
+
+    def take(self):
+        """Removes and returns the waiting item, or None."""
+        with self._lock:
+            item, self._item = self._item, None
+            return item
+
+
+class FrameBuffers:
+    """
+    Recycled frame-sized arrays, so copying a frame into the pipeline does
+    not allocate. A session needs at most three: one being inferred, one
+    waiting in the slot and one being filled.
+    """
+
+    def __init__(self):
+        self._free = []
+        self._lock = threading.Lock()
+        self.allocated = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            while self._free:
+                buf = self._free.pop()
+                if buf.shape == shape and buf.dtype == dtype:
+                    return buf
+                # Resolution changed: let old-sized buffers go
+            self.allocated += 1
+        return np.empty(shape, dtype)
+
+    def release(self, buf):
+        with self._lock:
+            self._free.append(buf)
+
+
+class FramePipeline:
+    """
+    Per-session staged pipeline:
+        capture (recv) -> LatestSlot -> inference (shared worker pool) -> render (recv)
+    recv() pushes frames and never waits for inference; it renders whatever
+    result is newest, so an unprocessed frame reuses the last overlay.
+    At most one inference job per session is in flight at a time.
+    Pushed frames are copied into recycled buffers, so the caller may keep
+    drawing on (or hand back) its own frame.
+
+    Latency is measured from a frame's capture to the first time a frame
+    carrying its result is rendered (per session, rolling window).
+    A failing analyze() is logged with its traceback the first time, then
+    at most once per PIPELINE_ERROR_LOG_INTERVAL seconds; the newest error
+    is kept in last_error.
+    """
+
+    def __init__(self, analyze, executor=None, history=300):
+        self.analyze = analyze          # (img, capture time) -> result, runs in the worker pool
+        self.executor = executor or get_executor()
+        self._frames = LatestSlot()
+        self.buffers = FrameBuffers()
+        self._lock = threading.Lock()
+        self._busy = False
+        self._result = None             # (capture time, result)
+        self._rendered = True           # Latency already recorded for _result
+        self._latency = deque(maxlen=history)
+        self.completed = 0
+        self.errors = 0
+        self.last_error = None          # repr() of the newest analyze() exception
+        self._logged_at = None          # When an error was last logged
+        self._unlogged = 0              # Errors since then
+
+    def push(self, img, captured=None):
+        """Capture stage: offers a copy of the frame to inference (latest wins)."""
+        buf = self.buffers.acquire(img.shape, img.dtype)
+        np.copyto(buf, img)
+        replaced = self._frames.put((time.monotonic() if captured is None else captured, buf))
+        if replaced is not None:
+            self.buffers.release(replaced[1])
+        with self._lock:
+            if self._busy:
+                return
+            self._busy = True
+        self.executor.submit(self._work)
+
+    def _work(self):
+        while True:
+            item = self._frames.take()
+            if item is None:
+                with self._lock:
+                    # Re-check under the lock so a frame pushed just now isn't stranded
+                    item = self._frames.take()
+                    if item is None:
+                        self._busy = False
+                        return
+            captured, img = item
+            try:
+                result = self.analyze(img, captured)
+            except Exception as e:
+                self._error(e)
+                continue
+            finally:
+                self.buffers.release(img)
+            with self._lock:
+                self._result = (captured, result)
+                self._rendered = False
+                self.completed += 1
+
+    def _error(self, e):
+        self.errors += 1
+        self.last_error = repr(e)
+        now = time.monotonic()
+        if self._logged_at is None:
+            log.exception("Frame analysis failed")
+        elif now - self._logged_at >= config.PIPELINE_ERROR_LOG_INTERVAL:
+            log.error("Frame analysis failed %d more times, latest: %r", self._unlogged + 1, e)
+        else:
+            self._unlogged += 1
+            return
+        self._logged_at, self._unlogged = now, 0
+
+    def latest(self, max_age=None):
+        """Render stage: newest result, or None if there is none (or it is too old)."""
+        with self._lock:
+            if self._result is None:
+                return None
+            captured, result = self._result
+            now = time.monotonic()
+            if not self._rendered:
+                self._rendered = True
+                self._latency.append(now - captured)
+        if max_age is not None and now - captured > max_age:
+            return None
+        return result
+
+    def stats(self):
+        with self._lock:
+            lat = np.array(self._latency, dtype=np.float64) * 1000.0
+        out = {"completed": self.completed, "dropped": self._frames.dropped, "errors": self.errors,
+               "last_error": self.last_error, "buffers": self.buffers.allocated}
+        if len(lat):
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            out.update({"latency_ms_p50": float(p50), "latency_ms_p95": float(p95), "latency_ms_p99": float(p99)})
+        return out
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide worker pool for the inference stage of every session."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(config.PIPELINE_WORKERS, thread_name_prefix="pose-stage")
+    return _executor
@@ -0,0 +1,82 @@
+# src/pose.py
+import numpy as np
+
+NUM_KEYPOINTS = 17  # COCO keypoints produced by the YOLO pose models
+
+
+class PoseFrame:
+    """
+    Plain NumPy view of one frame of pose output.
+    boxes     = (N, 4) xyxy pixel boxes
+    scores    = (N,) detection confidences
+    ids       = (N,) tracker ids (-1 when untracked)
+    keypoints = (N, 17, 2) pixel coordinates
+    kpt_conf  = (N, 17) keypoint confidences
+    shape     = (height, width) of the source frame
+    """
+
+    __slots__ = ("boxes", "scores", "ids", "keypoints", "kpt_conf", "shape")
+
+    def __init__(self, boxes, scores, ids, keypoints, kpt_conf, shape):
+        self.boxes = boxes
+        self.scores = scores
+        self.ids = ids
+        self.keypoints = keypoints
+        self.kpt_conf = kpt_conf
+        self.shape = tuple(shape[:2])
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @classmethod
+    def empty(cls, shape):
+        return cls(
+            np.zeros((0, 4), np.float32),
+            np.zeros(0, np.float32),
+            np.zeros(0, np.int64),
+            np.zeros((0, NUM_KEYPOINTS, 2), np.float32),
+            np.zeros((0, NUM_KEYPOINTS), np.float32),
+            shape,
+        )
+
+    @classmethod
+    def from_result(cls, result):
+        """Converts an ultralytics Results object (one image) to a PoseFrame."""
+        boxes, kps = result.boxes, result.keypoints
+        if boxes is None or kps is None or len(boxes) == 0:
+            return cls.empty(result.orig_shape)
+
+        xy = kps.xy.cpu().numpy().astype(np.float32)
+        if boxes.id is not None:
+            ids = boxes.id.cpu().numpy().astype(np.int64)
+        else:
+            ids = np.full(len(boxes), -1, np.int64)
+        if kps.conf is not None:
+            conf = kps.conf.cpu().numpy().astype(np.float32)
+        else:
+            conf = np.ones(xy.shape[:2], np.float32)
+
+        return cls(
+            boxes.xyxy.cpu().numpy().astype(np.float32),
+            boxes.conf.cpu().numpy().astype(np.float32),
+            ids, xy, conf, result.orig_shape,
+        )
+
+    def areas(self):
+        """(N,) box areas."""
+        return (self.boxes[:, 2] - self.boxes[:, 0]) * (self.boxes[:, 3] - self.boxes[:, 1])
+
+    def largest(self):
+        """Index of the person with the largest box, or -1 (no one, or only empty boxes)."""
+        if len(self.boxes) == 0:
+            return -1
+        areas = self.areas()
+        idx = int(areas.argmax())
+        return idx if areas[idx] > 0 else -1
+
+    def select(self, idx):
+        """Returns a new PoseFrame holding only the people at `idx`."""
+        return PoseFrame(
+            self.boxes[idx], self.scores[idx], self.ids[idx],
+            self.keypoints[idx], self.kpt_conf[idx], self.shape,
+        )
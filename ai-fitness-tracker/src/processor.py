@@ -1,115 +1,291 @@
-import cv2
-import av
+import logging
+import os
+import time
+from collections import deque
 import numpy as np
-from ultralytics import YOLO
 from streamlit_webrtc import VideoTransformerBase
 import config
-from src.utils import calculate_angle
+from src.counter import MODE_COMBINE, MODE_NORMAL, REP_SIDES
+from src.exercises import ExerciseCounter
+from src.fleet import get_fleet
+from src.frame_skip import AdaptiveFrameSkipper
+from src.frames import bgr_view
+from src.history import get_store
+from src.metrics import SessionMetrics, start_server
+from src.overlay import Overlay, blit, draw_skeleton
+from src.people import PeopleCounter
+from src.pipeline import FramePipeline
+from src.roi import RoiCropper
+from src.scheduler import get_scheduler
+from src.smoothing import KeypointFilter
+from src.speech import get_announcer
+from src.trace import TraceWriter
+from src.tracking import SessionTracker
+
+log = logging.getLogger(__name__)
 
 class BicepCurlProcessor(VideoTransformerBase):
-    def __init__(self, mode):
+    def __init__(self, mode, group=None, user=None, exercise=None):
         self.mode = mode
-        try:
-            self.model = YOLO(config.MODEL_PATH)
-        except:
-            self.model = None
-
-        # Counters
-        self.count_left = 0
-        self.count_right = 0
-        self.count_combine = 0
-        
-        # States (0: Down/Relaxed, 1: Up/Curled)
-        self.state_left = 0 
-        self.state_right = 0
-        self.state_combine = 0
-
-        self.frame_counter = 0
+        self.exercise = exercise or config.EXERCISE
+        # Group mode: count everyone tracked, not just the largest person
+        self.group = config.MULTI_PERSON if group is None else group
+        self.people = PeopleCounter(mode, exercise=self.exercise) if self.group else None
+        # Worker-process fleet if configured (the worker keeps this session's tracker),
+        # else the shared in-process batching scheduler with a per-session tracker
+        self.fleet = get_fleet()
+        self.remote = self.fleet.session() if self.fleet is not None else None
+        self.scheduler = get_scheduler() if self.remote is None else None
+        self.tracker = SessionTracker() if self.scheduler is not None else None
+
+        # Rep counting rules of the chosen exercise (+ optional spoken counts)
+        self.counter = ExerciseCounter(self.exercise, mode)
+        self.announcer = get_announcer()
+
+        # Workout history: reps are queued to a background writer, never written here
+        self.user = user or config.HISTORY_DEFAULT_USER
+        self.history = get_store()
+        self.session_id = None
+        if self.history is not None:
+            label = f"{self.counter.exercise.label} - {mode}"
+            self.session_id = self.history.start_session(self.user, f"{label} (group)" if self.group else label)
+
+        # Optional pose trace: the tracked model output, for replaying without inference
+        self.trace = None
+        if config.TRACE_DIR:
+            os.makedirs(config.TRACE_DIR, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.session_id or format(id(self), 'x')}.posetrace"
+            self.trace = TraceWriter(os.path.join(config.TRACE_DIR, name),
+                                     "float16" if config.TRACE_FLOAT16 else "float32",
+                                     meta={"user": self.user, "mode": mode, "exercise": self.exercise,
+                                           "group": self.group,
+                                           "started": time.time(), "clock": "monotonic"})
+
+        # Keypoint smoothing; skipped frames are counted on predicted keypoints
+        self.smoother = KeypointFilter() if config.SMOOTH_ENABLED and not self.group else None
+        self.main_id = None
+        self.skipped = deque(maxlen=120)  # Capture times of frames not sent to inference
+
+        # Crop around the last main person before inference (would cut others out in group mode)
+        self.roi = RoiCropper() if config.ROI_ENABLED and not self.group else None
+
+        # Per-session inference rate (replaces the fixed 1-in-3 rule)
+        self.skipper = AdaptiveFrameSkipper(joints=self.counter.joints)
+
+        # Counter labels, rendered into a small cached panel
+        self.overlay = Overlay()
+
+        # Capture -> inference -> render stages, linked by latest-wins buffers
+        ready = self.scheduler is not None or self.remote is not None
+        self.pipeline = FramePipeline(self.analyze) if ready else None
+
+        # Stage timers (recv and analyze), scraped from the metrics endpoint
+        self.metrics = SessionMetrics()
+        self.metrics.sources.update(skipper=self.skipper.stats, scheduler=self.scheduler, fleet=self.fleet)
+        start_server()
 
     def draw_status(self, img, text, pos, color=(255, 255, 255), bg_color=(0, 0, 0)):
-        """Draws text with a background box"""
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        scale = 1.0
-        thickness = 2
-        (w, h), _ = cv2.getTextSize(text, font, scale, thickness)
-        x, y = pos
-        cv2.rectangle(img, (x - 5, y - h - 5), (x + w + 5, y + 5), bg_color, -1)
-        cv2.putText(img, text, (x, y), font, scale, color, thickness)
+        """Draws text with a background box (cached sprite, blended in place)"""
+        blit(img, self.overlay.cache.get(text, color, bg_color), pos)
+
+    def status_labels(self):
+        """Counter labels for the current mode, as (text, position) pairs"""
+        if self.people is not None:
+            return [(f'People: {len(self.people.rows)}', (30, 50))]
+        if self.counter.mode == MODE_NORMAL:
+            return [(f'Left: {self.counter.count_left}', (30, 50)),
+                    (f'Right: {self.counter.count_right}', (30, 100))]
+        elif self.counter.mode == MODE_COMBINE:
+            return [(f'{self.counter.exercise.rep_label}: {self.counter.count_combine}', (30, 50))]
+        return []
 
     def recv(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-        
-        # 1. Frame Skipping (Performance)
-        self.frame_counter += 1
-        if self.frame_counter % 3 != 0:
-            return av.VideoFrame.from_ndarray(img, format="bgr24")
-
-        if self.model is None:
-            return av.VideoFrame.from_ndarray(img, format="bgr24")
-
-        # 2. Run Inference
-        results = self.model.track(img, persist=True, verbose=False)
-        
-        # 3. "Focus Mode" - Find the Largest Person
-        # We look for the bounding box with the largest area
-        max_area = 0
-        main_person_idx = -1
-
-        if results[0].boxes is not None:
-            boxes = results[0].boxes.xyxy.cpu().numpy()
-            for i, box in enumerate(boxes):
-                # Calculate Area: (x2 - x1) * (y2 - y1)
-                area = (box[2] - box[0]) * (box[3] - box[1])
-                if area > max_area:
-                    max_area = area
-                    main_person_idx = i
-
-        # 4. Process ONLY the Main Person
-        if main_person_idx != -1 and results[0].keypoints is not None:
-            keypoints = results[0].keypoints.xy.cpu().numpy()
-            
-            # Select keypoints for the main person only
-            kps = keypoints[main_person_idx]
-
-            if len(kps) > 10:
-                l_s, l_e, l_w = kps[5], kps[7], kps[9]
-                r_s, r_e, r_w = kps[6], kps[8], kps[10]
-
-                angle_left = calculate_angle(l_s, l_e, l_w)
-                angle_right = calculate_angle(r_s, r_e, r_w)
-
-                # --- COUNTING LOGIC ---
-                if "Normal" in self.mode:
-                    # Left
-                    if angle_left > config.UP_THRESH: self.state_left = 1
-                    if angle_left < config.DOWN_THRESH and self.state_left == 1:
-                        self.state_left = 0
-                        self.count_left += 1
-
-                    # Right
-                    if angle_right > config.UP_THRESH: self.state_right = 1
-                    if angle_right < config.DOWN_THRESH and self.state_right == 1:
-                        self.state_right = 0
-                        self.count_right += 1
-
-                elif "Combine" in self.mode:
-                    if angle_left > config.UP_THRESH and angle_right > config.UP_THRESH:
-                        self.state_combine = 1
-                    if angle_left < config.DOWN_THRESH and angle_right < config.DOWN_THRESH and self.state_combine == 1:
-                        self.state_combine = 0
-                        self.count_combine += 1
-
-                # Draw Skeleton (Only for main person)
-                for p1, p2 in [(l_s, l_e), (l_e, l_w), (r_s, r_e), (r_e, r_w)]:
-                    cv2.line(img, (int(p1[0]), int(p1[1])), (int(p2[0]), int(p2[1])), config.COLOR_LINE, 3)
-                for p in [l_s, l_e, l_w, r_s, r_e, r_w]:
-                    cv2.circle(img, (int(p[0]), int(p[1])), 6, config.COLOR_JOINT, -1)
-
-        # 5. Draw UI (OUTSIDE the loop so it never flickers)
-        if "Normal" in self.mode:
-            self.draw_status(img, f'Left: {self.count_left}', (30, 50), bg_color=(0,0,0))
-            self.draw_status(img, f'Right: {self.count_right}', (30, 100), bg_color=(0,0,0))
-        elif "Combine" in self.mode:
-            self.draw_status(img, f'Combine: {self.count_combine}', (30, 50), bg_color=(0,0,0))
-
-        return av.VideoFrame.from_ndarray(img, format="bgr24")
\ No newline at end of file
+        now = time.monotonic()
+        start = time.perf_counter()
+
+        # Model failed to load: nothing to draw, hand the frame back untouched
+        if self.pipeline is None:
+            return frame
+
+        # Frame Skipping (Performance) - adaptive per session
+        process = self.skipper.should_process(now)
+        if not process and self.smoother is not None:
+            self.skipped.append(now)
+        if not process and not config.OVERLAY_ON_SKIPPED:
+            return frame
+
+        # Convert only frames we draw on; img is a view into the returned frame
+        out, img = bgr_view(frame)
+        converted = time.perf_counter()
+        self.metrics.add("convert", converted - start)
+
+        # 1. Capture stage: hand the newest frame to inference without waiting.
+        # The pipeline copies it into a recycled buffer, so drawing below is safe
+        if process:
+            self.pipeline.push(img, now)
+
+        # 2. Render stage: reuse the newest skeleton until a fresher one is ready
+        skeleton = self.pipeline.latest(config.OVERLAY_MAX_AGE)
+        if skeleton is not None and self.smoother is not None:
+            # Move the joints to where they should be now rather than at capture time
+            predicted = self.smoother.predict(now, self.counter.joints)
+            if predicted is not None:
+                skeleton = predicted
+        if skeleton is not None and self.people is not None:
+            # Group mode: everyone's skeleton with their counts above their box
+            for arm, label, pos in skeleton:
+                draw_skeleton(img, arm)
+                blit(img, self.overlay.cache.get(label), pos)
+        elif skeleton is not None:
+            # Draw Skeleton (Only for main person)
+            draw_skeleton(img, skeleton)
+
+        # 3. Draw UI (OUTSIDE the loop so it never flickers)
+        # The label panel is only re-rendered when a count changes
+        self.overlay.set_labels(self.status_labels())
+        self.overlay.apply(img)
+
+        done = time.perf_counter()
+        self.metrics.add("render", done - converted)
+        self.metrics.add("recv", done - start)
+        return out
+
+    def analyze(self, img, captured):
+        """
+        Inference stage (runs on the shared worker pool, one frame at a time
+        per session). Updates the counters and returns the main person's
+        skeleton keypoints (the exercise's primary joints) for the render
+        stage, or None. Timed as the "analyze" stage however it returns.
+        """
+        with self.metrics.time("analyze"):
+            return self._analyze(img, captured)
+
+    def _analyze(self, img, captured):
+        # 1. Run Inference (batched with other sessions, tracked per session)
+        # In ROI mode only a downscaled crop around the last main person is sent
+        m = self.metrics
+        begin = time.perf_counter()
+        if self.remote is not None:
+            # Fleet: the frame goes to shared memory; the worker crops, infers and tracks
+            region = self.roi.region(img.shape) if self.roi is not None else None
+            imgsz = self.roi.imgsz(region) if self.roi is not None else None
+            pose = self.remote.infer(img, region, imgsz, timeout=config.INFERENCE_TIMEOUT)
+            t = time.perf_counter()
+            m.add("infer", t - begin)
+            self.skipper.report_inference(t - begin)
+            if pose is None:
+                return None
+        else:
+            inp, roi = self.roi.prepare(img) if self.roi is not None else (img, None)
+            imgsz = self.roi.imgsz(roi) if self.roi is not None else None
+            start = time.perf_counter()
+            m.add("roi", start - begin)
+            pose = self.scheduler.infer(inp, imgsz=imgsz, timeout=config.INFERENCE_TIMEOUT)
+            t = time.perf_counter()
+            m.add("infer", t - start)  # Includes waiting for the batch
+            self.skipper.report_inference(t - start)
+            if pose is None:
+                return None
+            pose = self.tracker.update(RoiCropper.to_full(pose, roi, img.shape), img)
+            t, prev = time.perf_counter(), t
+            m.add("track", t - prev)
+
+        # Keep the model output (buffered; a chunk is written every 256 frames)
+        trace = self.trace
+        if trace is not None:
+            trace.write(captured, pose)
+
+        # 2. "Focus Mode" - Find the Largest Person
+        # We look for the bounding box with the largest area (argmax over all boxes)
+        main_person_idx = pose.largest()
+        if self.people is not None:
+            return self.analyze_group(pose, main_person_idx, captured)
+
+        if self.roi is not None:
+            self.roi.update(pose.boxes[main_person_idx] if main_person_idx != -1 else None)
+        t, prev = time.perf_counter(), t
+        m.add("select", t - prev)
+
+        # 3. Process ONLY the Main Person
+        if main_person_idx == -1:
+            self.drain_skipped(captured)
+            self.skipper.report_motion(None)
+            return None
+
+        # Select keypoints for the main person only
+        kps = pose.keypoints[main_person_idx]
+        if len(kps) < self.counter.bank.min_keypoints:
+            return None
+
+        if self.smoother is not None:
+            # A different person took over: their joints share no history
+            if pose.ids[main_person_idx] != self.main_id:
+                self.main_id = pose.ids[main_person_idx]
+                self.smoother.reset()
+            # Frames skipped since the last inference are counted on predicted joints
+            for skipped_at in self.drain_skipped(captured):
+                predicted = self.smoother.predict(skipped_at)
+                if predicted is not None:
+                    self.count_reps(predicted)
+            kps = self.smoother.update(kps, pose.kpt_conf[main_person_idx], captured)
+            t, prev = time.perf_counter(), t
+            m.add("smooth", t - prev)
+
+        # --- COUNTING LOGIC ---
+        self.count_reps(kps)
+        t, prev = time.perf_counter(), t
+        m.add("count", t - prev)
+
+        # Feed joint movement back so a still person is sampled less often
+        self.skipper.report_motion(kps, in_rep=self.counter.in_rep())
+
+        # Left first/mid/end joint of the primary angle, then right
+        return kps[self.counter.joints]
+
+    def analyze_group(self, pose, main_person_idx, captured):
+        """Group mode: counts every tracked person at once; returns their overlay items."""
+        # People who left: their rows are about to be reused, so report their final counts now
+        for track, counts in self.people.evict(captured):
+            log.info("Track %d left the group session %s: %s", track, self.session_id, counts)
+        idx, rows, angles, reps = self.people.update(pose, captured)
+        if self.session_id is not None and reps.any():
+            for n, col in zip(*reps.nonzero()):
+                self.history.record_rep(self.user, self.session_id, self.people.bank.sides[col],
+                                        self.people.bank.counts[rows[n], col], angles[n, 0], angles[n, 1],
+                                        track=pose.ids[idx[n]])
+        # The frame rate follows the largest person's movement
+        self.skipper.report_motion(pose.keypoints[main_person_idx] if main_person_idx != -1 else None)
+        return self.people.overlay(pose, idx, rows)
+
+    def count_reps(self, kps):
+        counter = self.counter
+        reps = counter.update(kps)
+        if not reps:
+            return
+        counts = counter.counts()
+        for side in REP_SIDES[reps]:
+            if self.announcer is not None:
+                self.announcer.announce_rep(side, counts[side])
+            if self.session_id is not None:
+                self.history.record_rep(self.user, self.session_id, side, counts[side],
+                                        counter.angle_left, counter.angle_right)
+
+    def on_ended(self):
+        """Called by streamlit-webrtc when the stream stops: closes the history, fleet, trace and metrics sessions."""
+        self.metrics.close()
+        if self.remote is not None:
+            self.remote.close()
+        if self.trace is not None:
+            trace, self.trace = self.trace, None
+            trace.close()
+        if self.history is not None and self.session_id is not None:
+            # Group mode counts per track, not in self.counter: the session's reps are its total
+            self.history.end_session(self.session_id, None if self.people is not None else self.counter.counts())
+            self.session_id = None
+
+    def drain_skipped(self, captured):
+        """Capture times of skipped frames older than `captured`, oldest first."""
+        times = []
+        while self.skipped and self.skipped[0] < captured:
+            times.append(self.skipped.popleft())
+        return times
@@ -0,0 +1,101 @@
+# src/roi.py
+import cv2
+import numpy as np
+
+import config
+
+
+class RoiCropper:
+    """
+    Crops each frame around the last main-person box before inference.
+    The crop is downscaled to at most `size` pixels on its long side and
+    the resulting keypoints are mapped back to full-frame coordinates.
+    A full-frame detection runs every `redetect_every` processed frames,
+    and whenever the main person was lost.
+    """
+
+    def __init__(self, size=None, margin=None, redetect_every=None):
+        self.size = size or config.ROI_SIZE
+        self.margin = config.ROI_MARGIN if margin is None else margin
+        self.redetect_every = redetect_every or config.ROI_REDETECT_EVERY
+        self.box = None          # Last main-person box (full-frame xyxy)
+        self.since_full = 0      # Processed frames since the last full detection
+        self.full_frames = 0
+        self.roi_frames = 0
+
+    def prepare(self, img):
+        """
+        Returns (input image, transform). transform is None for a full frame,
+        otherwise (x offset, y offset, scale) of the crop.
+        """
+        region = self.region(img.shape)
+        if region is None:
+            return img, None
+        x1, y1, _, _, scale = region
+        return self.crop(img, region), (x1, y1, scale)
+
+    def region(self, shape):
+        """
+        Where the next inference should look: None for the full frame,
+        otherwise (x1, y1, x2, y2, scale). Split from crop() so the crop can
+        be cut elsewhere (a fleet worker gets the full frame and the region).
+        """
+        if self.box is None or self.since_full >= self.redetect_every:
+            self.since_full = 0
+            self.full_frames += 1
+            return None
+
+        h, w = shape[:2]
+        x1, y1, x2, y2 = self.box
+        pad_x, pad_y = (x2 - x1) * self.margin, (y2 - y1) * self.margin
+        x1, y1 = max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0)
+        x2, y2 = min(int(x2 + pad_x), w), min(int(y2 + pad_y), h)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            self.box = None
+            return self.region(shape)
+
+        self.roi_frames += 1
+        return x1, y1, x2, y2, min(1.0, self.size / max(x2 - x1, y2 - y1))
+
+    @staticmethod
+    def crop(img, region):
+        """The (downscaled) crop for a region from region()."""
+        x1, y1, x2, y2, scale = region
+        crop = img[y1:y2, x1:x2]  # View, no copy
+        if scale < 1.0:
+            crop = cv2.resize(crop, (max(int((x2 - x1) * scale), 1), max(int((y2 - y1) * scale), 1)),
+                              interpolation=cv2.INTER_AREA)
+        return crop
+
+    def imgsz(self, transform):
+        """Inference size for the scheduler: ROI size for crops, model default otherwise."""
+        return None if transform is None else self.size
+
+    @staticmethod
+    def to_full(pose, transform, shape):
+        """Maps a PoseFrame detected on a crop back to full-frame coordinates."""
+        if transform is None:
+            return pose
+        x0, y0, scale = transform
+        missing = (pose.keypoints == 0).all(axis=-1)  # Undetected points stay at (0, 0)
+        pose.boxes = pose.boxes / scale + np.array([x0, y0, x0, y0], np.float32)
+        pose.keypoints = pose.keypoints / scale + np.array([x0, y0], np.float32)
+        pose.keypoints[missing] = 0
+        pose.shape = tuple(shape[:2])
+        return pose
+
+    def update(self, box):
+        """Records the main person's full-frame box, or None if nobody was found."""
+        if box is None:
+            self.box = None
+            return
+        self.box = box
+        self.since_full += 1
+
+    def stats(self):
+        total = self.full_frames + self.roi_frames
+        return {
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "roi_ratio": self.roi_frames / total if total else 0.0,
+        }
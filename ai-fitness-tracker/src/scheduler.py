@@ -0,0 +1,168 @@
+# src/scheduler.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+import config
+from src.model_pool import get_pool
+
+
+class InferenceScheduler:
+    """
+    Micro-batches frames from every active session.
+    A batch closes when it holds `max_batch` frames or when its oldest frame
+    has waited `max_wait` seconds, and then runs as one forward pass on a
+    pool slot. There is one worker thread per slot. Tracking is not done
+    here: each session feeds its PoseFrame through its own tracker.
+    """
+
+    def __init__(self, pool, max_batch, max_wait, history=512):
+        self.pool = pool
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Per-batch samples: (size, queue wait s, inference s)
+        self._samples = deque(maxlen=history)
+        self.total_batches = 0
+        self.total_frames = 0
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f"pose-batch-{i}", daemon=True)
+            for i in range(pool.size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, img, imgsz=None):
+        """
+        Queues one frame; the Future resolves to its PoseFrame.
+        imgsz = inference size, None for the model default. Only frames
+        with the same imgsz are batched together.
+        """
+        future = Future()
+        with self._cond:
+            self._pending.append((img, future, time.perf_counter(), imgsz))
+            self._cond.notify()
+        return future
+
+    def infer(self, img, imgsz=None, timeout=None):
+        """Blocking helper for recv(). Returns None if the result is late."""
+        future = self.submit(img, imgsz)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+
+            deadline = self._pending[0][2] + self.max_wait
+            while 0 < len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Take up to max_batch frames that share the oldest frame's imgsz
+            imgsz = self._pending[0][3] if self._pending else None
+            batch, rest = [], deque()
+            while self._pending:
+                item = self._pending.popleft()
+                if len(batch) < self.max_batch and item[3] == imgsz:
+                    batch.append(item)
+                else:
+                    rest.append(item)
+            self._pending = rest
+            if rest:
+                self._cond.notify()  # Let another worker pick up the rest
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Drop frames whose session already gave up waiting
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                with self.pool.slot() as model:
+                    poses = model.predict([item[0] for item in batch], imgsz=batch[0][3])
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+
+            for (_, future, _, _), pose in zip(batch, poses):
+                future.set_result(pose)
+
+            with self._cond:
+                self._samples.append((len(batch), start - batch[0][2], elapsed))
+                self.total_batches += 1
+                self.total_frames += len(batch)
+
+    def stats(self):
+        """Latency and fill-rate figures over the most recent batches."""
+        with self._cond:
+            samples = np.array(self._samples, dtype=np.float64).reshape(-1, 3)
+            out = {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queued": len(self._pending),
+                "batches": self.total_batches,
+                "frames": self.total_frames,
+            }
+        if len(samples) == 0:
+            return out
+
+        sizes, waits, infer = samples[:, 0], samples[:, 1] * 1000.0, samples[:, 2] * 1000.0
+        out.update({
+            "mean_batch": float(sizes.mean()),
+            "fill_rate": float(sizes.mean() / self.max_batch),
+            "wait_ms_p50": float(np.percentile(waits, 50)),
+            "wait_ms_p95": float(np.percentile(waits, 95)),
+            "batch_ms_p50": float(np.percentile(infer, 50)),
+            "batch_ms_p95": float(np.percentile(infer, 95)),
+            "frame_ms": float(infer.sum() / sizes.sum()),
+        })
+        return out
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Returns the process-wide scheduler, or None if the model failed to load."""
+    global _scheduler
+    if _scheduler is not None:
+        return _scheduler
+
+    pool = get_pool()
+    if pool is None:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler(pool, config.BATCH_MAX_SIZE, config.BATCH_MAX_WAIT)
+    return _scheduler
@@ -0,0 +1,102 @@
+# src/smoothing.py
+import threading
+
+import numpy as np
+
+import config
+
+from src.pose import NUM_KEYPOINTS
+
+
+class KeypointFilter:
+    """
+    One-Euro filter over all keypoints of one person, vectorized.
+    Each coordinate is low-pass filtered with a cutoff that rises with its
+    speed: still joints are smoothed hard (no jitter), fast joints lightly
+    (little lag). Measurements are weighted by keypoint confidence; below
+    `min_conf` (or at (0, 0), which ultralytics uses for hidden keypoints)
+    a keypoint is not updated and keeps moving at its last velocity.
+    predict(t) gives those positions for frames that were not inferred,
+    for up to `max_gap` seconds after a joint's last good measurement.
+
+    update() runs on the inference stage and predict() on the render stage,
+    so both take the instance lock.
+    """
+
+    def __init__(self, min_cutoff=None, beta=None, d_cutoff=None, min_conf=None, max_gap=None,
+                 num_keypoints=NUM_KEYPOINTS):
+        self.min_cutoff = config.SMOOTH_MIN_CUTOFF if min_cutoff is None else min_cutoff
+        self.beta = config.SMOOTH_BETA if beta is None else beta
+        self.d_cutoff = config.SMOOTH_D_CUTOFF if d_cutoff is None else d_cutoff
+        self.min_conf = config.SMOOTH_MIN_CONF if min_conf is None else min_conf
+        self.max_gap = config.SMOOTH_MAX_GAP if max_gap is None else max_gap
+
+        self._x = np.zeros((num_keypoints, 2), np.float32)   # Filtered positions
+        self._dx = np.zeros((num_keypoints, 2), np.float32)  # Filtered velocities (px / s)
+        self._seen = np.full(num_keypoints, -np.inf)         # Last good measurement per keypoint
+        self._t = None                                       # Time of the state above
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._seen[:] = -np.inf
+            self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2.0 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def update(self, keypoints, conf, t):
+        """
+        Feeds one measurement: (K, 2) keypoints with (K,) confidences (or
+        None), taken at time t in seconds. Returns the filtered (K, 2)
+        keypoints as a new array; keypoints with no measurement within
+        max_gap are returned as measured.
+        """
+        kps = np.asarray(keypoints, dtype=np.float32)
+        conf = np.ones(len(kps), np.float32) if conf is None else np.asarray(conf, dtype=np.float32)
+        good = (conf >= self.min_conf) & kps.any(axis=1)
+
+        with self._lock:
+            dt = t - self._t if self._t is not None else 0.0
+            if dt > 0:
+                track = good & (t - self._seen <= self.max_gap)
+                dx = self._dx + self._alpha(self.d_cutoff, dt) * ((kps - self._x) / dt - self._dx)
+                cutoff = self.min_cutoff + self.beta * np.linalg.norm(dx, axis=1, keepdims=True)
+                # Confidence weighting: a 0.6 keypoint moves the estimate less than a 0.95 one
+                a = self._alpha(cutoff, dt) * conf[:, None]
+                x = self._x + a * (kps - self._x)
+                # Keypoints without a good measurement coast on their velocity
+                coast = self._x + self._dx * dt
+                self._x = np.where(track[:, None], x, coast).astype(np.float32)
+                self._dx = np.where(track[:, None], dx, self._dx).astype(np.float32)
+            else:
+                track = np.zeros(len(kps), bool)
+
+            # (Re)start keypoints without recent history at the measurement
+            start = good & ~track
+            self._x[start] = kps[start]
+            self._dx[start] = 0.0
+            self._seen[good] = t
+            self._t = t if self._t is None else max(t, self._t)
+
+            out = self._x.copy()
+            stale = t - self._seen > self.max_gap
+            out[stale] = kps[stale]
+            return out
+
+    def predict(self, t, index=None):
+        """
+        Keypoints extrapolated to time t (optionally only rows `index`), or
+        None when there is no state or any selected keypoint is older than
+        max_gap.
+        """
+        with self._lock:
+            if self._t is None:
+                return None
+            seen = self._seen if index is None else self._seen[index]
+            if (t - seen > self.max_gap).any():
+                return None
+            x, dx = (self._x, self._dx) if index is None else (self._x[index], self._dx[index])
+            return x + dx * max(t - self._t, 0.0)
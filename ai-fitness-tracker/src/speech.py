@@ -0,0 +1,219 @@
+# src/speech.py
+"""
+Voice feedback: rep counts and mode prompts, spoken without blocking the
+video loop. Common phrases are pre-rendered to WAV files once, and
+stale announcements are coalesced so only the newest count is spoken.
+
+    python -m src.speech    # pre-render the phrase cache ahead of time
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+MODE_PROMPTS = ["Normal mode started", "Combine mode started", "Take care and have a nice day"]
+
+
+def common_phrases(max_count=None):
+    """Everything worth pre-rendering: "Left N", "Right N", "Combine N" and the prompts."""
+    max_count = max_count or config.SPEECH_MAX_COUNT
+    phrases = list(MODE_PROMPTS)
+    for side in ("Left", "Right", "Combine"):
+        phrases += [f"{side} {n}" for n in range(1, max_count + 1)]
+    return phrases
+
+
+class NullBackend:
+    """Silent backend: records what would have been spoken. Used when no audio is available."""
+
+    def __init__(self):
+        self.spoken = []
+
+    def render(self, text, path):
+        return False
+
+    def play_file(self, path, text):
+        self.spoken.append(text)
+
+    def say(self, text):
+        self.spoken.append(text)
+
+
+class Pyttsx3Backend:
+    """pyttsx3 for synthesis; cached WAVs are played with simpleaudio when it is installed (both optional)."""
+
+    def __init__(self, rate=None, voice=None):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('rate', rate or config.SPEECH_RATE)
+        voices = self.engine.getProperty('voices')
+        voice = config.SPEECH_VOICE if voice is None else voice
+        if voices and voice < len(voices):
+            self.engine.setProperty('voice', voices[voice].id)
+        try:
+            import simpleaudio
+            self._wave = simpleaudio.WaveObject
+        except ImportError:
+            self._wave = None
+
+    def render(self, text, path):
+        if self._wave is None:
+            return False  # Could not play it back anyway
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+        return os.path.exists(path)
+
+    def play_file(self, path, text):
+        self._wave.from_wave_file(path).play().wait_done()
+
+    def say(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+
+class SpeechCache:
+    """Pre-rendered phrases on disk, one WAV per phrase."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or config.SPEECH_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, text):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def get(self, text):
+        path = self.path(text)
+        return path if os.path.exists(path) else None
+
+    def prerender(self, backend, phrases, stop=None):
+        """Renders the phrases that are not on disk yet. Returns how many were added."""
+        added = 0
+        for text in phrases:
+            if stop is not None and stop.is_set():
+                break
+            path = self.path(text)
+            if not os.path.exists(path) and backend.render(text, path):
+                added += 1
+        return added
+
+
+class Announcer:
+    """
+    Non-blocking speech worker.
+    say() only records the text under a channel and returns at once. A
+    newer message on the same channel replaces an unspoken older one, so
+    during a fast set only the latest "Left N" is spoken. Cached phrases
+    are played from disk; anything else is synthesized live. The backend
+    is created on the worker thread (pyttsx3 must stay on one thread).
+    """
+
+    def __init__(self, backend_factory=None, cache=None, prerender=True):
+        self.backend_factory = backend_factory or Pyttsx3Backend
+        self.cache = cache
+        self.prerender = prerender
+        self.backend = None
+
+        self._pending = OrderedDict()   # channel -> (text, queued at)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+        self.spoken = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        self.last_delay = 0.0           # Seconds from say() to start of playback
+
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def say(self, text, channel=None):
+        with self._cond:
+            channel = channel or text
+            if channel in self._pending:
+                self.coalesced += 1
+                del self._pending[channel]  # Re-queue at the back with the new text
+            self._pending[channel] = (text, time.monotonic())
+            self._cond.notify()
+
+    def announce_rep(self, side, count):
+        """side = "left" | "right" | "combine"."""
+        self.say(f"{side.capitalize()} {count}", channel=side)
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        try:
+            self.backend = self.backend_factory()
+        except Exception:
+            self.backend = NullBackend()
+        # Phrases still to pre-render; done one at a time whenever nothing is pending
+        todo = []
+        if self.cache is not None and self.prerender:
+            todo = [t for t in reversed(common_phrases()) if self.cache.get(t) is None]
+
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._pending and not todo and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                item = self._pending.popitem(last=False) if self._pending else None
+
+            if item is None:
+                text = todo.pop()
+                try:
+                    self.backend.render(text, self.cache.path(text))
+                except Exception:
+                    todo.clear()  # Backend cannot render; stop trying
+                continue
+
+            _, (text, queued) = item
+            self.last_delay = time.monotonic() - queued
+            path = self.cache.get(text) if self.cache is not None else None
+            try:
+                if path is not None:
+                    self.cache_hits += 1
+                    self.backend.play_file(path, text)
+                else:
+                    self.backend.say(text)
+            except Exception:
+                continue
+            self.spoken += 1
+
+    def stats(self):
+        return {
+            "spoken": self.spoken,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "pending": len(self._pending),
+            "last_delay_ms": self.last_delay * 1000.0,
+        }
+
+
+_announcer = None
+_announcer_lock = threading.Lock()
+
+
+def get_announcer():
+    """Process-wide announcer, or None when voice feedback is disabled."""
+    global _announcer
+    if not config.SPEECH_ENABLED:
+        return None
+    with _announcer_lock:
+        if _announcer is None:
+            _announcer = Announcer(cache=SpeechCache())
+    return _announcer
+
+
+if __name__ == "__main__":
+    cache = SpeechCache()
+    added = cache.prerender(Pyttsx3Backend(), common_phrases())
+    print(f"Rendered {added} phrases into {cache.cache_dir}")
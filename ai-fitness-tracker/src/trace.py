@@ -0,0 +1,462 @@
+# src/trace.py
+"""
+Pose traces: the model's per-frame output saved once, so counting and
+angle analysis can be re-run without running inference again.
+
+A .posetrace file is a header followed by chunks of frames, each chunk
+stored column by column (times, people per frame, track ids, scores,
+boxes, 17x2 keypoints, keypoint confidences), and an index of the chunks
+at the end. The reader memory-maps the file and hands out NumPy views,
+so replaying a trace is bounded by memory bandwidth rather than by the
+model. Coordinates are float32, or float16 to halve the size (about
+0.5 px of rounding on a 1080p frame). A trace whose writer died before
+closing it is still readable: its chunks are found by scanning.
+
+    python -m src.trace info session.posetrace
+    python -m src.trace replay session.posetrace --mode combine --exercise squat
+    python -m src.trace seek session.posetrace 12.5
+    python -m src.trace export session.posetrace session.parquet   # or .npz
+    python -m src.trace import session.npz session.posetrace --float16
+"""
+import argparse
+import json
+import mmap
+import struct
+import threading
+import time
+
+import numpy as np
+
+import config
+from src.counter import count_series
+from src.exercises import ExerciseCounter, get_library
+from src.pose import NUM_KEYPOINTS, PoseFrame
+from src.smoothing import KeypointFilter
+from src.utils import ARM_TRIPLETS, JointAngles
+
+MAGIC = b"POSETRC1"
+INDEX_MAGIC = b"POSEIDX1"
+CHUNK = struct.Struct("<4sIII")  # b"CHNK", frames, people, reserved
+ALIGN = 64
+
+
+def _columns(dtype):
+    """(name, dtype, per-row shape, rows = "frames" | "people") in file order."""
+    return (
+        ("t", np.float64, (), "frames"),
+        ("count", np.uint16, (), "frames"),
+        ("shape", np.uint16, (2,), "frames"),
+        ("ids", np.int32, (), "people"),
+        ("scores", dtype, (), "people"),
+        ("boxes", dtype, (4,), "people"),
+        ("keypoints", dtype, (NUM_KEYPOINTS, 2), "people"),
+        ("kpt_conf", dtype, (NUM_KEYPOINTS,), "people"),
+    )
+
+
+def _pad(n):
+    return -n % ALIGN
+
+
+def _layout(columns, frames, people):
+    """[(name, dtype, shape, offset from the chunk body start)] and the body size."""
+    out, offset = [], 0
+    for name, dtype, shape, rows in columns:
+        n = frames if rows == "frames" else people
+        out.append((name, dtype, (n,) + shape, offset))
+        size = n * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        offset += size + _pad(size)
+    return out, offset
+
+
+class TraceWriter:
+    """
+    Appends frames to a .posetrace file, one chunk every `chunk_frames`
+    frames (so a crash loses at most one chunk). write() and close() may
+    be called from different threads (the inference stage writes, the
+    stream's end closes); frames written after close() are dropped.
+    """
+
+    def __init__(self, path, dtype="float32", chunk_frames=256, meta=None):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float16, np.float32):
+            raise ValueError(f"dtype must be float16 or float32, not {dtype}")
+        self.chunk_frames = chunk_frames
+        self.columns = _columns(self.dtype)
+        self.frames = 0
+        self._pending = []
+        self._index = []
+        self._lock = threading.Lock()
+
+        self._file = open(path, "wb")
+        header = json.dumps({"version": 1, "dtype": self.dtype.name, "meta": meta or {}}).encode("utf-8")
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self._file.write(b"\0" * _pad(self._file.tell()))
+
+    def write(self, t, pose):
+        """Adds one frame: its capture time in seconds and its PoseFrame."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._pending.append((float(t), pose))
+            if len(self._pending) >= self.chunk_frames:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        poses = [pose for _, pose in self._pending]
+        people = sum(len(pose) for pose in poses)
+        data = {
+            "t": np.array([t for t, _ in self._pending], np.float64),
+            "count": np.array([len(pose) for pose in poses], np.uint16),
+            "shape": np.array([pose.shape for pose in poses], np.uint16).reshape(-1, 2),
+        }
+        for name in ("ids", "scores", "boxes", "keypoints", "kpt_conf"):
+            data[name] = np.concatenate([getattr(pose, name) for pose in poses]) if people else None
+
+        layout, size = _layout(self.columns, len(poses), people)
+        offset = self._file.tell()
+        self._file.write(CHUNK.pack(b"CHNK", len(poses), people, 0) + b"\0" * _pad(CHUNK.size))
+        body = bytearray(size)
+        for name, dtype, shape, start in layout:
+            if data[name] is not None:
+                arr = np.ascontiguousarray(data[name], dtype=dtype).reshape(shape)
+                body[start:start + arr.nbytes] = arr.tobytes()
+        self._file.write(body)
+        self._file.flush()
+
+        self._index.append([offset, len(poses), people, float(data["t"][0]), float(data["t"][-1])])
+        self.frames += len(poses)
+        self._pending = []
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            start = self._file.tell()
+            self._file.write(json.dumps({"chunks": self._index}).encode("utf-8"))
+            self._file.write(struct.pack("<Q", start) + INDEX_MAGIC)
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PoseTrace:
+    """
+    Read-only, memory-mapped view of a .posetrace file.
+    chunks() yields dicts of zero-copy column views; frame(i) / frames()
+    build PoseFrames (float32) for code that wants them one at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a pose trace")
+        (length,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        body = len(MAGIC) + 4
+        header = json.loads(bytes(self._map[body:body + length]))
+        self.dtype = np.dtype(header["dtype"])
+        self.meta = header["meta"]
+        self.columns = _columns(self.dtype)
+        self._data_start = body + length + _pad(body + length)
+
+        self.index = self._read_index()
+        counts = [frames for _, frames, _, _, _ in self.index]
+        self.chunk_starts = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        self._times = None
+
+    def _read_index(self):
+        tail = len(INDEX_MAGIC) + 8
+        if len(self._map) >= self._data_start + tail and self._map[-len(INDEX_MAGIC):] == INDEX_MAGIC:
+            (start,) = struct.unpack_from("<Q", self._map, len(self._map) - tail)
+            return json.loads(bytes(self._map[start:len(self._map) - tail]))["chunks"]
+
+        # No index (the writer never closed the file): walk the chunk headers
+        index, offset = [], self._data_start
+        while offset + CHUNK.size <= len(self._map):
+            tag, frames, people, _ = CHUNK.unpack_from(self._map, offset)
+            body = offset + CHUNK.size + _pad(CHUNK.size)
+            _, size = _layout(self.columns, frames, people)
+            if tag != b"CHNK" or body + size > len(self._map):
+                break  # Torn last chunk
+            t = np.frombuffer(self._map, np.float64, frames, body)
+            index.append([offset, frames, people, float(t[0]), float(t[-1])])
+            offset = body + size
+        return index
+
+    def __len__(self):
+        return int(self.chunk_starts[-1])
+
+    def chunk(self, k):
+        """Column views of chunk k, plus "offsets": each frame's first row in the people columns."""
+        offset, frames, people, _, _ = self.index[k]
+        body = offset + CHUNK.size + _pad(CHUNK.size)
+        layout, _ = _layout(self.columns, frames, people)
+        out = {}
+        for name, dtype, shape, start in layout:
+            out[name] = np.frombuffer(self._map, dtype, int(np.prod(shape)), body + start).reshape(shape)
+        out["offsets"] = np.concatenate([[0], np.cumsum(out["count"], dtype=np.int64)])
+        return out
+
+    def chunks(self):
+        for k in range(len(self.index)):
+            yield self.chunk(k)
+
+    @property
+    def times(self):
+        """(n,) capture times of every frame (the only column gathered into one array)."""
+        if self._times is None:
+            self._times = np.concatenate([c["t"] for c in self.chunks()]) if self.index else np.zeros(0)
+        return self._times
+
+    def seek(self, t):
+        """Index of the first frame captured at or after time t."""
+        return int(np.searchsorted(self.times, t, side="left"))
+
+    def frame(self, i):
+        """(capture time, PoseFrame) of frame i."""
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        k = int(np.searchsorted(self.chunk_starts, i, side="right")) - 1
+        c = self.chunk(k)
+        j = i - int(self.chunk_starts[k])
+        rows = slice(c["offsets"][j], c["offsets"][j + 1])
+        pose = PoseFrame(
+            c["boxes"][rows].astype(np.float32), c["scores"][rows].astype(np.float32),
+            c["ids"][rows].astype(np.int64), c["keypoints"][rows].astype(np.float32),
+            c["kpt_conf"][rows].astype(np.float32), tuple(int(v) for v in c["shape"][j]),
+        )
+        return float(c["t"][j]), pose
+
+    def frames(self, start=0, stop=None):
+        """Yields (capture time, PoseFrame) from frame `start` up to `stop`."""
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.frame(i)
+
+    def to_numpy(self):
+        """Every column concatenated (copies), plus "offsets" into the people columns."""
+        chunks = list(self.chunks())
+        out = {}
+        for name, dtype, shape, _ in self.columns:
+            parts = [c[name] for c in chunks]
+            out[name] = np.concatenate(parts) if parts else np.zeros((0,) + shape, dtype)
+        out["offsets"] = np.concatenate([[0], np.cumsum(out["count"], dtype=np.int64)])
+        return out
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Column views still in use; the map is released with them
+        self._file.close()
+
+
+def largest(chunk):
+    """Per frame of a chunk, the people-row of the largest box (-1: nobody), like PoseFrame.largest()."""
+    frames, boxes = len(chunk["count"]), chunk["boxes"].astype(np.float32)
+    main = np.full(frames, -1, np.int64)
+    if len(boxes) == 0:
+        return main
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    owner = np.repeat(np.arange(frames), chunk["count"])
+    rows = np.flatnonzero(areas > 0)
+    # Sort by frame, then largest area first (stable: ties keep the lowest row, as argmax does)
+    order = rows[np.lexsort((-areas[rows], owner[rows]))]
+    first = np.unique(owner[order], return_index=True)
+    main[first[0]] = order[first[1]]
+    return main
+
+
+def arm_angles(trace):
+    """(n, 2) elbow angles of the largest person in every frame, NaN where there is nobody."""
+    kernel = JointAngles(ARM_TRIPLETS)
+    out = np.full((len(trace), 2), np.nan, np.float32)
+    for k, chunk in enumerate(trace.chunks()):
+        main = largest(chunk)
+        found = np.flatnonzero(main >= 0)
+        start = int(trace.chunk_starts[k])
+        if len(found):
+            out[start + found] = kernel(chunk["keypoints"][main[found]])
+    return out
+
+
+def replay(trace, mode, up_thresh=None, down_thresh=None, count_on="curl", exercise=None, smooth=False):
+    """
+    Counts reps on a recorded trace without the model. Returns (angles (n, 2), running counts (n, 3)).
+    By default the whole series of elbow angles is counted at once as bicep
+    curls (count_series, with the given thresholds and direction). With an
+    `exercise` or smooth=True the frames go through the live app's steps
+    instead, one at a time: the largest person's keypoints, KeypointFilter
+    if smooth (reset when the main track changes), then an ExerciseCounter;
+    the angles are then the exercise's primary angle.
+    """
+    if exercise is None and not smooth:
+        angles = arm_angles(trace)
+        return angles, count_series(mode, angles, up_thresh, down_thresh, count_on)
+
+    counter = ExerciseCounter(exercise, mode)
+    smoother = KeypointFilter() if smooth else None
+    main_id = None
+    angles = np.full((len(trace), 2), np.nan, np.float32)
+    counts = np.zeros((len(trace), 3), np.int64)
+    for k, chunk in enumerate(trace.chunks()):
+        start = int(trace.chunk_starts[k])
+        for j, row in enumerate(largest(chunk).tolist()):
+            if row >= 0:
+                kps = chunk["keypoints"][row].astype(np.float32)
+                if smoother is not None:
+                    if chunk["ids"][row] != main_id:
+                        main_id = chunk["ids"][row]
+                        smoother.reset()
+                    kps = smoother.update(kps, chunk["kpt_conf"][row].astype(np.float32), float(chunk["t"][j]))
+                counter.update(kps)
+                angles[start + j] = counter.angle_left, counter.angle_right
+            counts[start + j] = counter.count_left, counter.count_right, counter.count_combine
+    return angles, counts
+
+
+def from_numpy(arrays, path, dtype="float32", chunk_frames=4096, meta=None):
+    """Writes a trace from to_numpy()-style arrays (t, count, shape and the people columns)."""
+    offsets = np.concatenate([[0], np.cumsum(arrays["count"], dtype=np.int64)])
+    with TraceWriter(path, dtype, chunk_frames, meta) as writer:
+        for i, t in enumerate(arrays["t"]):
+            rows = slice(offsets[i], offsets[i + 1])
+            writer.write(t, PoseFrame(arrays["boxes"][rows], arrays["scores"][rows], arrays["ids"][rows],
+                                      arrays["keypoints"][rows], arrays["kpt_conf"][rows], arrays["shape"][i]))
+    return path
+
+
+def to_parquet(trace, path):
+    """One row per frame; people columns are lists (boxes and keypoints as fixed-size lists)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    data = trace.to_numpy()
+    offsets = pa.array(data["offsets"].astype(np.int32))
+
+    def people(values, width=None):
+        values = pa.array(values.reshape(len(values), -1).ravel() if width else values)
+        if width:
+            values = pa.FixedSizeListArray.from_arrays(values, width)
+        return pa.ListArray.from_arrays(offsets, values)
+
+    table = pa.table({
+        "t": data["t"],
+        "height": data["shape"][:, 0],
+        "width": data["shape"][:, 1],
+        "ids": people(data["ids"]),
+        "scores": people(data["scores"]),
+        "boxes": people(data["boxes"], 4),
+        "keypoints": people(data["keypoints"], NUM_KEYPOINTS * 2),
+        "kpt_conf": people(data["kpt_conf"], NUM_KEYPOINTS),
+    })
+    pq.write_table(table.replace_schema_metadata({"posetrace": json.dumps(trace.meta)}), path)
+    return path
+
+
+def from_parquet(src, path, dtype="float32"):
+    """Writes a trace from a to_parquet() file."""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(src)
+    column = lambda name: table.column(name).combine_chunks()
+    ids = column("ids")
+
+    def flat(name, shape):
+        values = column(name).flatten()
+        if shape:
+            values = values.flatten()
+        return values.to_numpy(zero_copy_only=False).reshape((-1,) + shape)
+
+    arrays = {
+        "t": column("t").to_numpy(),
+        "count": np.diff(ids.offsets.to_numpy()).astype(np.uint16),
+        "shape": np.stack([column("height").to_numpy(), column("width").to_numpy()], axis=1),
+        "ids": flat("ids", ()),
+        "scores": flat("scores", ()),
+        "boxes": flat("boxes", (4,)),
+        "keypoints": flat("keypoints", (NUM_KEYPOINTS, 2)),
+        "kpt_conf": flat("kpt_conf", (NUM_KEYPOINTS,)),
+    }
+    meta = json.loads((table.schema.metadata or {}).get(b"posetrace", b"{}"))
+    return from_numpy(arrays, path, dtype, meta=meta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, replay and convert pose traces.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("info")
+    p.add_argument("trace")
+    p = sub.add_parser("replay", help="Count reps without the model")
+    p.add_argument("trace")
+    p.add_argument("--mode", choices=["normal", "combine"], default="normal")
+    p.add_argument("--exercise", choices=list(get_library()), default=config.EXERCISE)
+    p.add_argument("--no-smooth", dest="smooth", action="store_false", default=config.SMOOTH_ENABLED)
+    p.add_argument("--count-on", choices=["curl", "extend"],
+                   help="Raw bicep-curl angles counted at once, no smoothing (extend = research script)")
+    p = sub.add_parser("seek", help="Frame at a capture time")
+    p.add_argument("trace")
+    p.add_argument("time", type=float)
+    p = sub.add_parser("export", help="To .npz or .parquet")
+    p.add_argument("trace")
+    p.add_argument("out")
+    p = sub.add_parser("import", help="From .npz or .parquet")
+    p.add_argument("src")
+    p.add_argument("trace")
+    p.add_argument("--float16", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        dtype = "float16" if args.float16 else "float32"
+        if args.src.endswith(".parquet"):
+            from_parquet(args.src, args.trace, dtype)
+        else:
+            with np.load(args.src) as data:
+                from_numpy(dict(data), args.trace, dtype)
+        return
+
+    trace = PoseTrace(args.trace)
+    if args.command == "info":
+        t = trace.times
+        people = sum(people for _, _, people, _, _ in trace.index)
+        span = t[-1] - t[0] if len(t) else 0.0
+        print(f"{len(trace)} frames, {people} detections, {len(trace.index)} chunks, {trace.dtype.name}, "
+              f"{span:.1f} s, meta {trace.meta}")
+    elif args.command == "replay":
+        start = time.perf_counter()
+        if args.count_on:
+            _, counts = replay(trace, args.mode, count_on=args.count_on)
+        else:
+            _, counts = replay(trace, args.mode, exercise=args.exercise, smooth=args.smooth)
+        elapsed = time.perf_counter() - start
+        final = dict(zip(("left", "right", "combine"), (int(v) for v in counts[-1]))) if len(counts) else {}
+        print(f"{final} ({len(trace)} frames in {elapsed * 1000:.1f} ms, {len(trace) / max(elapsed, 1e-9):,.0f} fps)")
+    elif args.command == "seek":
+        i = trace.seek(args.time)
+        if i >= len(trace):
+            raise SystemExit(f"No frame at or after {args.time}")
+        t, pose = trace.frame(i)
+        print(f"frame {i} at {t:.3f} s: {len(pose)} people, ids {pose.ids.tolist()}")
+    elif args.out.endswith(".parquet"):
+        to_parquet(trace, args.out)
+    else:
+        np.savez(args.out, **trace.to_numpy())
+    trace.close()
+
+
+if __name__ == "__main__":
+    main()
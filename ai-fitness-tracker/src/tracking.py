@@ -0,0 +1,45 @@
+# src/tracking.py
+import numpy as np
+import yaml
+
+import config
+
+
+class SessionTracker:
+    """
+    Multi-object tracker owned by a single session.
+    `model.track(persist=True)` keeps its tracker on the model object, so a
+    model shared between sessions would mix everyone's track ids. Each
+    session runs plain `predict` on a pooled model and feeds the detections
+    through its own tracker instead.
+    """
+
+    def __init__(self, cfg=config.TRACKER_CFG, frame_rate=30):
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+
+        with open(check_yaml(cfg), encoding="utf-8") as f:
+            args = IterableSimpleNamespace(**yaml.safe_load(f))
+        self.tracker = TRACKER_MAP[args.tracker_type](args=args, frame_rate=frame_rate)
+
+    def update(self, pose, img):
+        """Assigns track ids to a PoseFrame, mirroring ultralytics' track callback."""
+        if len(pose) == 0:
+            return pose
+
+        from ultralytics.engine.results import Boxes
+
+        det = np.concatenate(
+            [pose.boxes, pose.scores[:, None], np.zeros((len(pose), 1), np.float32)], axis=1
+        )
+        tracks = self.tracker.update(Boxes(det, pose.shape), img)
+        if len(tracks) == 0:
+            # Same as ultralytics: keep the untracked detections for this frame
+            return pose
+
+        # tracks columns: x1, y1, x2, y2, id, score, cls, detection index
+        out = pose.select(tracks[:, -1].astype(int))
+        out.boxes = tracks[:, :4].astype(np.float32)
+        out.ids = tracks[:, 4].astype(np.int64)
+        return out
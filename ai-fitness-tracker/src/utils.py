@@ -1,21 +1,95 @@
 # src/utils.py
 import numpy as np
 
+# Joint triplets (first, mid, end) as COCO keypoint indices
+LEFT_ELBOW = (5, 7, 9)    # Left shoulder, elbow, wrist
+RIGHT_ELBOW = (6, 8, 10)  # Right shoulder, elbow, wrist
+ARM_TRIPLETS = np.array([LEFT_ELBOW, RIGHT_ELBOW], dtype=np.intp)
+ARM_JOINTS = ARM_TRIPLETS.ravel()  # Left shoulder/elbow/wrist, then right
+
+
 def calculate_angle(a, b, c):
     """
     Calculates the angle between three points (a, b, c).
     a = First point (e.g., Shoulder)
     b = Mid point (e.g., Elbow)
     c = End point (e.g., Wrist)
+    Scalar reference version; use JointAngles for whole keypoint tensors.
     """
     a = np.array(a)
     b = np.array(b)
     c = np.array(c)
-    
+
     radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
     angle = np.abs(radians * 180.0 / np.pi)
-    
+
     if angle > 180.0:
         angle = 360 - angle
-        
-    return angle
\ No newline at end of file
+
+    return angle
+
+
+class JointAngles:
+    """
+    Vectorized calculate_angle over a table of joint triplets.
+    Takes an (N, K, 2) keypoint tensor and returns (N, T) angles in degrees,
+    one per person and triplet, with the same results as calculate_angle
+    (including degenerate, zero-length limbs). Work is done in float32, the
+    model's output dtype. Scratch buffers are kept between calls and only
+    grow, so steady-state calls on float32 input do not allocate.
+    An instance is not thread-safe; give each session its own.
+    """
+
+    def __init__(self, triplets=ARM_TRIPLETS):
+        triplets = np.asarray(triplets, dtype=np.intp).reshape(-1, 3)
+        self.triplets = triplets
+        # Fancy-index table: (3T,) = all first points, all mids, all ends
+        self._index = np.ascontiguousarray(triplets.T).ravel()
+        self._cap = 0
+
+    def _reserve(self, n):
+        if n <= self._cap:
+            return
+        t = len(self.triplets)
+        self._pts = np.empty((n, 3 * t, 2), np.float32)
+        self._vec = np.empty((2, n, t, 2), np.float32)
+        self._rad = np.empty((2, n, t), np.float32)
+        self._out = np.empty((n, t), np.float32)
+        self._mask = np.empty((n, t), bool)
+        self._cap = n
+
+    def __call__(self, keypoints, out=None):
+        """
+        keypoints = (N, K, 2) or (K, 2) array of pixel coordinates
+        out       = optional (N, T) float array to write into
+        Returns a view of the internal buffer unless `out` is given.
+        """
+        kps = np.asarray(keypoints, dtype=np.float32)
+        single = kps.ndim == 2
+        if single:
+            kps = kps[None]
+        n, t = len(kps), len(self.triplets)
+        self._reserve(n)
+
+        pts = self._pts[:n]
+        np.take(kps, self._index, axis=1, out=pts)
+        a, b, c = pts[:, :t], pts[:, t:2 * t], pts[:, 2 * t:]
+
+        # Limb vectors from the mid joint: [0] = mid->end, [1] = mid->first
+        vec = self._vec[:, :n]
+        np.subtract(c, b, out=vec[0])
+        np.subtract(a, b, out=vec[1])
+        rad = self._rad[:, :n]
+        np.arctan2(vec[..., 1], vec[..., 0], out=rad)
+
+        angles = self._out[:n] if out is None else out
+        np.subtract(rad[0], rad[1], out=angles)
+        np.abs(angles, out=angles)
+        np.multiply(angles, 180.0 / np.pi, out=angles)
+
+        # Fold reflex angles back into [0, 180]
+        mask = self._mask[:n]
+        np.greater(angles, 180.0, out=mask)
+        np.subtract(360.0, angles, out=angles, where=mask)
+
+        return angles[0] if single else angles
@@ -0,0 +1,291 @@
+# src/voice.py
+"""
+Streaming voice commands ("normal", "combine", "stop"), recognised offline.
+Audio is read in small chunks, the ambient noise level is calibrated once,
+an energy gate (VAD) cuts utterances out of the stream, and only those
+utterances go to a keyword matcher for the fixed vocabulary.
+
+    python -m src.voice fixtures/*.wav   # recognise commands in WAV files
+"""
+import queue
+import sys
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+import config
+
+COMMANDS = ("normal", "combine", "stop")
+_END = object()
+
+
+class WavSource:
+    """16-bit mono WAV file as a chunk stream (realtime=True paces it like a microphone)."""
+
+    def __init__(self, path, chunk_ms=None, realtime=False):
+        self.path = path
+        self.chunk_ms = chunk_ms or config.VOICE_CHUNK_MS
+        self.realtime = realtime
+        self.live = realtime  # Live sources drop audio when behind; files never do
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != 2 or w.getnchannels() != 1:
+                raise ValueError(f"{path}: expected 16-bit mono audio")
+            self.rate = w.getframerate()
+
+    def chunks(self):
+        frames = int(self.rate * self.chunk_ms / 1000)
+        with wave.open(self.path, "rb") as w:
+            while True:
+                data = w.readframes(frames)
+                if not data:
+                    return
+                yield data
+                if self.realtime:
+                    time.sleep(self.chunk_ms / 1000)
+
+    def close(self):
+        pass
+
+
+class MicrophoneSource:
+    """Default microphone through PyAudio (already needed by speech_recognition)."""
+
+    def __init__(self, rate=None, chunk_ms=None, device=None):
+        self.rate = rate or config.VOICE_RATE
+        self.chunk_ms = chunk_ms or config.VOICE_CHUNK_MS
+        self.device = device
+        self.live = True
+        self._closed = threading.Event()
+
+    def chunks(self):
+        import pyaudio
+
+        frames = int(self.rate * self.chunk_ms / 1000)
+        audio = pyaudio.PyAudio()
+        stream = audio.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                            input_device_index=self.device, frames_per_buffer=frames)
+        try:
+            while not self._closed.is_set():
+                yield stream.read(frames, exception_on_overflow=False)
+        finally:
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
+
+    def close(self):
+        self._closed.set()
+
+
+def rms(chunk):
+    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+class EnergyVAD:
+    """
+    Energy gate that turns a chunk stream into utterances.
+    A chunk is speech when its RMS is above max(noise floor x factor, min_rms).
+    An utterance ends after `hangover_ms` of silence or at `max_ms`, and
+    keeps `preroll_ms` of audio from before it started.
+    """
+
+    def __init__(self, chunk_ms=None, factor=None, min_rms=None, hangover_ms=None, max_ms=None, preroll_ms=150):
+        self.chunk_ms = chunk_ms or config.VOICE_CHUNK_MS
+        self.factor = factor or config.VOICE_VAD_FACTOR
+        self.min_rms = config.VOICE_VAD_MIN_RMS if min_rms is None else min_rms
+        self.hangover = max(1, (hangover_ms or config.VOICE_HANGOVER_MS) // self.chunk_ms)
+        self.max_chunks = (max_ms or config.VOICE_MAX_UTTERANCE_MS) // self.chunk_ms
+        self.noise = 0.0
+        self.threshold = self.min_rms
+
+        self._preroll = deque(maxlen=max(1, preroll_ms // self.chunk_ms))
+        self._voiced = []
+        self._silent = 0
+
+    def calibrate(self, chunks):
+        """Sets the noise floor from ambient audio. Done once, not per utterance."""
+        levels = [rms(c) for c in chunks]
+        self.noise = float(np.median(levels)) if levels else 0.0
+        self.threshold = max(self.noise * self.factor, self.min_rms)
+
+    def feed(self, chunk):
+        """Returns the PCM bytes of a finished utterance, or None."""
+        speech = rms(chunk) >= self.threshold
+        if not self._voiced:
+            if speech:
+                self._voiced = list(self._preroll) + [chunk]
+                self._silent = 0
+            else:
+                self._preroll.append(chunk)
+            return None
+
+        self._voiced.append(chunk)
+        self._silent = 0 if speech else self._silent + 1
+        if self._silent >= self.hangover or len(self._voiced) >= self.max_chunks:
+            return self._finish()
+        return None
+
+    def flush(self):
+        """Ends the current utterance (e.g. at end of file)."""
+        return self._finish() if self._voiced else None
+
+    def _finish(self):
+        utterance = b"".join(self._voiced)
+        self._voiced = []
+        self._silent = 0
+        self._preroll.clear()
+        return utterance
+
+
+class SphinxKeywordMatcher:
+    """Offline keyword spotting with PocketSphinx, restricted to the command words."""
+
+    def __init__(self, commands=COMMANDS, sensitivity=None):
+        import speech_recognition as sr
+
+        self._sr = sr
+        self.recognizer = sr.Recognizer()
+        self.commands = commands
+        sensitivity = config.VOICE_KEYWORD_SENSITIVITY if sensitivity is None else sensitivity
+        self.keywords = [(c, sensitivity) for c in commands]
+
+    def match(self, pcm, rate):
+        audio = self._sr.AudioData(pcm, rate, 2)
+        try:
+            text = self.recognizer.recognize_sphinx(audio, keyword_entries=self.keywords).lower()
+        except self._sr.UnknownValueError:
+            return None
+        # Keyword mode returns every hit; the last one spoken wins
+        found = [c for c in text.split() if c in self.commands]
+        return found[-1] if found else None
+
+
+class CommandListener:
+    """
+    Runs capture and recognition on their own threads, linked by a bounded
+    audio queue (for live sources the oldest chunks are dropped if
+    recognition falls behind).
+    Recognised commands go to the bounded `commands` queue and to the
+    optional on_command(command) callback.
+    Latency = time from the end of an utterance to its command being emitted.
+    """
+
+    def __init__(self, source, matcher=None, vad=None, on_command=None,
+                 calibrate_ms=None, audio_queue=200, command_queue=8):
+        self.source = source
+        self.matcher = matcher
+        self.vad = vad or EnergyVAD(chunk_ms=source.chunk_ms)
+        self.on_command = on_command
+        self.calibrate_chunks = (calibrate_ms or config.VOICE_CALIBRATE_MS) // source.chunk_ms
+
+        self.audio = queue.Queue(maxsize=audio_queue)
+        self.commands = queue.Queue(maxsize=command_queue)
+        self._stop = threading.Event()
+        self._threads = []
+
+        self.utterances = 0
+        self.dropped_chunks = 0
+        self.latencies = deque(maxlen=100)
+
+    def start(self):
+        if self.matcher is None:
+            self.matcher = SphinxKeywordMatcher()
+        self._threads = [
+            threading.Thread(target=self._capture, name="voice-capture", daemon=True),
+            threading.Thread(target=self._recognize, name="voice-recognize", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.source.close()
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+
+    def _capture(self):
+        try:
+            for chunk in self.source.chunks():
+                if self._stop.is_set():
+                    break
+                if not self.source.live:
+                    self.audio.put(chunk)
+                    continue
+                while True:
+                    try:
+                        self.audio.put_nowait(chunk)
+                        break
+                    except queue.Full:
+                        try:
+                            self.audio.get_nowait()  # Drop the oldest chunk
+                            self.dropped_chunks += 1
+                        except queue.Empty:
+                            pass
+        finally:
+            self.audio.put(_END)
+
+    def _recognize(self):
+        # One ambient calibration at start-up
+        ambient = []
+        while len(ambient) < self.calibrate_chunks:
+            chunk = self.audio.get()
+            if chunk is _END:
+                return
+            ambient.append(chunk)
+        self.vad.calibrate(ambient)
+
+        while not self._stop.is_set():
+            chunk = self.audio.get()
+            utterance = self.vad.flush() if chunk is _END else self.vad.feed(chunk)
+            if utterance:
+                self._handle(utterance)
+            if chunk is _END:
+                return
+
+    def _handle(self, utterance):
+        ended = time.monotonic()
+        self.utterances += 1
+        command = self.matcher.match(utterance, self.source.rate)
+        if command is None:
+            return
+        self.latencies.append(time.monotonic() - ended)
+        try:
+            self.commands.put_nowait(command)
+        except queue.Full:
+            pass  # Nobody is reading the queue; the callback still fires
+        if self.on_command is not None:
+            self.on_command(command)
+
+    def stats(self):
+        lat = np.array(self.latencies, dtype=np.float64) * 1000.0
+        out = {
+            "noise_rms": self.vad.noise,
+            "threshold_rms": self.vad.threshold,
+            "utterances": self.utterances,
+            "dropped_chunks": self.dropped_chunks,
+        }
+        if len(lat):
+            out.update({"latency_ms_p50": float(np.percentile(lat, 50)),
+                        "latency_ms_p95": float(np.percentile(lat, 95))})
+        return out
+
+
+def recognize_file(path, matcher=None, calibrate_ms=None):
+    """Commands found in a WAV file, in order, with the listener's stats."""
+    found = []
+    listener = CommandListener(WavSource(path), matcher=matcher, on_command=found.append,
+                               calibrate_ms=calibrate_ms)
+    listener.start().join()
+    return found, listener.stats()
+
+
+if __name__ == "__main__":
+    for wav in sys.argv[1:]:
+        commands, stats = recognize_file(wav)
+        print(f"{wav}: {commands} {stats}")
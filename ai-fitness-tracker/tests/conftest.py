@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Tests import the app's modules (config, src.*) from the ai-fitness-tracker folder.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,110 @@
+# tests/test_counter.py
+import numpy as np
+import pytest
+
+from src.counter import (REP_COMBINE, REP_LEFT, REP_RIGHT, CounterBank, RepCounter, count_series,
+                         count_sweep)
+
+
+def random_angles(rng, frames):
+    """Elbow angles with runs either side of the thresholds, some NaN (nobody in view) and some exactly on them."""
+    angles = rng.uniform(0, 180, (frames, 2)).astype(np.float32)
+    angles[rng.random(frames) < 0.05] = np.nan
+    angles[::11, 0] = 150.0
+    angles[::13, 1] = 90.0
+    return angles
+
+
+def test_normal_mode_counts_each_arm_on_the_curl():
+    counter = RepCounter("Normal (Single Arm)")
+    assert counter.update(170.0, 100.0) == 0          # Left armed; right between thresholds
+    assert counter.update(40.0, 100.0) == REP_LEFT    # Left curled: rep
+    assert counter.update(40.0, 170.0) == 0           # Curled again without extending: no rep
+    assert counter.update(100.0, 30.0) == REP_RIGHT
+    assert counter.counts() == {"left": 1, "right": 1, "combine": 0}
+
+
+def test_combine_mode_needs_both_arms():
+    counter = RepCounter("combine")
+    assert counter.update(170.0, 100.0) == 0
+    assert counter.update(40.0, 40.0) == 0            # Never armed together
+    assert counter.update(170.0, 170.0) == 0
+    assert counter.update(40.0, 100.0) == 0           # Only one arm curled
+    assert counter.update(40.0, 40.0) == REP_COMBINE
+    assert counter.counts() == {"left": 0, "right": 0, "combine": 1}
+
+
+def test_extend_counts_on_the_way_up_with_inclusive_thresholds():
+    counter = RepCounter("normal", count_on="extend")
+    assert counter.update(90.0, 170.0) == 0           # <= down arms
+    assert counter.update(150.0, 170.0) == REP_LEFT   # >= up fires
+    assert counter.count_left == 1 and counter.count_right == 0
+
+
+def test_unknown_mode_never_counts():
+    counter = RepCounter("none")
+    for left, right in ((170.0, 170.0), (30.0, 30.0)):
+        assert counter.update(left, right) == 0
+    assert counter.counts() == {"left": 0, "right": 0, "combine": 0}
+
+
+def test_reset_counts_keeps_the_arm_state():
+    counter = RepCounter("normal")
+    counter.update(170.0, 170.0)
+    counter.reset_counts()
+    assert counter.update(30.0, 30.0) == REP_LEFT | REP_RIGHT
+
+
+@pytest.mark.parametrize("count_on", ["curl", "extend"])
+def test_bank_matches_rep_counter_row_by_row(count_on):
+    rng = np.random.default_rng(1)
+    modes = ["normal", "combine", "normal", "none"]
+    thresholds = [(150, 90), (150, 90), (140, 70), (150, 90)]
+    bank = CounterBank(len(modes), count_on)
+    counters = []
+    for row, (mode, (up, down)) in enumerate(zip(modes, thresholds)):
+        bank.set_row(row, mode, up, down)
+        counters.append(RepCounter(mode, up, down, count_on))
+
+    for _ in range(2000):
+        angles = rng.uniform(0, 180, (len(modes), 2)).astype(np.float32)
+        reps = bank.update(angles).copy()
+        for row, counter in enumerate(counters):
+            bits = counter.update(*(float(a) for a in angles[row]))
+            assert reps[row].tolist() == [bool(bits & REP_LEFT), bool(bits & REP_RIGHT), bool(bits & REP_COMBINE)]
+    assert bank.counts.tolist() == [list(c.counts().values()) for c in counters]
+
+
+def test_bank_updates_only_the_given_rows():
+    bank = CounterBank(3)
+    for row in range(3):
+        bank.set_row(row, "normal")
+    bank.update(np.full((2, 2), 170.0, np.float32), rows=np.array([0, 2]))
+    bank.update(np.full((2, 2), 30.0, np.float32), rows=np.array([0, 2]))
+    assert bank.counts[:, 0].tolist() == [1, 0, 1]
+
+
+@pytest.mark.parametrize("mode", ["normal", "combine"])
+@pytest.mark.parametrize("count_on", ["curl", "extend"])
+def test_count_series_matches_frame_by_frame(mode, count_on):
+    angles = random_angles(np.random.default_rng(2), 5000)
+    counter = RepCounter(mode, count_on=count_on)
+    expected = []
+    for left, right in angles.tolist():
+        counter.update(left, right)
+        expected.append(list(counter.counts().values()))
+    assert count_series(mode, angles, count_on=count_on).tolist() == expected
+
+
+@pytest.mark.parametrize("mode", ["normal", "combine"])
+@pytest.mark.parametrize("count_on", ["curl", "extend"])
+def test_count_sweep_matches_count_series_for_every_pair(mode, count_on):
+    angles = random_angles(np.random.default_rng(3), 3000)
+    up = np.array([150, 140, 150, 160, 120], np.float32)
+    down = np.array([90, 90, 70, 60, 100], np.float32)
+    frames, pairs, cols = count_sweep(mode, angles, up, down, count_on)
+    assert np.all(np.diff(frames) >= 0)
+    totals = np.bincount(pairs * 3 + cols, minlength=3 * len(up)).reshape(len(up), 3)
+    for g in range(len(up)):
+        series = count_series(mode, angles, float(up[g]), float(down[g]), count_on)
+        assert totals[g].tolist() == series[-1].tolist()
@@ -0,0 +1,40 @@
+# tests/test_history.py
+import time
+
+import pytest
+
+from src.history import WorkoutStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WorkoutStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def test_totals_and_daily_leave_out_other_peoples_group_reps(store):
+    now = time.mktime((2026, 10, 18, 12, 0, 0, 0, 0, -1))  # Local noon: every rep on one day
+    own = store.start_session("alice", "Normal", started=now - 60)
+    group = store.start_session("alice", "Normal (group)", started=now - 30)
+    store.record_rep("alice", own, "left", 1, ts=now - 50)
+    store.record_rep("alice", own, "right", 1, ts=now - 49)
+    for track in (3, 4, 5):
+        store.record_rep("alice", group, "left", 1, track=track, ts=now - 20)
+    store.end_session(own, {"left": 1, "right": 1, "combine": 0})
+    store.end_session(group, None)
+    store.flush()
+
+    assert store.totals("alice") == {"left": 1, "right": 1, "combine": 0}
+    [(_, day)] = store.daily("alice", now=now)
+    assert day == {"left": 1, "right": 1, "combine": 0}
+    # The group session itself still shows everyone's reps
+    sessions = {s["id"]: s for s in store.sessions("alice")}
+    assert sessions[group]["left"] == 3 and sessions[own]["left"] == 1
+
+
+def test_totals_stay_an_index_only_scan(store):
+    plan = store._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT side, COUNT(*) FROM reps "
+        "WHERE user = ? AND ts >= ? AND ts < ? AND track IS NULL GROUP BY side", ("a", 0.0, 1.0)).fetchall()
+    assert "COVERING INDEX" in " ".join(row[-1] for row in plan)
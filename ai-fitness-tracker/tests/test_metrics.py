@@ -0,0 +1,87 @@
+# tests/test_metrics.py
+import gc
+import logging
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+import config
+import src.metrics as metrics
+from src.metrics import MetricsRegistry, SessionMetrics
+
+
+def test_close_removes_the_session_and_keeps_its_stages_once():
+    registry = MetricsRegistry()
+    session = SessionMetrics(registry=registry)
+    session.add("analyze", 0.01)
+    session.add("analyze", 0.02)
+    assert registry.gauges()["pose_active_sessions"] == 1
+
+    session.close()
+    assert registry.gauges()["pose_active_sessions"] == 0
+    assert registry.stage_totals()["analyze"].count == 2
+
+    session.close()                     # Idempotent
+    del session
+    gc.collect()                        # The finalizer already ran: no double count
+    assert registry.stage_totals()["analyze"].count == 2
+    assert registry.gauges()["pose_sessions_total"] == 1
+
+
+def test_sessions_that_are_never_closed_retire_when_collected():
+    registry = MetricsRegistry()
+    session = SessionMetrics(registry=registry)
+    session.add("recv", 0.001)
+    del session
+    gc.collect()
+    assert registry.gauges()["pose_active_sessions"] == 0
+    assert registry.stage_totals()["recv"].count == 1
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The endpoint on a free port, reset afterwards so other tests start clean."""
+    monkeypatch.setattr(metrics, "_server", None)
+    monkeypatch.setattr(metrics, "_server_failed", False)
+    srv = metrics.start_server(port=free_port())
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(srv, path):
+    host, port = srv.server_address[:2]
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+            return r.status, r.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, ""
+
+
+def test_profile_rejects_bad_durations_with_400(server):
+    for value in ("abc", "nan", "-1", "inf"):
+        assert get(server, f"/profile?seconds={value}")[0] == 400
+    assert get(server, "/profile?seconds=0.05")[0] == 200
+
+
+def test_a_failed_bind_is_logged_once_and_not_retried(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "_server", None)
+    monkeypatch.setattr(metrics, "_server_failed", False)
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        monkeypatch.setattr(config, "METRICS_HOST", "127.0.0.1")
+        port = taken.getsockname()[1]
+        with caplog.at_level(logging.WARNING, logger="src.metrics"):
+            assert metrics.start_server(port=port) is None
+            assert metrics.start_server(port=port) is None
+    assert len(caplog.records) == 1
+    assert "cannot listen" in caplog.records[0].getMessage()
@@ -0,0 +1,19 @@
+# tests/test_model_pool.py
+import logging
+
+import src.model_pool as model_pool
+
+
+def test_load_failure_is_logged_once_with_its_cause(monkeypatch, caplog):
+    def broken(*args, **kwargs):
+        raise RuntimeError("weights file is corrupt")
+
+    monkeypatch.setattr(model_pool, "_pool", None)
+    monkeypatch.setattr(model_pool, "_pool_failed", False)
+    monkeypatch.setattr(model_pool, "ModelPool", broken)
+    with caplog.at_level(logging.ERROR, logger="src.model_pool"):
+        assert model_pool.get_pool() is None
+        assert model_pool.get_pool() is None   # Cached: not retried, not logged again
+    [record] = caplog.records
+    assert "could not be loaded" in record.getMessage()
+    assert "weights file is corrupt" in str(record.exc_info[1])
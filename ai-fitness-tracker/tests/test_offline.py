@@ -0,0 +1,84 @@
+# tests/test_offline.py
+import cv2
+import numpy as np
+import pytest
+
+import src.offline as offline
+import src.tracking
+from src.pose import PoseFrame
+
+CURL = [170.0] * 5 + [30.0] * 5  # Elbow angle per frame of one rep
+
+
+def arm_pose(angle, area=10000.0):
+    """One person whose elbows are both at `angle` degrees."""
+    kps = np.full((17, 2), 200.0, np.float32)
+    a = np.radians(angle)
+    for shoulder, elbow, wrist in ((5, 7, 9), (6, 8, 10)):
+        kps[shoulder] = (200.0, 100.0)
+        kps[elbow] = (200.0, 200.0)
+        kps[wrist] = (200.0 + 100.0 * np.sin(a), 200.0 - 100.0 * np.cos(a))
+    side = np.sqrt(area)
+    return PoseFrame(np.array([[0.0, 0.0, side, side]], np.float32), np.ones(1, np.float32),
+                     np.array([1], np.int64), kps[None], np.ones((1, 17), np.float32), (240, 320))
+
+
+class FakeModel:
+    """Returns the next scripted pose per frame, whatever the image."""
+
+    def __init__(self, poses):
+        self.poses = iter(poses)
+
+    def predict(self, imgs):
+        return [next(self.poses) for _ in imgs]
+
+
+class PassThroughTracker:
+    def update(self, pose, img):
+        return pose
+
+
+@pytest.fixture
+def video(tmp_path):
+    def write(frames):
+        path = str(tmp_path / "clip.avi")
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (320, 240))
+        for _ in range(frames):
+            out.write(np.zeros((240, 320, 3), np.uint8))
+        out.release()
+        return path
+    return write
+
+
+@pytest.fixture
+def run(monkeypatch, video):
+    monkeypatch.setattr(src.tracking, "SessionTracker", PassThroughTracker)
+
+    def run(poses, **kwargs):
+        monkeypatch.setattr(offline, "_model", FakeModel(poses))
+        return offline.process_file(video(len(poses)), "normal", **kwargs)
+    return run
+
+
+def test_counts_reps_with_the_exercise_counter(run):
+    summary = run([arm_pose(a) for a in CURL * 3], smooth=False)
+    assert summary["counts"] == {"left": 3, "right": 3, "combine": 0}
+    assert summary["exercise"] == "bicep_curl"
+
+
+def test_smoothing_keeps_the_count_of_a_clean_set(run):
+    summary = run([arm_pose(a) for a in CURL * 3], smooth=True)
+    assert summary["counts"]["left"] == 3
+
+
+def test_people_with_empty_boxes_are_not_counted(run):
+    poses = [arm_pose(a, area=0.0) for a in CURL * 3]
+    summary = run(poses, smooth=False)
+    assert summary["counts"] == {"left": 0, "right": 0, "combine": 0}
+
+
+def test_other_exercises_count_on_their_own_rules(run):
+    # Elbow-only curls never satisfy a squat's knee phases
+    summary = run([arm_pose(a) for a in CURL * 3], smooth=False, exercise="squat")
+    assert summary["exercise"] == "squat"
+    assert summary["counts"] == {"left": 0, "right": 0, "combine": 0}
@@ -0,0 +1,49 @@
+# tests/test_people.py
+import numpy as np
+
+from src.people import PeopleCounter
+from src.pose import PoseFrame
+
+
+def pose_of(ids, areas=None):
+    """A frame with one person per track id; box sizes from `areas` (default: all equal)."""
+    n = len(ids)
+    sizes = np.sqrt(np.asarray(areas if areas is not None else [100.0] * n, np.float32))
+    boxes = np.zeros((n, 4), np.float32)
+    boxes[:, 2:] = sizes[:, None]
+    keypoints = np.random.default_rng(0).uniform(0, 100, (n, 17, 2)).astype(np.float32)
+    return PoseFrame(boxes, np.ones(n, np.float32), np.asarray(ids, np.int64), keypoints,
+                     np.ones((n, 17), np.float32), (480, 640))
+
+
+def test_new_track_does_not_take_the_row_of_a_track_in_the_same_frame():
+    people = PeopleCounter("normal", capacity=2, stale_after=60.0)
+    people.update(pose_of([1]), 1.0)   # A
+    people.update(pose_of([2]), 2.0)   # B
+    row_a = people.rows[1]
+    people.bank.counts[row_a, 0] = 7
+
+    # Full bank, A is the least recently seen, but A is in this frame: B's row is recycled
+    idx, rows, _, _ = people.update(pose_of([1, 3]), 3.0)
+    assert len(set(rows.tolist())) == 2
+    assert people.rows[1] == row_a
+    assert people.bank.counts[row_a, 0] == 7
+    assert 2 not in people.rows and 3 in people.rows
+    assert people.evicted == 1
+
+
+def test_stale_tracks_are_evicted_with_their_counts():
+    people = PeopleCounter("combine", capacity=4, stale_after=1.0)
+    people.update(pose_of([5, 6]), 0.0)
+    people.bank.counts[people.rows[5], 2] = 3
+    people.update(pose_of([6]), 0.9)
+    gone = people.evict(1.5)
+    assert gone == [(5, {"left": 0, "right": 0, "combine": 3})]
+    assert list(people.rows) == [6]
+
+
+def test_untracked_people_are_ignored_and_largest_kept_when_over_capacity():
+    people = PeopleCounter("normal", capacity=2)
+    idx, rows, angles, reps = people.update(pose_of([-1, 4, 8, 9], areas=[900, 100, 400, 225]), 0.0)
+    assert sorted(idx.tolist()) == [2, 3]
+    assert angles.shape == (2, 2) and reps.shape == (2, 3)
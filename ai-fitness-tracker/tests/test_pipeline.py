@@ -0,0 +1,63 @@
+# tests/test_pipeline.py
+import logging
+import time
+
+import numpy as np
+
+import config
+from src.pipeline import FramePipeline
+
+
+class InlineExecutor:
+    def submit(self, fn):
+        fn()
+
+
+def failing(img, captured):
+    raise ValueError("bad frame")
+
+
+def test_analysis_errors_are_counted_logged_and_rate_limited(caplog, monkeypatch):
+    monkeypatch.setattr(config, "PIPELINE_ERROR_LOG_INTERVAL", 60.0)
+    pipeline = FramePipeline(failing, executor=InlineExecutor())
+    frame = np.zeros((4, 4, 3), np.uint8)
+    with caplog.at_level(logging.ERROR, logger="src.pipeline"):
+        for _ in range(5):
+            pipeline.push(frame)
+
+    stats = pipeline.stats()
+    assert stats["errors"] == 5 and stats["completed"] == 0
+    assert stats["last_error"] == "ValueError('bad frame')"
+    assert len(caplog.records) == 1                    # Only the first, with its traceback
+    assert caplog.records[0].exc_info is not None
+
+
+def test_repeated_errors_are_logged_again_after_the_interval(caplog, monkeypatch):
+    monkeypatch.setattr(config, "PIPELINE_ERROR_LOG_INTERVAL", 0.05)
+    pipeline = FramePipeline(failing, executor=InlineExecutor())
+    frame = np.zeros((4, 4, 3), np.uint8)
+    with caplog.at_level(logging.ERROR, logger="src.pipeline"):
+        pipeline.push(frame)
+        pipeline.push(frame)
+        pipeline.push(frame)
+        time.sleep(0.06)
+        pipeline.push(frame)
+    assert len(caplog.records) == 2
+    assert "3 more times" in caplog.records[1].getMessage()
+
+
+def test_results_still_flow_after_an_error():
+    calls = []
+
+    def analyze(img, captured):
+        calls.append(captured)
+        if len(calls) == 1:
+            raise ValueError("first frame")
+        return "ok"
+
+    pipeline = FramePipeline(analyze, executor=InlineExecutor())
+    frame = np.zeros((4, 4, 3), np.uint8)
+    pipeline.push(frame, captured=1.0)
+    pipeline.push(frame, captured=2.0)
+    assert pipeline.latest() == "ok"
+    assert pipeline.stats()["errors"] == 1 and pipeline.stats()["completed"] == 1
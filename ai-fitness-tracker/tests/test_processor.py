@@ -0,0 +1,112 @@
+# tests/test_processor.py
+import logging
+
+import numpy as np
+import pytest
+
+import config
+import src.processor as processor
+from src.history import WorkoutStore
+from src.pose import PoseFrame
+
+
+class FakeScheduler:
+    """Hands back scripted poses in order; None stands for an inference timeout."""
+
+    def __init__(self):
+        self.poses = []
+
+    def infer(self, img, imgsz=None, timeout=None):
+        return self.poses.pop(0)
+
+    def stats(self):
+        return {}
+
+
+class PassThroughTracker:
+    def update(self, pose, img):
+        return pose
+
+
+@pytest.fixture
+def make(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_PORT", 0)
+    monkeypatch.setattr(config, "TRACE_DIR", None)
+    monkeypatch.setattr(config, "ROI_ENABLED", False)
+    monkeypatch.setattr(processor, "get_scheduler", FakeScheduler)
+    monkeypatch.setattr(processor, "get_fleet", lambda: None)
+    monkeypatch.setattr(processor, "SessionTracker", PassThroughTracker)
+    made = []
+
+    def make(group=False, store=None, user=None):
+        monkeypatch.setattr(processor, "get_store", lambda: store)
+        proc = processor.BicepCurlProcessor("Normal (Each Side)", group=group, user=user)
+        made.append(proc)
+        return proc
+    yield make
+    for proc in made:
+        proc.on_ended()
+
+
+@pytest.fixture
+def session(make):
+    return make()
+
+
+def arm_frame(angles, ids):
+    """One person per id, both elbows at their angle."""
+    n = len(ids)
+    kps = np.full((n, 17, 2), 200.0, np.float32)
+    for k, angle in enumerate(angles):
+        a = np.radians(angle)
+        for shoulder, elbow, wrist in ((5, 7, 9), (6, 8, 10)):
+            kps[k, shoulder] = (200.0, 100.0)
+            kps[k, elbow] = (200.0, 200.0)
+            kps[k, wrist] = (200.0 + 100.0 * np.sin(a), 200.0 - 100.0 * np.cos(a))
+    boxes = np.tile(np.array([[0.0, 0.0, 100.0, 100.0]], np.float32), (n, 1))
+    return PoseFrame(boxes, np.ones(n, np.float32), np.asarray(ids, np.int64), kps,
+                     np.ones((n, 17), np.float32), (48, 64))
+
+
+def test_every_analyze_call_is_timed_including_early_returns(session):
+    img = np.zeros((48, 64, 3), np.uint8)
+    session.scheduler.poses = [None, PoseFrame.empty(img.shape)]   # Timeout, then nobody in view
+    assert session.analyze(img, 1.0) is None
+    assert session.analyze(img, 1.1) is None
+    assert session.metrics.stages["analyze"].count == 2
+
+
+def test_on_ended_leaves_the_active_sessions(session):
+    registry = session.metrics.registry
+    assert session.metrics in registry.sessions()
+    session.on_ended()
+    assert session.metrics not in registry.sessions()
+
+
+def test_group_session_history_counts_the_reps_of_everyone_tracked(make, tmp_path):
+    store = WorkoutStore(str(tmp_path / "history.db"))
+    proc = make(group=True, store=store, user="coach")
+    img = np.zeros((48, 64, 3), np.uint8)
+    for t, angle in enumerate([170.0, 30.0] * 3):
+        proc.scheduler.poses.append(arm_frame([angle, angle], [1, 2]))
+        proc.analyze(img, float(t))
+    proc.on_ended()
+    store.flush()
+    [row] = store.sessions("coach")
+    assert (row["left"], row["right"], row["combine"]) == (6, 6, 0)   # 3 reps per arm for each of two people
+    store.close()
+
+
+def test_final_counts_of_people_who_leave_a_group_are_logged(make, caplog, monkeypatch):
+    monkeypatch.setattr(config, "MULTI_STALE_SECONDS", 1.0)
+    proc = make(group=True)
+    img = np.zeros((48, 64, 3), np.uint8)
+    for t, angle in enumerate([170.0, 30.0, 170.0, 30.0]):
+        proc.scheduler.poses.append(arm_frame([angle], [7]))
+        proc.analyze(img, float(t))
+    proc.scheduler.poses.append(arm_frame([170.0], [8]))   # Track 7 gone for over a second
+    with caplog.at_level(logging.INFO, logger="src.processor"):
+        proc.analyze(img, 10.0)
+    [record] = caplog.records
+    assert "Track 7 left" in record.getMessage()
+    assert "'left': 2, 'right': 2" in record.getMessage()
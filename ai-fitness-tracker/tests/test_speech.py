@@ -0,0 +1,118 @@
+# tests/test_speech.py
+import sys
+import threading
+import time
+
+from src.speech import Announcer, NullBackend, SpeechCache
+
+
+class FakeBackend:
+    """Writes a stand-in WAV on render and records every play; say() can be held to back up the queue."""
+
+    def __init__(self):
+        self.played = []     # (how, text)
+        self.rendered = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def render(self, text, path):
+        with open(path, "wb") as f:
+            f.write(b"RIFF")
+        self.rendered.append(text)
+        return True
+
+    def play_file(self, path, text):
+        self.played.append(("file", text))
+
+    def say(self, text):
+        self.gate.wait(5)
+        self.played.append(("live", text))
+
+
+def start(tmp_path, prerender=False):
+    backend = FakeBackend()
+    announcer = Announcer(backend_factory=lambda: backend, cache=SpeechCache(str(tmp_path)), prerender=prerender)
+    return announcer, backend
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_cached_phrases_are_played_from_disk_and_others_synthesized(tmp_path):
+    announcer, backend = start(tmp_path)
+    try:
+        cache = announcer.cache
+        cache.prerender(backend, ["Left 1"])
+        announcer.say("Left 1")
+        announcer.say("Well done")
+        wait_for(lambda: announcer.spoken == 2)
+        assert backend.played == [("file", "Left 1"), ("live", "Well done")]
+        assert announcer.stats()["cache_hits"] == 1
+    finally:
+        announcer.close()
+
+
+def test_prerender_skips_phrases_already_on_disk(tmp_path):
+    backend = FakeBackend()
+    cache = SpeechCache(str(tmp_path))
+    assert cache.prerender(backend, ["Left 1", "Right 1"]) == 2
+    assert cache.prerender(backend, ["Left 1", "Right 1", "Left 2"]) == 1
+    assert cache.get("Left 2") is not None and cache.get("Left 3") is None
+
+
+def test_newer_count_replaces_unspoken_one_on_the_same_channel(tmp_path):
+    announcer, backend = start(tmp_path)
+    try:
+        backend.gate.clear()
+        announcer.say("Hold on")                  # Blocks the worker in say()
+        wait_for(lambda: announcer.stats()["pending"] == 0)
+        for n in range(1, 6):
+            announcer.announce_rep("left", n)
+        announcer.announce_rep("right", 1)
+        backend.gate.set()
+        wait_for(lambda: announcer.spoken == 3)
+        assert [text for _, text in backend.played] == ["Hold on", "Left 5", "Right 1"]
+        assert announcer.coalesced == 4
+    finally:
+        announcer.close()
+
+
+def test_close_stops_the_worker_without_speaking_the_rest(tmp_path):
+    announcer, backend = start(tmp_path)
+    backend.gate.clear()
+    announcer.say("Hold on")
+    wait_for(lambda: announcer.stats()["pending"] == 0)
+    announcer.say("Never spoken")
+    closing = threading.Thread(target=announcer.close)
+    closing.start()
+    wait_for(announcer._stop.is_set)
+    backend.gate.set()
+    closing.join()
+    assert not announcer._thread.is_alive()
+    assert ("live", "Never spoken") not in backend.played
+
+
+def test_background_prerender_fills_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("config.SPEECH_MAX_COUNT", 2)
+    announcer, backend = start(tmp_path, prerender=True)
+    try:
+        wait_for(lambda: len(backend.rendered) == 9)   # 3 prompts + Left/Right/Combine 1..2
+        assert announcer.cache.get("Combine 2") is not None
+    finally:
+        announcer.close()
+
+
+def test_missing_speech_packages_fall_back_to_the_silent_backend(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyttsx3", None)  # As if not installed
+    announcer = Announcer(prerender=False)
+    try:
+        announcer.say("Left 1")
+        wait_for(lambda: announcer.spoken == 1)
+        assert isinstance(announcer.backend, NullBackend)
+        assert announcer.backend.spoken == ["Left 1"]
+    finally:
+        announcer.close()
@@ -0,0 +1,122 @@
+# tests/test_trace.py
+import threading
+
+import numpy as np
+import pytest
+
+from src.exercises import ExerciseCounter
+from src.offline import replay_file
+from src.pose import PoseFrame
+from src.smoothing import KeypointFilter
+from src.trace import PoseTrace, TraceWriter, replay
+
+CURL = [170.0] * 5 + [30.0] * 5  # Elbow angle per frame of one rep
+
+
+def arm_pose(angle, track=1, jitter=None):
+    """One person whose elbows are both at `angle` degrees; an empty frame for angle None."""
+    if angle is None:
+        return PoseFrame.empty((240, 320))
+    kps = np.full((17, 2), 200.0, np.float32)
+    a = np.radians(angle)
+    for shoulder, elbow, wrist in ((5, 7, 9), (6, 8, 10)):
+        kps[shoulder] = (200.0, 100.0)
+        kps[elbow] = (200.0, 200.0)
+        kps[wrist] = (200.0 + 100.0 * np.sin(a), 200.0 - 100.0 * np.cos(a))
+    if jitter is not None:
+        kps += jitter
+    return PoseFrame(np.array([[0.0, 0.0, 100.0, 100.0]], np.float32), np.ones(1, np.float32),
+                     np.array([track], np.int64), kps[None], np.ones((1, 17), np.float32), (240, 320))
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    def record(angles, **kwargs):
+        path = str(tmp_path / "session.posetrace")
+        with TraceWriter(path, chunk_frames=16) as writer:
+            for i, angle in enumerate(angles):
+                writer.write(i / 30.0, arm_pose(angle, **kwargs))
+        return path
+    return record
+
+
+def test_exercise_replay_matches_the_fast_curl_path(recorded):
+    rng = np.random.default_rng(0)
+    angles = [None if rng.random() < 0.05 else float(a) for a in rng.uniform(0, 180, 400)]
+    trace = PoseTrace(recorded(angles))
+    for mode in ("normal", "combine"):
+        fast_angles, fast = replay(trace, mode)
+        slow_angles, slow = replay(trace, mode, exercise="bicep_curl")
+        np.testing.assert_array_equal(slow, fast)
+        np.testing.assert_allclose(slow_angles, fast_angles, atol=1e-3)
+    trace.close()
+
+
+def test_replay_counts_the_chosen_exercise(recorded):
+    trace = PoseTrace(recorded(CURL * 3))
+    assert replay(trace, "normal", exercise="bicep_curl")[1][-1].tolist() == [3, 3, 0]
+    assert replay(trace, "combine", exercise="squat")[1][-1].tolist() == [0, 0, 0]
+    trace.close()
+
+
+def test_smoothed_replay_matches_the_live_steps_and_resets_on_a_new_track(tmp_path):
+    rng = np.random.default_rng(1)
+    frames = [arm_pose(float(a), track=1 if i < 100 else 2, jitter=rng.normal(0, 4, (17, 2)))
+              for i, a in enumerate(rng.uniform(20, 180, 200))]
+    path = str(tmp_path / "noisy.posetrace")
+    with TraceWriter(path, chunk_frames=16) as writer:
+        for i, pose in enumerate(frames):
+            writer.write(i / 30.0, pose)
+
+    counter, smoother, main_id = ExerciseCounter("bicep_curl", "normal"), KeypointFilter(), None
+    expected = []
+    for i, pose in enumerate(frames):
+        if pose.ids[0] != main_id:
+            main_id = pose.ids[0]
+            smoother.reset()
+        counter.update(smoother.update(pose.keypoints[0], pose.kpt_conf[0], i / 30.0))
+        expected.append([counter.angle_left, counter.angle_right])
+
+    trace = PoseTrace(path)
+    angles, counts = replay(trace, "normal", exercise="bicep_curl", smooth=True)
+    np.testing.assert_allclose(angles, expected, atol=1e-3)
+    assert counts[-1].tolist() == list(counter.counts().values())
+    raw_angles, _ = replay(trace, "normal", exercise="bicep_curl")
+    assert not np.allclose(raw_angles, angles)
+    trace.close()
+
+
+def test_replay_file_uses_the_exercise_and_smoothing_options(recorded, tmp_path):
+    path = recorded(CURL * 2)
+    summary = replay_file(path, "normal", exercise="bicep_curl", smooth=False)
+    assert summary["exercise"] == "bicep_curl"
+    assert summary["counts"] == {"left": 2, "right": 2, "combine": 0}
+    assert replay_file(path, "combine", exercise="squat", smooth=False)["counts"]["combine"] == 0
+
+
+def test_close_from_another_thread_while_frames_are_written(tmp_path):
+    path = str(tmp_path / "live.posetrace")
+    writer = TraceWriter(path, chunk_frames=4)
+    pose = arm_pose(90.0)
+    started = threading.Event()
+    errors = []
+
+    def inference_stage():
+        try:
+            for i in range(20000):
+                writer.write(i / 30.0, pose)
+                started.set()
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=inference_stage)
+    worker.start()
+    started.wait(5)
+    writer.close()            # As on_ended does, mid-stream
+    worker.join()
+    assert errors == []       # Later writes are dropped, not raised
+
+    trace = PoseTrace(path)
+    assert len(trace) == writer.frames > 0
+    assert np.all(np.diff(trace.times) > 0)
+    trace.close()
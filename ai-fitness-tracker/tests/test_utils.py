@@ -0,0 +1,44 @@
+# tests/test_utils.py
+import numpy as np
+
+from src.utils import ARM_TRIPLETS, JointAngles, calculate_angle
+
+
+def reference(keypoints, triplets):
+    return np.array([[calculate_angle(p[a], p[b], p[c]) for a, b, c in triplets] for p in keypoints])
+
+
+def test_kernel_matches_calculate_angle():
+    rng = np.random.default_rng(0)
+    kps = rng.uniform(0, 640, (500, 17, 2)).astype(np.float32)
+    triplets = np.array([[5, 7, 9], [6, 8, 10], [11, 13, 15], [5, 11, 13]])
+    got = JointAngles(triplets)(kps)
+    np.testing.assert_allclose(got, reference(kps.astype(np.float64), triplets), atol=1e-3)
+
+
+def test_degenerate_limbs_give_the_same_angle_as_the_reference():
+    kps = np.zeros((3, 17, 2), np.float32)
+    kps[1, 9] = (10.0, 0.0)            # Zero-length upper arm only
+    kps[2, [5, 9]] = (0.0, 10.0)       # Forearm folded back onto the upper arm
+    got = JointAngles()(kps)
+    np.testing.assert_allclose(got, reference(kps, ARM_TRIPLETS), atol=1e-3)
+
+
+def test_single_person_input_and_out_buffer():
+    rng = np.random.default_rng(1)
+    kps = rng.uniform(0, 640, (17, 2)).astype(np.float32)
+    kernel = JointAngles()
+    out = np.empty((1, 2), np.float32)
+    result = kernel(kps, out=out)
+    assert result.shape == (2,)                # (K, 2) in, one angle per triplet out
+    np.testing.assert_allclose(out[0], reference(kps[None], ARM_TRIPLETS)[0], atol=1e-3)
+    np.testing.assert_array_equal(result, out[0])
+
+
+def test_results_do_not_depend_on_batch_size_or_earlier_calls():
+    rng = np.random.default_rng(2)
+    kps = rng.uniform(0, 640, (64, 17, 2)).astype(np.float32)
+    kernel = JointAngles()
+    full = kernel(kps).copy()
+    kernel(kps[:3])
+    np.testing.assert_array_equal(kernel(kps[10:20]), full[10:20])
@@ -0,0 +1,88 @@
+# tests/test_voice.py
+import wave
+
+import numpy as np
+
+from src.voice import EnergyVAD, recognize_file, rms
+
+RATE = 16000
+TONES = {440.0: "normal", 660.0: "combine", 880.0: "stop"}
+
+
+class ToneMatcher:
+    """Stands in for PocketSphinx: each command is a pure tone; names the tone nearest the utterance's peak."""
+
+    def __init__(self):
+        self.utterances = []
+
+    def match(self, pcm, rate):
+        samples = np.frombuffer(pcm, np.int16).astype(np.float32)
+        self.utterances.append(len(samples) / rate)
+        peak = np.fft.rfftfreq(len(samples), 1 / rate)[np.abs(np.fft.rfft(samples)).argmax()]
+        freq = min(TONES, key=lambda f: abs(f - peak))
+        return TONES[freq] if abs(freq - peak) < 20 else None
+
+
+def noise(seconds, rng, level=50.0):
+    return rng.normal(0, level, int(RATE * seconds))
+
+
+def tone(freq, seconds, level=8000.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return level * np.sin(2 * np.pi * freq * t)
+
+
+def write_wav(path, parts):
+    samples = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(samples.tobytes())
+    return str(path)
+
+
+def test_commands_are_recognised_in_order(tmp_path):
+    rng = np.random.default_rng(0)
+    path = write_wav(tmp_path / "session.wav", [
+        noise(1.2, rng),                      # Ambient calibration
+        tone(440.0, 0.5), noise(0.8, rng),
+        tone(880.0, 0.4), noise(0.8, rng),
+    ])
+    matcher = ToneMatcher()
+    commands, stats = recognize_file(path, matcher=matcher)
+    assert commands == ["normal", "stop"]
+    assert stats["utterances"] == 2
+    assert stats["threshold_rms"] >= stats["noise_rms"] * 3
+    assert all(0.4 <= seconds < 1.0 for seconds in matcher.utterances)
+
+
+def test_utterance_at_end_of_file_is_flushed(tmp_path):
+    rng = np.random.default_rng(1)
+    path = write_wav(tmp_path / "tail.wav", [noise(1.2, rng), tone(660.0, 0.3)])
+    commands, _ = recognize_file(path, matcher=ToneMatcher())
+    assert commands == ["combine"]
+
+
+def test_vad_cuts_at_hangover_and_keeps_preroll():
+    chunk = int(RATE * 0.03)
+    quiet = np.zeros(chunk, np.int16).tobytes()
+    loud = (np.ones(chunk) * 4000).astype(np.int16).tobytes()
+    vad = EnergyVAD(chunk_ms=30, factor=3.0, min_rms=300, hangover_ms=90, preroll_ms=60)
+    vad.calibrate([quiet] * 10)
+    assert vad.threshold == 300
+
+    out = [vad.feed(c) for c in [quiet] * 5 + [loud] * 4 + [quiet] * 3]
+    utterances = [u for u in out if u]
+    assert len(utterances) == 1 and out[-1] is not None
+    # 2 pre-roll chunks + 4 loud + 3 silent
+    assert len(utterances[0]) == 9 * len(quiet)
+    assert rms(loud) >= vad.threshold > rms(quiet)
+
+
+def test_vad_splits_long_utterances_at_max_length():
+    chunk = int(RATE * 0.03)
+    loud = (np.ones(chunk) * 4000).astype(np.int16).tobytes()
+    vad = EnergyVAD(chunk_ms=30, min_rms=300, max_ms=300)
+    cut = [u for u in (vad.feed(loud) for _ in range(25)) if u]
+    assert len(cut) == 2 and all(len(u) == 10 * len(loud) for u in cut)
@@ -16,8 +16,8 @@ cap = cv2.VideoCapture(0)
 count = 0
 up_thresh = 150
 down_thresh = 90
-pushup_up_left = False
-pushup_up_right = False
+curl_armed_left = False
+curl_armed_right = False
 combine = False
 left_hand_counter = 0
 right_hand_counter = 0
@@ -123,26 +123,26 @@ while True:
 
                     if mode == 'normal':
                         combine_counter = 0
-                        #Left hand pushup counter
-                        if left_hand_angle <= down_thresh and not pushup_up_left:
-                            pushup_up_left = True
-                        elif left_hand_angle >= up_thresh and pushup_up_left:
+                        #Left hand curl counter
+                        if left_hand_angle <= down_thresh and not curl_armed_left:
+                            curl_armed_left = True
+                        elif left_hand_angle >= up_thresh and curl_armed_left:
                             left_hand_counter += 1
-                            pushup_up_left = False
+                            curl_armed_left = False
                             speak(f'Left {left_hand_counter}')
 
-                        #Right hand pushup counter
-                        if right_hand_angle <= down_thresh and not pushup_up_right:
-                            pushup_up_right = True
-                        elif right_hand_angle >= up_thresh and pushup_up_right:
+                        #Right hand curl counter
+                        if right_hand_angle <= down_thresh and not curl_armed_right:
+                            curl_armed_right = True
+                        elif right_hand_angle >= up_thresh and curl_armed_right:
                             right_hand_counter += 1
-                            pushup_up_right = False
+                            curl_armed_right = False
                             speak(f'Right {right_hand_counter}')
 
                     elif mode == 'combine':
                         left_hand_counter = 0
                         right_hand_counter = 0
-                        #Combine pushup counter
+                        #Combine curl counter
                         if left_hand_angle <= down_thresh and right_hand_angle <= down_thresh and not combine:
                             combine = True
                         elif left_hand_angle >= up_thresh and right_hand_angle >= up_thresh and combine:
@@ -1,65 +1,59 @@
+import os
+import sys
 import cv2
 import numpy as np
 from ultralytics import YOLO
-import pyttsx3
-import threading
-import queue
 import cvzone
-import speech_recognition as sr
 import time
 import streamlit as st
 
+# Share the app's angle kernel (ai-fitness-tracker/src/utils.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-fitness-tracker'))
+from src.counter import REP_SIDES, RepCounter
+from src.pose import PoseFrame
+from src.speech import Announcer, SpeechCache
+from src.voice import CommandListener, MicrophoneSource
+from src.trace import TraceWriter
+from src.utils import ARM_TRIPLETS, JointAngles
+
 # Initialize the YOLO model and video capture
 model = YOLO('yolo11n-pose.pt')
 
+# Optionally record the model output, to re-count later without the model:
+#   python -m src.trace replay session.posetrace --count-on extend   (from ai-fitness-tracker/)
+trace_path = None  # e.g. 'session.posetrace'
+trace = TraceWriter(trace_path) if trace_path else None
+
 # Initialize variables
 count = 0
 up_thresh = 150
 down_thresh = 90
-pushup_up_left = False
-pushup_up_right = False
-combine = False
-left_hand_counter = 0
-right_hand_counter = 0
-combine_counter = 0
-
-engine = pyttsx3.init()  # Text-to-speech
-voices = engine.getProperty('voices')    # Getting details of current voice
-engine.setProperty('rate', 150)         # Setting up new voice rate
-engine.setProperty('voice', voices[1].id)  # Setting female voice
-speech_queue = queue.Queue()  # Speech queue
+# Rep counters per mode (rep is counted when the arm extends again)
+counters = {
+    'normal': RepCounter('normal', up_thresh, down_thresh, count_on='extend'),
+    'combine': RepCounter('combine', up_thresh, down_thresh, count_on='extend'),
+}
+
+# Text-to-speech: cached phrases, non-blocking, only the latest count is spoken
+announcer = Announcer(cache=SpeechCache())
 
 mode = None
 
-# Listen for voice commands
-def listen_commands():
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
-    while True:
-        if mode == 'stop':
-            time.sleep(0.1)
-            print('Listening stopped')
-            break
-        try:
-            with mic as source:
-                recognizer.adjust_for_ambient_noise(source)
-                print('Listening...')
-                audio = recognizer.listen(source)
-                commands = recognizer.recognize_google(audio).lower()
-                print(commands)
-                if 'normal' in commands:
-                    speak('Normal mode started')
-                    set_mode('normal')
-                elif 'combine' in commands:
-                    speak('Combine mode started')
-                    set_mode('combine')
-                elif 'stop' in commands:
-                    speak('Take care and have a nice day')
-                    time.sleep(3)  # Ensure "Take care" is fully audible
-                    set_mode('stop')
-                    
-        except sr.UnknownValueError:
-            print('Could not understand the audio')
+# Handle voice commands (recognised offline, see src/voice.py)
+def handle_command(command):
+    print(command)
+    if command == 'normal':
+        speak('Normal mode started')
+        set_mode('normal')
+    elif command == 'combine':
+        speak('Combine mode started')
+        set_mode('combine')
+    elif command == 'stop':
+        speak('Take care and have a nice day')
+        time.sleep(3)  # Ensure "Take care" is fully audible
+        set_mode('stop')
+        listener.stop()
+        print('Listening stopped')
 
 # Set mode
 def set_mode(new_mode):
@@ -68,29 +62,14 @@ def set_mode(new_mode):
 
 # Add text to speech
 def speak(text):
-    speech_queue.put(text)
-
-# Worker thread for speech
-def worker_speak():
-    while True:
-        text = speech_queue.get()
-        if text is None:  # Exit the thread gracefully
-            break
-        engine.say(text)
-        engine.runAndWait()
-        speech_queue.task_done()
-
-# Calculate the angle between three points (arms)
-def angle(px1, py1, px2, py2, px3, py3):
-    a = np.sqrt((px2 - px1) ** 2 + (py2 - py1) ** 2)
-    b = np.sqrt((px3 - px2) ** 2 + (py3 - py2) ** 2)
-    c = np.sqrt((px3 - px1) ** 2 + (py3 - py1) ** 2)
-    angle = np.arccos((a ** 2 + b ** 2 - c ** 2) / (2 * a * b))
-    return np.degrees(angle)
+    announcer.say(text, channel='prompt')
+
+# Elbow angles (left, right) for every detected person in one pass
+arm_angles = JointAngles(ARM_TRIPLETS)
 
 # Start threads
-threading.Thread(target=worker_speak, daemon=True).start()
-threading.Thread(target=listen_commands, daemon=True).start()
+listener = CommandListener(MicrophoneSource(), on_command=handle_command)
+listener.start()
 
 # Streamlit setup
 st.title("Voice Enabled AI Bicep Curl Tracker")
@@ -121,65 +100,41 @@ while True:
 
     # Make predictions
     result = model.track(frame)
+    if trace is not None:
+        trace.write(time.time(), PoseFrame.from_result(result[0]))
     if result[0].boxes is not None and result[0].boxes.id is not None:
         keypoints = result[0].keypoints.xy.cpu().numpy()
-        for keypoint in keypoints:
+        angles = arm_angles(keypoints.astype(int)) if keypoints.shape[1] > 10 else None
+        for person, keypoint in enumerate(keypoints):
             if len(keypoint) > 0:
                 for i, point in enumerate(keypoint):
                     cx, cy = int(point[0]), int(point[1])
                     cvzone.putTextRect(frame, f'{i}', (cx, cy), 1, 2)
-                if mode and len(keypoint) > 8:
-                    # Left hand
-                    cx1, cy1 = int(keypoint[5][0]), int(keypoint[5][1])
-                    cx2, cy2 = int(keypoint[7][0]), int(keypoint[7][1])
-                    cx3, cy3 = int(keypoint[9][0]), int(keypoint[9][1])
-
-                    # Right hand
-                    cx4, cy4 = int(keypoint[6][0]), int(keypoint[6][1])
-                    cx5, cy5 = int(keypoint[8][0]), int(keypoint[8][1])
-                    cx6, cy6 = int(keypoint[10][0]), int(keypoint[10][1])
-
-                    left_hand_angle = angle(cx1, cy1, cx2, cy2, cx3, cy3)
-                    right_hand_angle = angle(cx4, cy4, cx5, cy5, cx6, cy6)
+                if mode and angles is not None:
+                    left_hand_angle, right_hand_angle = angles[person]
 
                     if mode == 'normal':
-                        combine_counter = 0
-                        # Left hand push-up counter
-                        if left_hand_angle <= down_thresh and not pushup_up_left:
-                            pushup_up_left = True
-                        elif left_hand_angle >= up_thresh and pushup_up_left:
-                            left_hand_counter += 1
-                            pushup_up_left = False
-                            speak(f'Left {left_hand_counter}')
-
-                        # Right hand push-up counter
-                        if right_hand_angle <= down_thresh and not pushup_up_right:
-                            pushup_up_right = True
-                        elif right_hand_angle >= up_thresh and pushup_up_right:
-                            right_hand_counter += 1
-                            pushup_up_right = False
-                            speak(f'Right {right_hand_counter}')
-
+                        counters['combine'].reset_counts()
                     elif mode == 'combine':
-                        left_hand_counter = 0
-                        right_hand_counter = 0
-                        # Combine push-up counter
-                        if left_hand_angle <= down_thresh and right_hand_angle <= down_thresh and not combine:
-                            combine = True
-                        elif left_hand_angle >= up_thresh and right_hand_angle >= up_thresh and combine:
-                            combine_counter += 1
-                            combine = False
-                            speak(f'Combine {combine_counter}')
+                        counters['normal'].reset_counts()
+
+                    counter = counters.get(mode)
+                    if counter is not None:
+                        reps = counter.update(left_hand_angle, right_hand_angle)
+                        for side in REP_SIDES[reps]:
+                            announcer.announce_rep(side, counter.counts()[side])
 
         # Display the counter
         if mode == 'normal':
-            cvzone.putTextRect(frame, f'Left: {int(left_hand_counter)}', (50, 60), 1, 2)
-            cvzone.putTextRect(frame, f'Right: {int(right_hand_counter)}', (50, 160), 1, 2)
+            cvzone.putTextRect(frame, f'Left: {counters["normal"].count_left}', (50, 60), 1, 2)
+            cvzone.putTextRect(frame, f'Right: {counters["normal"].count_right}', (50, 160), 1, 2)
         elif mode == 'combine':
-            cvzone.putTextRect(frame, f'Combine: {int(combine_counter)}', (50, 60), 1, 2)
+            cvzone.putTextRect(frame, f'Combine: {counters["combine"].count_combine}', (50, 60), 1, 2)
 
     # Display the frame in Streamlit
     video_placeholder.image(frame, channels="BGR")
 
 # Cleanup
 cap.release()
+if trace is not None:
+    trace.close()